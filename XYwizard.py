@@ -15,10 +15,9 @@ Therefore, the script works best for wafers with symmetry about the X and Y axes
 
 Author: Sean Lin
 Date Created: 7/6/21
-Date Modified: 7/28/21
+Date Modified: 10/19/26
 """
 import numpy as np
-import matplotlib.pyplot as plt
 
 class XYwizard(object):
 
@@ -33,6 +32,7 @@ class XYwizard(object):
         :param diam: diameter of the wafer in millimeters
         :return: NA, plots a matplotlib scatter plot
         """
+        import matplotlib.pyplot as plt
         print("please verify that the plotted sample array is acceptable and close the plot when done")
         fig, ax = plt.subplots()
         ax.scatter(x, y)
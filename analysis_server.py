@@ -0,0 +1,221 @@
+"""
+Class analysis server is a long-lived local process that runs the Nikon and VEECO analyses on request.
+Automation that calls the main scripts once per wafer pays for interpreter startup, the pandas / matplotlib / sklearn
+imports and the font cache every time; the server pays for them once and then only does the analysis itself.
+
+The server listens on a localhost port (works on Windows too, unlike Unix sockets) and handles requests one at a time
+(matplotlib is not thread safe).  Every request and response is a single line of JSON:
+    {"command": "ping"}
+    {"command": "nikon", "path": raw Nikon output csv, "output_folder": optional, "layout": optional XYin csv}
+    {"command": "veeco", "mode": "single" or "multi", "path": VEECO export csv, "extrema": number of extreme values}
+    {"command": "shutdown"}
+Responses are {"ok": true, "outputs": [output files], "seconds": time taken} or {"ok": false, "error": message}.
+Nikon outputs go to the same output folder main_Output_Analyzer uses for raw files in Nikon_Outputs/<lot> (next to
+the raw file otherwise) unless an output folder is given.  Every Nikon request is processed like an incremental run
+of main_Output_Analyzer: the outputs of an earlier build of the wafer are removed, the raw file is left in place (and
+copied into the output folder) and the outputs are recorded in the MANIFEST.json next to the output folder.  The
+settings (constants) of main_Output_Analyzer and main_VEECO apply, so the results database, SPC charts and wafer
+stacks (found from the folder the server was started in, like main_Output_Analyzer) are updated as well.
+
+Start the server with "python analysis_server.py" and submit requests with analysis_server.send.
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import json
+import os
+import socket
+import socketserver
+import time
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import main_Output_Analyzer
+import main_VEECO
+from build_manifest import build_manifest
+from results_store import results_store
+from spc_tracker import spc_tracker
+
+HOST = "127.0.0.1"
+PORT = 50123
+
+class request_handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        """
+        answers every JSON line received on the connection with a JSON line
+        :return: NA
+        """
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.analysis.handle(json.loads(line))
+            except Exception as error:
+                response = {"ok": False, "error": type(error).__name__ + ": " + str(error)}
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+            if not self.server.analysis.running:
+                return
+
+class reusable_server(socketserver.TCPServer):
+    # lets a restarted server bind the port right away instead of waiting for the old connections to time out
+    allow_reuse_address = True
+
+class analysis_server(object):
+    def __init__(self, host=HOST, port=PORT):
+        """
+        constructor for the analysis server class.  Binds the server to the port.
+        :param host: address to listen on (keep to localhost, requests are not authenticated)
+        :param port: port to listen on
+        """
+        self.server = reusable_server((host, port), request_handler)
+        self.server.analysis = self
+        self.running = False
+        # results database, SPC charts and wafer stacks every Nikon wafer is recorded in (see open_records)
+        self.store = None
+        self.tracker = None
+        self.stacks = None
+
+    def open_records(self):
+        """
+        opens the results database, SPC state and wafer stacks enabled in main_Output_Analyzer, relative to the
+        current folder
+        :return: NA
+        """
+        home_dir = os.getcwd()
+        if main_Output_Analyzer.RESULTS_DATABASE is not None:
+            self.store = results_store(os.path.join(home_dir, main_Output_Analyzer.RESULTS_DATABASE))
+        if main_Output_Analyzer.SPC_STATE_FILE is not None:
+            self.tracker = spc_tracker(os.path.join(home_dir, main_Output_Analyzer.SPC_STATE_FILE),
+                                       main_Output_Analyzer.SPC_BASELINE_WAFERS)
+        if main_Output_Analyzer.WAFER_STACK_DIR is not None:
+            self.stacks = {}
+
+    @staticmethod
+    def warm_up():
+        """
+        loads the libraries the analyses use lazily and draws a figure once so the font cache and text rendering are
+        ready before the first request
+        :return: NA
+        """
+        import pandas
+        import sklearn.neighbors
+        import sklearn.decomposition
+        fig = plt.figure(figsize=[12.8, 9.6])
+        ax = fig.add_subplot(111)
+        ax.plot([0, 1], [0, 1], label="warm up")
+        ax.set_title("warm up")
+        ax.legend()
+        fig.canvas.draw()
+        plt.close(fig)
+
+    def serve(self):
+        """
+        warms up and handles requests until a shutdown request is received
+        :return: NA
+        """
+        self.warm_up()
+        # the database connection is opened in the thread that serves the requests
+        self.open_records()
+        self.running = True
+        print("analysis server listening on " + str(self.server.server_address[0]) + ":" +
+              str(self.server.server_address[1]))
+        try:
+            while self.running:
+                self.server.handle_request()
+        finally:
+            self.server.server_close()
+
+    def handle(self, request):
+        """
+        runs a single request
+        :param request: dictionary of the request (see module docstring)
+        :return: dictionary of the response
+        """
+        start = time.perf_counter()
+        command = request.get("command")
+        if command == "ping":
+            outputs = []
+        elif command == "nikon":
+            outputs = self.analyze_nikon(request)
+        elif command == "veeco":
+            outputs = self.analyze_veeco(request)
+        elif command == "shutdown":
+            self.running = False
+            outputs = []
+        else:
+            return {"ok": False, "error": "unknown command " + str(command)}
+        return {"ok": True, "outputs": outputs, "seconds": time.perf_counter() - start}
+
+    def analyze_nikon(self, request):
+        """
+        analyzes a single raw Nikon output (see main_Output_Analyzer.process_job)
+        :param request: dictionary with the "path" of the raw Nikon output and optionally an "output_folder" and the
+                        "layout" XYin file to match pads against
+        :return: list of paths of the output files written
+        """
+        wafer_dir, file_name = os.path.split(os.path.abspath(request["path"]))
+        name = file_name[:len(file_name) - 4]
+        output_folder = request.get("output_folder")
+        if not output_folder:
+            # raw files in the usual Nikon_Outputs/<lot> layout get their outputs where main_Output_Analyzer puts them
+            home_dir = os.path.dirname(os.path.dirname(wafer_dir))
+            if os.path.basename(os.path.dirname(wafer_dir)) == "Nikon_Outputs":
+                output_folder = os.path.join(home_dir, "PROCESSED_DATA&PLOTS", name + "_DATA&PLOTS")
+            else:
+                output_folder = os.path.join(wafer_dir, name + "_DATA&PLOTS")
+        output_folder = os.path.abspath(output_folder)
+        if not (os.path.isdir(os.path.dirname(output_folder))):
+            os.makedirs(os.path.dirname(output_folder))
+        layout_file = request.get("layout")
+        if not layout_file:
+            layout_file = main_Output_Analyzer.find_layout_file(wafer_dir, os.listdir(wafer_dir))
+        full_layout_file = main_Output_Analyzer.find_full_layout_file(wafer_dir, os.listdir(wafer_dir))
+        input_files = [os.path.join(wafer_dir, file_name)]
+        if layout_file is not None:
+            input_files.append(layout_file)
+        if full_layout_file is not None:
+            input_files.append(full_layout_file)
+        job = {"folder": os.path.basename(wafer_dir), "wafer_dir": wafer_dir, "name": name,
+               "layout_file": layout_file, "full_layout_file": full_layout_file, "input_files": input_files,
+               "input_hash": build_manifest.hash_inputs(input_files), "output_folder": output_folder}
+        manifest = build_manifest(os.path.join(os.path.dirname(output_folder), "MANIFEST.json"))
+        return main_Output_Analyzer.process_job(job, self.store, manifest, main_Output_Analyzer.analysis_parameters(),
+                                                self.stacks, self.tracker)
+
+    @staticmethod
+    def analyze_veeco(request):
+        """
+        analyzes a single VEECO export
+        :param request: dictionary with the "path" of the export, the "mode" ("single" or "multi") and for single
+                        cursor exports the number of "extrema" to observe
+        :return: list of paths of the output files written
+        """
+        path = os.path.abspath(request["path"])
+        if request.get("mode") == "single":
+            return main_VEECO.analyze_single_cursor(path, int(request.get("extrema", 5)))
+        if request.get("mode") == "multi":
+            store_dir = None
+            if main_VEECO.PROFILE_STORE_DIR is not None:
+                store_dir = os.path.join(os.path.dirname(os.path.dirname(path)), main_VEECO.PROFILE_STORE_DIR)
+            return main_VEECO.analyze_multi_cursor(path, store_dir)
+        raise ValueError("mode must be 'single' or 'multi'")
+
+    @staticmethod
+    def send(request, host=HOST, port=PORT, timeout=600):
+        """
+        client helper that submits a request to a running server and waits for the response
+        :param request: dictionary of the request (see module docstring)
+        :param host: address of the server
+        :param port: port of the server
+        :param timeout: seconds to wait for the response
+        :return: dictionary of the response
+        """
+        with socket.create_connection((host, port), timeout=timeout) as connection:
+            connection.sendall((json.dumps(request) + "\n").encode())
+            response = connection.makefile('rb').readline()
+        return json.loads(response)
+
+if __name__ == '__main__':
+    analysis_server().serve()
@@ -0,0 +1,53 @@
+"""
+Testing script for the local analysis server
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import os
+import tempfile
+import threading
+import numpy as np
+from analysis_server import analysis_server
+
+def write_single_cursor(filename):
+    """
+    helper that writes a single-cursor VEECO export of a simple scrub mark profile
+    """
+    x = np.linspace(0, 60, 200)
+    z = -np.exp(-((x - 30) / 6) ** 2)
+    with open(filename, 'w') as export:
+        export.write("x,z\num,um\n-,-\n")
+        for xi, zi in zip(x, z):
+            export.write("%.5f,%.5f\n" % (xi, zi))
+
+def test_requests():
+    """
+    the server answers pings, runs a VEECO analysis, reports errors without stopping, and shuts down on request
+    """
+    server = analysis_server(port=0)
+    port = server.server.server_address[1]
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    try:
+        with tempfile.TemporaryDirectory() as path:
+            filename = os.path.join(path, "mark.csv")
+            write_single_cursor(filename)
+            assert analysis_server.send({"command": "ping"}, port=port)["ok"]
+            response = analysis_server.send({"command": "veeco", "mode": "single", "path": filename, "extrema": 3},
+                                            port=port)
+            assert response["ok"]
+            assert all(os.path.isfile(output) for output in response["outputs"])
+            response = analysis_server.send({"command": "nikon", "path": os.path.join(path, "missing.csv")},
+                                            port=port)
+            assert not response["ok"] and "missing.csv" in response["error"]
+            assert not analysis_server.send({"command": "unknown"}, port=port)["ok"]
+    finally:
+        assert analysis_server.send({"command": "shutdown"}, port=port)["ok"]
+        thread.join(timeout=10)
+    assert not thread.is_alive()
+
+if __name__ == '__main__':
+    test_requests()
+    print("analysis server tests passed")
@@ -0,0 +1,89 @@
+"""
+class build_manifest records, for every processed wafer, what its outputs were built from so that a run can skip
+wafers whose outputs are already current (make-style incremental rebuilds).
+
+Each manifest entry stores
+    1. the hash of the wafer's input files (raw Nikon output and any layout file used)
+    2. the analysis parameters the outputs were built with
+    3. the output files that were written
+An entry is only recorded once all outputs of a wafer are written, and the manifest file is replaced atomically,
+so a run that crashes partway through a lot simply rebuilds the wafers that never got an entry.
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import hashlib
+import json
+import os
+
+class build_manifest(object):
+    def __init__(self, filename):
+        """
+        constructor for the build_manifest class.  Loads the manifest file if it already exists.
+        :param filename: path of the manifest (json) file
+        """
+        self.filename = filename
+        self.entries = {}
+        if os.path.isfile(filename):
+            with open(filename) as manifest_file:
+                self.entries = json.load(manifest_file)
+
+    @staticmethod
+    def hash_inputs(filenames):
+        """
+        finds a single hash of the contents of all input files
+        :param filenames: list of input file paths (order matters)
+        :return: hex digest (string)
+        """
+        digest = hashlib.sha256()
+        for filename in filenames:
+            with open(filename, 'rb') as input_file:
+                for block in iter(lambda: input_file.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def is_current(self, wafer, input_hash, params):
+        """
+        checks whether the outputs of a wafer were built from the same inputs and parameters and all still exist
+        :param wafer: name of the wafer
+        :param input_hash: hash of the wafer's input files (see hash_inputs)
+        :param params: dictionary of analysis parameters
+        :return: T/F to indicate whether the wafer can be skipped
+        """
+        entry = self.entries.get(wafer)
+        if entry is None:
+            return False
+        if entry["input_hash"] != input_hash or entry["params"] != params:
+            return False
+        return all(os.path.isfile(output) for output in entry["outputs"])
+
+    def get_outputs(self, wafer):
+        """
+        :param wafer: name of the wafer
+        :return: list of output files recorded for the wafer (empty if the wafer has no entry)
+        """
+        entry = self.entries.get(wafer)
+        return [] if entry is None else list(entry["outputs"])
+
+    def record(self, wafer, input_hash, params, outputs):
+        """
+        records the entry of a wafer whose outputs have all been written, and saves the manifest
+        :param wafer: name of the wafer
+        :param input_hash: hash of the wafer's input files (see hash_inputs)
+        :param params: dictionary of analysis parameters
+        :param outputs: list of output file paths
+        :return: NA
+        """
+        self.entries[wafer] = {"input_hash": input_hash, "params": params, "outputs": list(outputs)}
+        self.save()
+
+    def save(self):
+        """
+        writes the manifest to a temporary file and atomically replaces the manifest file with it
+        :return: NA
+        """
+        temp_filename = self.filename + ".tmp"
+        with open(temp_filename, 'w') as manifest_file:
+            json.dump(self.entries, manifest_file, indent=1, sort_keys=True)
+        os.replace(temp_filename, self.filename)
@@ -0,0 +1,56 @@
+"""
+Testing script for the build manifest used by incremental runs of main_Output_Analyzer
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import os
+import tempfile
+from build_manifest import build_manifest
+
+def write_file(filename, text):
+    """
+    helper that writes text to a file
+    """
+    with open(filename, 'w') as out_file:
+        out_file.write(text)
+
+def test_current_after_record():
+    """
+    a recorded wafer is current until its inputs, its parameters or one of its outputs change
+    """
+    with tempfile.TemporaryDirectory() as path:
+        raw = os.path.join(path, "wafer.csv")
+        output = os.path.join(path, "wafer_PROCESSED.csv")
+        write_file(raw, "1,2,3\n")
+        write_file(output, "processed\n")
+        params = {"WAFER_DIAMETER": 300000, "DISTORTION_ORDER": None}
+        manifest = build_manifest(os.path.join(path, "MANIFEST.json"))
+        input_hash = build_manifest.hash_inputs([raw])
+        assert not manifest.is_current("wafer", input_hash, params)
+        manifest.record("wafer", input_hash, params, [output])
+
+        # the manifest is read back from disk by the next run
+        manifest = build_manifest(os.path.join(path, "MANIFEST.json"))
+        assert manifest.is_current("wafer", input_hash, params)
+        assert manifest.get_outputs("wafer") == [output]
+        assert not manifest.is_current("wafer", input_hash, dict(params, DISTORTION_ORDER=3))
+        write_file(raw, "1,2,4\n")
+        assert not manifest.is_current("wafer", build_manifest.hash_inputs([raw]), params)
+        os.remove(output)
+        assert not manifest.is_current("wafer", input_hash, params)
+
+def test_unknown_wafer():
+    """
+    wafers without an entry have no recorded outputs
+    """
+    with tempfile.TemporaryDirectory() as path:
+        manifest = build_manifest(os.path.join(path, "MANIFEST.json"))
+        assert manifest.get_outputs("wafer") == []
+        assert not os.path.isfile(os.path.join(path, "MANIFEST.json"))
+
+if __name__ == '__main__':
+    test_current_after_record()
+    test_unknown_wafer()
+    print("build manifest tests passed")
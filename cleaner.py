@@ -4,10 +4,9 @@ classes contained within this project
 
 Author: Sean Lin
 Date Created: 7/6/21
-Last Modified: 7/30/21
+Last Modified: 10/19/26
 """
 import numpy as np
-import pandas as pd
 import csv
 class Cleaner(object):
     def __init__(self, filename):
@@ -22,6 +21,7 @@ class Cleaner(object):
 
         :param filename: string that contains name of .csv file
         """
+        import pandas as pd
         with open(filename) as csv_file:
             reader = csv.reader(csv_file)
             row1 = next(reader)
@@ -76,6 +76,48 @@ class Cleaner(object):
         meas_y_widths = rslt_df_VW['1'].tolist()
         return meas_x_widths, meas_y_widths
 
+    def find_repeat_columns(self):
+        """
+        find repeat columns finds the measurement columns of the raw Nikon output.  Recipes that measure every site
+        several times write one column per pass, labeled '1', '2', '3', ...
+
+        :return: list of repeat column labels in pass order
+        """
+        columns = [column for column in self.dataset.columns if str(column).strip().isdigit()]
+        return sorted(columns, key=lambda column: int(str(column).strip()))
+
+    def extract_repeats(self, label):
+        """
+        extract repeats extracts every pass of the rows with the given label as a 2D array (sites x passes).
+        Passes read as errors (9999.9999) are set to np.nan.
+
+        :param label: row label in the third column of the raw Nikon output ('X', 'Y', 'HW_L1' or 'VW_L2')
+        :return: 2D array of measurements, one row per site and one column per pass
+        """
+        rows = self.dataset.loc[self.dataset['Unnamed: 2'] == label]
+        repeats = rows[self.find_repeat_columns()].to_numpy(dtype=float)
+        repeats[repeats == 9999.9999] = np.nan
+        return repeats
+
+    def extract_XY_repeats(self):
+        """
+        extract XY repeats extracts the X and Y global location data of every pass from the raw .csv file
+        extracted locations are coordinates measured in microns
+
+        :return: [nominal X locations, nominal Y locations, measured X locations (sites x passes),
+                  measured Y locations (sites x passes)]
+        """
+        nom_X, nom_Y, meas_X, meas_Y = self.extract_XY()
+        return nom_X, nom_Y, self.extract_repeats('X'), self.extract_repeats('Y')
+
+    def extract_width_repeats(self):
+        """
+        extract width repeats extracts the X and Y widths of each wafer pad for every pass.
+        extracted widths are in microns
+        :return: [measured X widths (sites x passes), measured Y widths (sites x passes)]
+        """
+        return self.extract_repeats('HW_L1'), self.extract_repeats('VW_L2')
+
     @staticmethod
     def clean(dataset):
         """
@@ -0,0 +1,195 @@
+"""
+Class dimension stats accumulates the statistics of a set of pad dimensions in a single pass.
+Dimensions can be added in chunks, and accumulators of different chunks, wafers or lots can be merged, so that lot
+summaries are built by combining the accumulators of each wafer instead of re-reading all pads.
+
+Count, mean and variance are accumulated with Welford's method and merged with Chan's parallel formula, which stays
+accurate where summing squares would cancel out.  Percentiles are either
+    a. exact, by keeping every value (the default, fine for a single wafer)
+    b. approximate, by counting the values in a fixed set of bins (a histogram sketch of constant size that merges
+       by adding counts, for lots too large to keep every pad)
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import numpy as np
+
+class dimension_stats(object):
+    def __init__(self, edges=None):
+        """
+        constructor for the dimension stats class
+        :param edges: increasing bin edges of the histogram sketch.  If None every value is kept for exact
+                      percentiles.
+        """
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.edges = None if edges is None else np.asarray(edges, dtype=float)
+        if self.edges is None:
+            self.values = []
+        else:
+            assert self.edges.size >= 2 and np.all(np.diff(self.edges) > 0), "edges must be increasing"
+            self.bin_counts = np.zeros(self.edges.size - 1, dtype=np.int64)
+
+    def update(self, values):
+        """
+        adds a chunk of dimensions to the accumulator.  np.nan values are ignored.
+        :param values: list or array of dimensions
+        :return: NA
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        chunk_mean = values.mean()
+        self.combine(values.size, chunk_mean, np.sum((values - chunk_mean) ** 2), values.min(), values.max())
+        if self.edges is None:
+            self.values.append(values)
+        else:
+            # values outside the edges are counted in the first and last bins
+            bins = np.clip(np.searchsorted(self.edges, values, side='right') - 1, 0, self.bin_counts.size - 1)
+            self.bin_counts += np.bincount(bins, minlength=self.bin_counts.size)
+
+    def combine(self, count, mean, m2, minimum, maximum):
+        """
+        combines the moments of another set of values into the accumulator (Chan's parallel formula)
+        :param count: number of values of the other set
+        :param mean: mean of the other set
+        :param m2: sum of squared deviations from the mean of the other set
+        :param minimum: smallest value of the other set
+        :param maximum: largest value of the other set
+        :return: NA
+        """
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def can_merge(self, other):
+        """
+        :param other: dimension_stats
+        :return: T/F whether other can be merged into this accumulator (see merge)
+        """
+        if self.edges is None or other.edges is None:
+            return other.edges is None
+        return np.array_equal(self.edges, other.edges)
+
+    def merge(self, other):
+        """
+        merges another accumulator into this one.  Both must keep exact values or share the same sketch edges.
+        :param other: dimension_stats to merge
+        :return: NA
+        """
+        self.combine(other.count, other.mean, other.m2, other.min, other.max)
+        if self.edges is None:
+            assert other.edges is None, "cannot merge a histogram sketch into exact statistics"
+            self.values.extend(other.values)
+        elif other.edges is None:
+            bins = np.clip(np.searchsorted(self.edges, np.concatenate(other.values + [np.array([])]), side='right')
+                           - 1, 0, self.bin_counts.size - 1)
+            self.bin_counts += np.bincount(bins, minlength=self.bin_counts.size)
+        else:
+            assert np.array_equal(self.edges, other.edges), "sketches with different edges cannot be merged"
+            self.bin_counts += other.bin_counts
+
+    def std(self):
+        """
+        :return: population standard deviation of all values (same as np.std)
+        """
+        if self.count == 0:
+            return np.nan
+        return np.sqrt(self.m2 / self.count)
+
+    def percentile(self, q):
+        """
+        finds a percentile of all values, exactly or by interpolating within the bins of the sketch
+        :param q: percentile (0 - 100)
+        :return: value of the percentile
+        """
+        if self.count == 0:
+            return np.nan
+        if self.edges is None:
+            return np.percentile(np.concatenate(self.values), q)
+        cumulative = np.cumsum(self.bin_counts)
+        target = q / 100 * self.count
+        i = min(int(np.searchsorted(cumulative, target, side='left')), self.bin_counts.size - 1)
+        below = cumulative[i] - self.bin_counts[i]
+        fraction = 0.0 if self.bin_counts[i] == 0 else (target - below) / self.bin_counts[i]
+        value = self.edges[i] + fraction * (self.edges[i + 1] - self.edges[i])
+        return float(np.clip(value, self.min, self.max))
+
+    def quartiles(self):
+        """
+        :return: [first quartile, median, third quartile]
+        """
+        return self.percentile(25), self.percentile(50), self.percentile(75)
+
+    def cpk(self, lower_limit, upper_limit):
+        """
+        finds the process capability index against spec limits.  Either limit may be None for a one-sided spec.
+        :param lower_limit: lower spec limit (None if there is none)
+        :param upper_limit: upper spec limit (None if there is none)
+        :return: Cpk
+        """
+        std = self.std()
+        capabilities = []
+        if upper_limit is not None:
+            capabilities.append((upper_limit - self.mean) / (3 * std))
+        if lower_limit is not None:
+            capabilities.append((self.mean - lower_limit) / (3 * std))
+        assert len(capabilities) > 0, "at least one spec limit is required"
+        return min(capabilities)
+
+    def summary(self, lower_limit=None, upper_limit=None):
+        """
+        collects all statistics of the accumulator
+        :param lower_limit: lower spec limit (None if there is none)
+        :param upper_limit: upper spec limit (None if there is none)
+        :return: dictionary of count, mean, std, min, Q1, median, Q3, max and (if any limit is given) Cpk
+        """
+        q1, median, q3 = self.quartiles()
+        summary = {"count": self.count, "mean": self.mean if self.count > 0 else np.nan, "std": self.std(),
+                   "min": self.min if self.count > 0 else np.nan, "Q1": q1, "median": median, "Q3": q3,
+                   "max": self.max if self.count > 0 else np.nan}
+        if lower_limit is not None or upper_limit is not None:
+            summary["Cpk"] = self.cpk(lower_limit, upper_limit)
+        return summary
+
+    def to_dict(self):
+        """
+        converts the accumulator to a dictionary that can be saved as json
+        :return: dictionary of the state of the accumulator
+        """
+        state = {"count": self.count, "mean": self.mean, "m2": self.m2,
+                 "min": None if self.count == 0 else float(self.min),
+                 "max": None if self.count == 0 else float(self.max)}
+        if self.edges is None:
+            state["values"] = np.concatenate(self.values + [np.array([])]).tolist()
+        else:
+            state["edges"] = self.edges.tolist()
+            state["bin_counts"] = self.bin_counts.tolist()
+        return state
+
+    @staticmethod
+    def from_dict(state):
+        """
+        rebuilds an accumulator saved with to_dict
+        :param state: dictionary of the state of the accumulator
+        :return: dimension_stats
+        """
+        stats = dimension_stats(state.get("edges"))
+        if state["count"] > 0:
+            stats.combine(state["count"], state["mean"], state["m2"], state["min"], state["max"])
+        if stats.edges is None:
+            stats.values = [np.asarray(state["values"], dtype=float)]
+        else:
+            stats.bin_counts = np.asarray(state["bin_counts"], dtype=np.int64)
+        return stats
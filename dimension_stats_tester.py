@@ -0,0 +1,93 @@
+"""
+Testing script for the single-pass pad dimension statistics accumulator
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import numpy as np
+from dimension_stats import dimension_stats
+from super_wafer_pad import super_wafer_pad
+
+def test_chunks_match_numpy():
+    """
+    statistics accumulated in chunks match numpy on the full set, and precision holds for large offsets
+    """
+    rng = np.random.default_rng(0)
+    values = 1.0e6 + rng.normal(0, 0.3, 10000)
+    stats = dimension_stats()
+    for chunk in np.array_split(values, 7):
+        stats.update(chunk)
+    assert stats.count == values.size
+    assert np.isclose(stats.mean, np.mean(values))
+    assert np.isclose(stats.std(), np.std(values))
+    assert stats.min == values.min() and stats.max == values.max()
+    assert np.allclose(stats.quartiles(), np.percentile(values, [25, 50, 75]))
+
+def test_merge_wafers():
+    """
+    merging per-wafer accumulators gives the same result as accumulating every pad of the lot
+    """
+    rng = np.random.default_rng(1)
+    wafers = [rng.normal(75 + i * 0.1, 0.3, 500) for i in range(4)]
+    lot = dimension_stats()
+    for wafer in wafers:
+        wafer_stats = dimension_stats()
+        wafer_stats.update(wafer)
+        lot.merge(wafer_stats)
+    everything = np.concatenate(wafers)
+    assert np.isclose(lot.mean, everything.mean())
+    assert np.isclose(lot.std(), everything.std())
+    assert np.isclose(lot.percentile(90), np.percentile(everything, 90))
+
+def test_sketch():
+    """
+    histogram sketches merge by adding counts and approximate the percentiles within a bin width,
+    and survive a round trip through a dictionary
+    """
+    rng = np.random.default_rng(2)
+    edges = np.linspace(37.5, 112.5, 2001)
+    everything = rng.normal(75, 0.5, 20000)
+    lot = dimension_stats(edges)
+    for wafer in np.array_split(everything, 5):
+        wafer_stats = dimension_stats(edges)
+        wafer_stats.update(wafer)
+        lot.merge(dimension_stats.from_dict(wafer_stats.to_dict()))
+    assert lot.count == everything.size
+    assert np.isclose(lot.std(), everything.std())
+    assert np.allclose(lot.quartiles(), np.percentile(everything, [25, 50, 75]), atol=edges[1] - edges[0])
+    assert lot.percentile(0) == everything.min() and lot.percentile(100) == everything.max()
+    # exact statistics merge into a sketch, sketches with other edges or into exact statistics do not
+    assert lot.can_merge(dimension_stats()) and not dimension_stats().can_merge(lot)
+    assert not lot.can_merge(dimension_stats(np.linspace(25, 75, 2001)))
+
+def test_cpk():
+    """
+    Cpk is taken against the closer spec limit, and a one-sided spec uses only its limit
+    """
+    stats = dimension_stats()
+    stats.update([74, 75, 76, 75, 74, 76])
+    std = np.std([74, 75, 76, 75, 74, 76])
+    assert np.isclose(stats.cpk(72, 77), 2 / (3 * std))
+    assert np.isclose(stats.cpk(None, 80), 5 / (3 * std))
+    assert "Cpk" not in stats.summary()
+
+def test_super_wafer_pad_statistics():
+    """
+    super_wafer_pad reports true quartiles alongside the standard deviation
+    """
+    meas_x = [73.5, 75.9, 73.5, 78.4, 75.9, 73.5, 73.5]
+    meas_y = [95.5, 95.5, 93.1, 93.1, 95.5, 93.1, 95.5]
+    swp = super_wafer_pad(75, 95, meas_x, meas_y)
+    std_x, std_y, quartiles_x, quartiles_y = swp.find_std_and_quartile()
+    assert np.isclose(std_x, np.std(meas_x)) and np.isclose(std_y, np.std(meas_y))
+    assert np.allclose(quartiles_x, np.percentile(meas_x, [25, 50, 75]))
+    assert np.allclose(swp.find_average_dimensions(), [np.mean(meas_x), np.mean(meas_y)])
+
+if __name__ == '__main__':
+    test_chunks_match_numpy()
+    test_merge_wafers()
+    test_sketch()
+    test_cpk()
+    test_super_wafer_pad_statistics()
+    print("dimension stats tests passed")
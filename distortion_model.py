@@ -0,0 +1,235 @@
+"""
+Class distortion model fits high-order grid distortion to the positional error vectors of a wafer.
+Two sets of basis terms are available:
+    a. "polynomial": every x^i * y^j with i + j <= order
+    b. "zernike": Zernike polynomials Z(n, m) on the unit disk with radial order n <= order
+Positions are normalized by the wafer radius before the terms are evaluated so all coefficients are in microns
+of error at the edge of the wafer.
+
+Every wafer of a product shares the same nominal layout (the product's XYin file), so the thin SVD of the layout's
+design matrix is cached (for the few most recent layouts) and every wafer picks the rows of its pads from it.  Fitting
+a wafer that kept every site of the layout is then a single matrix product.  A wafer missing pads solves against the
+cached factorization: with B the rows of the layout's left singular vectors at the pads, the fit only needs the
+inverse of the small rank x rank matrix B^T B = I - (rows of the missing sites)^T (rows of the missing sites).
+Directions of the layout the pads cannot resolve (too few pads, pads on a line, ...) are dropped instead of failing,
+so such wafers fit the terms they do support and report the reduced rank.
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import functools
+from math import factorial
+import numpy as np
+
+# number of layouts whose factorization is kept
+LAYOUT_CACHE_SIZE = 8
+# smallest eigenvalue of B^T B (squared singular value of the pads' rows) kept when pads are missing
+SUBSET_TOLERANCE = 1e-10
+
+class distortion_model(object):
+    def __init__(self, nominal_x, nominal_y, order=3, basis="polynomial", radius=None, layout_x=None, layout_y=None):
+        """
+        constructor for the distortion model class.  Looks up the factorization of the layout in the cache,
+        factors the layout if it has not been seen recently and prepares the solve of the pads present.
+
+        :param nominal_x: nominal x positions of wafer bond pads
+        :param nominal_y: nominal y positions of wafer bond pads
+        :param order: highest total degree (polynomial) or radial order (zernike) of the basis terms
+        :param basis: "polynomial" or "zernike"
+        :param radius: radius used to normalize positions, defaults to the distance of the furthest site of the layout
+        :param layout_x: x positions of every site of the product's nominal layout, every pad must be one of its
+                         sites.  Defaults to the pads' own nominal positions.
+        :param layout_y: y positions of every site of the product's nominal layout
+        """
+        assert basis in ("polynomial", "zernike"), "basis must be 'polynomial' or 'zernike'"
+        self.nom_x = np.asarray(nominal_x, dtype=float)
+        self.nom_y = np.asarray(nominal_y, dtype=float)
+        assert self.nom_x.shape == self.nom_y.shape, "lists provided are not of comparable length"
+        if layout_x is None:
+            layout_x, layout_y = self.nom_x, self.nom_y
+        layout_x = np.asarray(layout_x, dtype=float)
+        layout_y = np.asarray(layout_y, dtype=float)
+        if radius is None:
+            radius = np.max(np.hypot(layout_x, layout_y))
+        self.radius = float(radius)
+        self.order = order
+        self.basis = basis
+
+        self.terms, layout_basis, self.to_coefficients, self.rank = \
+            self.factor_layout(layout_x.tobytes(), layout_y.tobytes(), order, basis, self.radius)
+        rows = self.find_rows(layout_x, layout_y)
+        if rows is None:
+            self.pad_basis, self.projection = layout_basis, None
+        else:
+            missing = np.ones(layout_x.size, dtype=bool)
+            missing[rows] = False
+            self.pad_basis = layout_basis[rows]
+            self.projection, self.rank = self.subset_inverse(layout_basis[missing])
+
+    def find_rows(self, layout_x, layout_y):
+        """
+        finds the row of the layout's factorization of every pad
+        :param layout_x: x positions of every site of the layout
+        :param layout_y: y positions of every site of the layout
+        :return: index of the site of every pad, None if the pads are the layout itself
+        """
+        if np.array_equal(layout_x, self.nom_x) and np.array_equal(layout_y, self.nom_y):
+            return None
+        sites = layout_x + 1j * layout_y
+        pads = self.nom_x + 1j * self.nom_y
+        order = np.argsort(sites)
+        rows = order[np.clip(np.searchsorted(sites[order], pads), 0, sites.size - 1)]
+        assert np.array_equal(sites[rows], pads), "pads are not all sites of the layout"
+        return rows
+
+    @staticmethod
+    @functools.lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+    def factor_layout(layout_x, layout_y, order, basis, radius):
+        """
+        factors the design matrix of a layout with a thin SVD (cached for the most recent layouts)
+        :param layout_x: bytes of the float x positions of every site of the layout
+        :param layout_y: bytes of the float y positions of every site of the layout
+        :param order: highest degree / radial order of the terms
+        :param basis: "polynomial" or "zernike"
+        :param radius: radius used to normalize positions
+        :return: [list of term names, left singular vectors (sites x rank), map from the singular vectors to the
+                  term coefficients (terms x rank), rank of the design matrix]
+        """
+        x = np.frombuffer(layout_x) / radius
+        y = np.frombuffer(layout_y) / radius
+        terms, design = distortion_model.build_design(x, y, order, basis)
+        u, singular_values, vt = np.linalg.svd(design, full_matrices=False)
+        tolerance = singular_values[0] * max(design.shape) * np.finfo(float).eps if singular_values.size else 0
+        rank = int(np.sum(singular_values > tolerance))
+        return terms, u[:, :rank], vt[:rank].T / singular_values[:rank], rank
+
+    @staticmethod
+    def subset_inverse(missing_basis):
+        """
+        inverts B^T B = I - M^T M for the pads left when the rows M of the layout's singular vectors are missing,
+        dropping the directions the pads left cannot resolve
+        :param missing_basis: rows of the layout's left singular vectors of the missing sites (missing x rank)
+        :return: [pseudo-inverse of B^T B (rank x rank), number of directions the pads resolve]
+        """
+        gram = np.eye(missing_basis.shape[1]) - missing_basis.T @ missing_basis
+        eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        kept = eigenvalues > SUBSET_TOLERANCE
+        return (eigenvectors[:, kept] / eigenvalues[kept]) @ eigenvectors[:, kept].T, int(np.sum(kept))
+
+    @staticmethod
+    def build_design(x, y, order, basis):
+        """
+        builds the design matrix with one column per basis term evaluated at every (normalized) pad position
+        :param x: normalized x positions
+        :param y: normalized y positions
+        :param order: highest degree / radial order of the terms
+        :param basis: "polynomial" or "zernike"
+        :return: [list of term names, design matrix (pads x terms)]
+        """
+        terms = []
+        columns = []
+        if basis == "polynomial":
+            for degree in np.arange(order + 1):
+                for j in np.arange(degree + 1):
+                    i = degree - j
+                    terms.append(distortion_model.monomial_name(i, j))
+                    columns.append(x ** i * y ** j)
+        else:
+            r = np.hypot(x, y)
+            theta = np.arctan2(y, x)
+            for n in np.arange(order + 1):
+                for m in np.arange(-n, n + 1, 2):
+                    terms.append("Z(" + str(n) + "," + str(m) + ")")
+                    radial = distortion_model.zernike_radial(n, abs(m), r)
+                    if m >= 0:
+                        columns.append(radial * np.cos(m * theta))
+                    else:
+                        columns.append(radial * np.sin(-m * theta))
+        return terms, np.column_stack(columns)
+
+    @staticmethod
+    def monomial_name(i, j):
+        """
+        names the polynomial term x^i * y^j
+        :param i: power of x
+        :param j: power of y
+        :return: name of the term (string), "1" for the constant term
+        """
+        name = ""
+        if i > 0:
+            name += "x" if i == 1 else "x^" + str(i)
+        if j > 0:
+            name += "y" if j == 1 else "y^" + str(j)
+        return name if name else "1"
+
+    @staticmethod
+    def zernike_radial(n, m, r):
+        """
+        evaluates the radial part R(n, m) of a Zernike polynomial
+        :param n: radial order
+        :param m: absolute azimuthal frequency (n - m must be even)
+        :param r: normalized radii
+        :return: R(n, m) evaluated at every radius
+        """
+        radial = np.zeros_like(r)
+        for k in np.arange((n - m) // 2 + 1):
+            coefficient = (-1) ** k * factorial(n - k) / \
+                          (factorial(k) * factorial((n + m) // 2 - k) * factorial((n - m) // 2 - k))
+            radial += coefficient * r ** (n - 2 * k)
+        return radial
+
+    def fit(self, U, V):
+        """
+        fits the distortion model to the error vectors of a wafer (1D, one value per pad) or a stack of wafers
+        sharing the layout (2D, one row per wafer)
+
+        :param U: x components of error vectors
+        :param V: y components of error vectors
+        :return: dictionary containing
+                    1. "terms": names of the basis terms
+                    2. "coefficients_U", "coefficients_V": per-term coefficients of the X and Y errors
+                    3. "residual_U", "residual_V": per-pad errors left after removing the model (residual map)
+                    4. "residual_rms_x", "residual_rms_y": root mean square of the residuals
+        """
+        U = np.asarray(U, dtype=float)
+        V = np.asarray(V, dtype=float)
+        assert U.shape[-1] == V.shape[-1] == self.nom_x.size, "errors do not match the layout of the model"
+        projected_U = U @ self.pad_basis
+        projected_V = V @ self.pad_basis
+        if self.projection is not None:
+            projected_U = projected_U @ self.projection
+            projected_V = projected_V @ self.projection
+        coefficients_U = projected_U @ self.to_coefficients.T
+        coefficients_V = projected_V @ self.to_coefficients.T
+        residual_U = U - projected_U @ self.pad_basis.T
+        residual_V = V - projected_V @ self.pad_basis.T
+        return {"terms": self.terms,
+                "coefficients_U": coefficients_U,
+                "coefficients_V": coefficients_V,
+                "residual_U": residual_U,
+                "residual_V": residual_V,
+                "residual_rms_x": np.sqrt(np.mean(residual_U ** 2, axis=-1)),
+                "residual_rms_y": np.sqrt(np.mean(residual_V ** 2, axis=-1))}
+
+    def plot_residuals(self, residual_U, residual_V, diameter):
+        """
+        plots the residual map (error vectors left after removing the model) of a single wafer as a quiver plot
+        :param residual_U: x components of residual vectors
+        :param residual_V: y components of residual vectors
+        :param diameter: diameter of the wafer
+        :return: figure containing the residual map
+        """
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(figsize=[12, 12])
+        wafer = plt.Circle((0, 0), diameter / 2, color='b', fill=False)
+        residuals = ax.quiver(self.nom_x, self.nom_y, residual_U, residual_V, color='gray')
+        residuals.scale_units = "xy"
+        ax.add_patch(wafer)
+        ax.set_title("Residual Error Vectors after " + self.basis.capitalize() + " Order " + str(self.order) +
+                     " Fit\n**Vector Magnitudes Relative**")
+        ax.set_xlim(-diameter / 1.6, diameter / 1.6)
+        ax.set_ylim(-diameter / 1.6, diameter / 1.6)
+        ax.set_aspect('equal', adjustable='box')
+        fig.tight_layout()
+        return fig
@@ -0,0 +1,87 @@
+"""
+Tester script for class distortion_model
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import numpy as np
+from distortion_model import distortion_model
+
+def make_layout(num_pads, radius=150000, seed=0):
+    """
+    helper that generates random nominal pad positions within the wafer
+    """
+    rng = np.random.default_rng(seed)
+    r = radius * np.sqrt(rng.uniform(0, 1, num_pads))
+    theta = rng.uniform(0, 2 * np.pi, num_pads)
+    return r * np.cos(theta), r * np.sin(theta)
+
+def test_polynomial_recovers_third_order():
+    """
+    third order distortion is fit back exactly and leaves no residual
+    """
+    x, y = make_layout(800)
+    xn, yn = x / 150000, y / 150000
+    U = 0.2 + 0.5 * xn ** 3 - 0.1 * xn * yn ** 2
+    V = -0.3 * yn ** 3
+    result = distortion_model(x, y, 3, "polynomial", 150000).fit(U, V)
+    coefficients = dict(zip(result["terms"], result["coefficients_U"]))
+    assert len(result["terms"]) == 10
+    assert np.isclose(coefficients["1"], 0.2)
+    assert np.isclose(coefficients["x^3"], 0.5)
+    assert np.isclose(coefficients["xy^2"], -0.1)
+    assert np.isclose(dict(zip(result["terms"], result["coefficients_V"]))["y^3"], -0.3)
+    assert result["residual_rms_x"] < 1e-9
+
+def test_zernike_terms():
+    """
+    a single Zernike term (defocus Z(2,0) = 2r^2 - 1) is fit back on its own coefficient
+    """
+    x, y = make_layout(800, seed=1)
+    r = np.hypot(x, y) / 150000
+    U = 0.7 * (2 * r ** 2 - 1)
+    result = distortion_model(x, y, 4, "zernike", 150000).fit(U, np.zeros_like(U))
+    coefficients = dict(zip(result["terms"], result["coefficients_U"]))
+    assert len(result["terms"]) == 15
+    assert np.isclose(coefficients["Z(2,0)"], 0.7)
+    assert np.isclose(coefficients["Z(4,0)"], 0, atol=1e-9)
+
+def test_layout_is_cached():
+    """
+    models of the same layout share one cached factorization, a wafer missing pads solves against it
+    """
+    x, y = make_layout(300, seed=2)
+    first = distortion_model(x, y, 3)
+    second = distortion_model(list(x), list(y), 3)
+    assert first.pad_basis is second.pad_basis and first.to_coefficients is second.to_coefficients
+    # a wafer missing pads uses the rows of the cached layout and fits as a direct least squares of its own pads
+    subset = distortion_model(x[::2], y[::2], 3, layout_x=x, layout_y=y)
+    assert subset.to_coefficients is first.to_coefficients and subset.radius == first.radius
+    U = np.random.default_rng(3).normal(0, 0.05, x.size)[::2]
+    terms, design = distortion_model.build_design(x[::2] / first.radius, y[::2] / first.radius, 3, "polynomial")
+    expected = np.linalg.lstsq(design, U, rcond=None)[0]
+    result = subset.fit(U, np.zeros_like(U))
+    assert np.allclose(result["coefficients_U"], expected)
+    assert np.allclose(result["residual_U"], U - design @ expected)
+
+def test_rank_deficient_layout():
+    """
+    a layout that cannot support every term fits the terms it supports instead of failing
+    """
+    x = np.linspace(-100000, 100000, 50)
+    result = distortion_model(x, np.zeros_like(x), 3, "polynomial", 150000).fit(0.4 * x / 150000, np.zeros_like(x))
+    assert np.allclose(result["residual_U"], 0, atol=1e-9)
+    assert distortion_model(x[:3], x[:3], 3).rank == 3
+    # a wafer left with pads on a line of a full layout loses rank without failing
+    layout_x, layout_y = [grid.ravel() for grid in np.meshgrid(x[::5], x[::5])]
+    line = layout_y == layout_y[0]
+    model = distortion_model(layout_x[line], layout_y[line], 3, layout_x=layout_x, layout_y=layout_y)
+    assert model.rank < len(model.terms)
+
+if __name__ == '__main__':
+    test_polynomial_recovers_third_order()
+    test_zernike_terms()
+    test_layout_is_cached()
+    test_rank_deficient_layout()
+    print("distortion model tests passed")
@@ -0,0 +1,104 @@
+"""
+Class error interpolator predicts positional and dimensional errors at every site of a full wafer layout from the
+errors measured at a sampled-down set of sites (see XYwizard.sample_down), so sparse, fast recipes still give
+full-wafer maps.
+
+Every target site is predicted from its k nearest measured sites only, found with a KD-tree, either by
+    a. inverse distance weighting (idw): weights 1 / distance ** power
+    b. a local radial basis function fit (rbf): an inverse multiquadric interpolant through the k neighbors, solved
+       for all target sites at once as a batch of small k x k systems
+so the cost grows linearly with the number of target sites instead of requiring a dense global solve.
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import numpy as np
+
+class error_interpolator(object):
+    # number of target sites predicted per batch (bounds the memory of the k x k rbf systems)
+    CHUNK_SIZE = 8192
+
+    def __init__(self, site_x, site_y, k=8, method="idw", power=2):
+        """
+        constructor for the error interpolator class.  Builds the KD-tree over the measured sites.
+        :param site_x: x positions of the measured sites
+        :param site_y: y positions of the measured sites
+        :param k: number of nearest measured sites each prediction uses
+        :param method: "idw" for inverse distance weighting or "rbf" for a local radial basis function fit
+        :param power: power of the distance in the inverse distance weights
+        """
+        from sklearn.neighbors import KDTree
+        assert method in ("idw", "rbf"), "method must be 'idw' or 'rbf'"
+        self.site_x = np.asarray(site_x, dtype=float)
+        self.site_y = np.asarray(site_y, dtype=float)
+        assert self.site_x.shape == self.site_y.shape, "lists provided are not of comparable length"
+        self.k = min(k, self.site_x.size)
+        self.method = method
+        self.power = power
+        self.tree = KDTree(np.column_stack([self.site_x, self.site_y]))
+
+    def predict(self, target_x, target_y, values):
+        """
+        predicts the measured values at the target sites
+        :param target_x: x positions of the target sites
+        :param target_y: y positions of the target sites
+        :param values: values at the measured sites, either one per site or a 2D array (sites x metrics)
+        :return: predicted values at the target sites (same number of dimensions as values)
+        """
+        values = np.asarray(values, dtype=float)
+        single = values.ndim == 1
+        if single:
+            values = values[:, np.newaxis]
+        assert values.shape[0] == self.site_x.size, "one value is needed per measured site"
+        targets = np.column_stack([np.asarray(target_x, dtype=float), np.asarray(target_y, dtype=float)])
+        predicted = np.empty((targets.shape[0], values.shape[1]))
+        for start in np.arange(0, targets.shape[0], self.CHUNK_SIZE):
+            chunk = targets[start:start + self.CHUNK_SIZE]
+            distances, neighbors = self.tree.query(chunk, k=self.k)
+            if self.method == "idw":
+                predicted[start:start + len(chunk)] = self.inverse_distance(distances, values[neighbors])
+            else:
+                predicted[start:start + len(chunk)] = self.local_rbf(chunk, neighbors, distances, values[neighbors])
+        return predicted[:, 0] if single else predicted
+
+    def inverse_distance(self, distances, neighbor_values):
+        """
+        inverse distance weighted average of the neighbors of each target site.  Targets that coincide with a
+        measured site take its value.
+        :param distances: distances of the k neighbors of each target (targets x k)
+        :param neighbor_values: values of the k neighbors of each target (targets x k x metrics)
+        :return: predicted values (targets x metrics)
+        """
+        exact = distances[:, 0] == 0
+        with np.errstate(divide='ignore'):
+            weights = 1 / distances ** self.power
+        weights[exact] = 0
+        weights[exact, 0] = 1
+        weights /= weights.sum(axis=1, keepdims=True)
+        return np.einsum('tk,tkm->tm', weights, neighbor_values)
+
+    def local_rbf(self, targets, neighbors, distances, neighbor_values):
+        """
+        fits an inverse multiquadric radial basis function through the k neighbors of each target site and evaluates
+        it at the target.  The neighbors' mean is removed before the fit so predictions away from the neighbors fall
+        back to the local mean.  The shape parameter scales with the neighbor spacing of each target.
+
+        :param targets: positions of the target sites (targets x 2)
+        :param neighbors: indices of the k neighbors of each target (targets x k)
+        :param distances: distances of the k neighbors of each target (targets x k)
+        :param neighbor_values: values of the k neighbors of each target (targets x k x metrics)
+        :return: predicted values (targets x metrics)
+        """
+        points = np.stack([self.site_x[neighbors], self.site_y[neighbors]], axis=-1)
+        scale = distances.max(axis=1)
+        scale[scale == 0] = 1
+        pairwise = np.linalg.norm(points[:, :, np.newaxis, :] - points[:, np.newaxis, :, :], axis=-1)
+        kernel = 1 / np.sqrt(1 + (pairwise / scale[:, np.newaxis, np.newaxis]) ** 2)
+        # a tiny ridge keeps the systems solvable when neighbors nearly coincide
+        kernel += 1e-10 * np.eye(self.k)
+        local_mean = neighbor_values.mean(axis=1, keepdims=True)
+        weights = np.linalg.solve(kernel, neighbor_values - local_mean)
+        to_target = np.linalg.norm(points - targets[:, np.newaxis, :], axis=-1)
+        basis = 1 / np.sqrt(1 + (to_target / scale[:, np.newaxis]) ** 2)
+        return np.einsum('tk,tkm->tm', basis, weights) + local_mean[:, 0, :]
@@ -0,0 +1,50 @@
+"""
+Testing script for the interpolation of errors from sampled-down sites to the full layout
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import time
+import numpy as np
+from error_interpolator import error_interpolator
+
+def smooth_field(x, y):
+    """
+    helper describing a smooth error field (translation, scale, rotation and a little curvature)
+    """
+    return 0.3 + 2e-6 * x - 1e-6 * y + 1e-11 * x * y
+
+def test_exact_at_measured_sites():
+    """
+    both methods return the measured value at measured sites
+    """
+    rng = np.random.default_rng(0)
+    site_x, site_y = rng.uniform(-140000, 140000, (2, 100))
+    for method in ["idw", "rbf"]:
+        interpolator = error_interpolator(site_x, site_y, 8, method)
+        assert np.allclose(interpolator.predict(site_x, site_y, smooth_field(site_x, site_y)),
+                           smooth_field(site_x, site_y), atol=1e-6)
+
+def test_full_layout():
+    """
+    100 sampled sites predict a smooth field at 100k layout sites quickly and well within its spread, and several
+    metrics can be interpolated at once
+    """
+    rng = np.random.default_rng(1)
+    site_x, site_y = rng.uniform(-140000, 140000, (2, 100))
+    target_x, target_y = rng.uniform(-120000, 120000, (2, 100000))
+    truth = smooth_field(target_x, target_y)
+    values = np.column_stack([smooth_field(site_x, site_y), -smooth_field(site_x, site_y)])
+    for method, tolerance in [("idw", 0.1), ("rbf", 0.05)]:
+        start = time.perf_counter()
+        predicted = error_interpolator(site_x, site_y, 8, method).predict(target_x, target_y, values)
+        assert time.perf_counter() - start < 5
+        assert predicted.shape == (100000, 2)
+        assert np.sqrt(np.mean((predicted[:, 0] - truth) ** 2)) < tolerance * np.std(truth)
+        assert np.allclose(predicted[:, 1], -predicted[:, 0])
+
+if __name__ == '__main__':
+    test_exact_at_measured_sites()
+    test_full_layout()
+    print("error interpolator tests passed")
@@ -0,0 +1,58 @@
+"""
+Testing script for the spatial clustering of failed and misread sites
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import time
+import numpy as np
+from failure_clusters import failure_clusters
+
+def test_two_clusters():
+    """
+    a scratch of failures in the middle and a patch of misreads at the edge form two clusters, isolated sites do not
+    """
+    scratch_x = np.arange(10) * 1000.0
+    scratch_y = np.zeros(10)
+    edge_x = 148000 + np.array([0, 1000, 0, 1000])
+    edge_y = np.array([0, 0, 1000, 1000.0])
+    fail_x = np.concatenate([scratch_x, [-100000]])
+    fail_y = np.concatenate([scratch_y, [-50000]])
+    fail_labels, misread_labels, clusters = failure_clusters(300000, 1500).find_clusters(fail_x, fail_y,
+                                                                                          edge_x, edge_y)
+    assert len(clusters) == 2
+    assert fail_labels[-1] == -1
+    scratch = clusters[fail_labels[0]]
+    edge = clusters[misread_labels[0]]
+    assert scratch["count"] == scratch["fails"] == 10 and scratch["misreads"] == 0
+    assert np.isclose(scratch["centroid_x"], 4500) and np.isclose(scratch["radius"], 4500)
+    assert not scratch["edge"]
+    assert edge["misreads"] == 4 and edge["edge"]
+
+def test_no_sites():
+    """
+    wafers without failures or misreads have no clusters
+    """
+    fail_labels, misread_labels, clusters = failure_clusters(300000, 1500).find_clusters([], [], [], [])
+    assert fail_labels.size == misread_labels.size == 0 and clusters == []
+
+def test_many_failures():
+    """
+    thousands of failures are clustered well under a second
+    """
+    rng = np.random.default_rng(0)
+    centers = np.array([(x, y) for x in np.arange(-80000, 80001, 40000) for y in np.arange(-40000, 40001, 40000)])
+    sites = np.concatenate([center + rng.normal(0, 2000, (250, 2)) for center in centers])
+    start = time.perf_counter()
+    fail_labels, misread_labels, clusters = failure_clusters(300000, 1500, 5).find_clusters(
+        sites[:, 0], sites[:, 1], [], [])
+    assert time.perf_counter() - start < 1
+    assert len(clusters) == len(centers)
+    assert sum(cluster["count"] for cluster in clusters) == np.sum(fail_labels >= 0)
+
+if __name__ == '__main__':
+    test_two_clusters()
+    test_no_sites()
+    test_many_failures()
+    print("failure cluster tests passed")
@@ -0,0 +1,98 @@
+"""
+Class gauge rr finds the repeatability and reproducibility of the Nikon measurements of a wafer whose recipe measures
+every site several times (one repeat column per pass in the raw Nikon output).
+
+The passes of every site form one row of a 2D repeats matrix (sites x passes), and all statistics are computed
+vectorized across the matrix in a single pass:
+    a. repeatability (EV): pooled standard deviation of the passes of each site around the site's mean
+    b. reproducibility (AV): spread between appraisers (for example separate recipe runs or operators), if the
+       passes are labeled with the appraiser that made them
+    c. part variation (PV): spread of the site means, corrected for the measurement noise they still contain
+    d. gauge R&R (GRR), total variation (TV), their percentages, the number of distinct categories (ndc) and GRR as a
+       percentage of a tolerance
+Passes read as errors are expected as np.nan and are ignored.
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import numpy as np
+
+class gauge_rr(object):
+    def __init__(self, repeats, appraisers=None):
+        """
+        constructor for the gauge rr class
+        :param repeats: 2D array of measurements, one row per site and one column per pass (np.nan for errors)
+        :param appraisers: label of the appraiser of every pass (None if all passes belong to a single appraiser)
+        """
+        self.repeats = np.asarray(repeats, dtype=float)
+        assert self.repeats.ndim == 2, "repeats must be a 2D array of sites x passes"
+        if appraisers is None:
+            appraisers = np.zeros(self.repeats.shape[1], dtype=int)
+        self.appraisers = np.asarray(appraisers)
+        assert self.appraisers.size == self.repeats.shape[1], "one appraiser label is needed per pass"
+
+    @staticmethod
+    def find_site_statistics(repeats):
+        """
+        finds the number of valid passes, the mean and the variance (ddof = 1) of every site
+        :param repeats: 2D array of measurements, one row per site and one column per pass (np.nan for errors)
+        :return: [valid passes per site, mean per site, variance per site (np.nan for sites with < 2 passes)]
+        """
+        valid = ~np.isnan(repeats)
+        counts = valid.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(valid, repeats, 0).sum(axis=1) / counts
+            squares = np.where(valid, repeats - means[:, np.newaxis], 0) ** 2
+            variances = squares.sum(axis=1) / (counts - 1)
+        variances[counts < 2] = np.nan
+        return counts, means, variances
+
+    def analyze(self, tolerance=None):
+        """
+        analyze computes the gauge R&R statistics of the repeats matrix
+        :param tolerance: width of the tolerance band (upper spec limit - lower spec limit), None to skip %tolerance
+        :return: dictionary of the gauge R&R statistics (standard deviations in the units of the measurements,
+                 percentages of the total variation)
+        """
+        # pooled within-appraiser variance of every site gives the repeatability
+        labels = np.unique(self.appraisers)
+        within_squares = 0.0
+        within_dof = 0
+        appraiser_means = []
+        for label in labels:
+            counts, means, variances = self.find_site_statistics(self.repeats[:, self.appraisers == label])
+            usable = counts >= 2
+            within_squares += np.sum(variances[usable] * (counts[usable] - 1))
+            within_dof += np.sum(counts[usable] - 1)
+            appraiser_means.append(means)
+        ev_squared = within_squares / within_dof if within_dof > 0 else np.nan
+        counts, site_means, site_variances = self.find_site_statistics(self.repeats)
+        measured = counts > 0
+        num_sites = int(np.sum(measured))
+        passes_per_site = np.mean(counts[measured]) if num_sites > 0 else np.nan
+
+        # spread of the appraisers' means over the sites every appraiser measured, less its share of repeatability
+        av_squared = 0.0
+        if labels.size > 1:
+            appraiser_means = np.array(appraiser_means)
+            common = ~np.isnan(appraiser_means).any(axis=0)
+            if np.any(common):
+                passes_per_cell = passes_per_site / labels.size
+                av_squared = max(np.var(appraiser_means[:, common].mean(axis=1), ddof=1) -
+                                 ev_squared / (np.sum(common) * passes_per_cell), 0.0)
+        grr_squared = ev_squared + av_squared
+
+        # spread of the site means, less the measurement noise averaged into each mean
+        pv_squared = np.nan
+        if num_sites > 1:
+            pv_squared = max(np.var(site_means[measured], ddof=1) - ev_squared / passes_per_site, 0.0)
+        tv = np.sqrt(grr_squared + pv_squared)
+        ev, av, grr, pv = np.sqrt(ev_squared), np.sqrt(av_squared), np.sqrt(grr_squared), np.sqrt(pv_squared)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            results = {"sites": num_sites, "passes": self.repeats.shape[1], "EV": ev, "AV": av, "GRR": grr, "PV": pv,
+                       "TV": tv, "%EV": 100 * ev / tv, "%AV": 100 * av / tv, "%GRR": 100 * grr / tv,
+                       "ndc": np.floor(1.41 * pv / grr) if grr > 0 else np.nan}
+        if tolerance is not None:
+            results["%tolerance"] = 100 * 6 * grr / tolerance
+        return results
@@ -0,0 +1,82 @@
+"""
+Testing script for the gauge R&R analysis of repeat columns of Nikon outputs
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import os
+import tempfile
+import numpy as np
+from gauge_rr import gauge_rr
+from cleaner import Cleaner
+
+def test_repeatability():
+    """
+    pooled repeatability and part variation recover the spreads the measurements were simulated with
+    """
+    rng = np.random.default_rng(0)
+    parts = rng.normal(0, 2.0, 2000)
+    repeats = parts[:, np.newaxis] + rng.normal(0, 0.5, (2000, 4))
+    results = gauge_rr(repeats).analyze(tolerance=30)
+    assert np.isclose(results["EV"], 0.5, rtol=0.05)
+    assert np.isclose(results["PV"], 2.0, rtol=0.05)
+    assert results["AV"] == 0
+    assert np.isclose(results["%GRR"], 100 * results["GRR"] / results["TV"])
+    assert np.isclose(results["%tolerance"], 100 * 6 * results["GRR"] / 30)
+
+def test_missing_passes():
+    """
+    failed passes (np.nan) are ignored and sites with a single valid pass do not count towards repeatability
+    """
+    repeats = np.array([[1.0, 2.0, 3.0], [5.0, np.nan, 7.0], [4.0, np.nan, np.nan]])
+    counts, means, variances = gauge_rr.find_site_statistics(repeats)
+    assert np.array_equal(counts, [3, 2, 1])
+    assert np.allclose(means, [2, 6, 4])
+    assert np.allclose(variances[:2], [1, 2]) and np.isnan(variances[2])
+    assert np.isclose(gauge_rr(repeats).analyze()["EV"], np.sqrt((1 * 2 + 2 * 1) / 3))
+
+def test_reproducibility():
+    """
+    an offset between appraisers shows up as reproducibility
+    """
+    rng = np.random.default_rng(1)
+    parts = rng.normal(0, 1.0, 500)
+    repeats = parts[:, np.newaxis] + rng.normal(0, 0.1, (500, 4))
+    repeats[:, 2:] += 0.5
+    results = gauge_rr(repeats, appraisers=[0, 0, 1, 1]).analyze()
+    assert np.isclose(results["EV"], 0.1, rtol=0.1)
+    assert np.isclose(results["AV"], 0.5 / np.sqrt(2), rtol=0.1)
+
+def test_cleaner_repeats():
+    """
+    Cleaner reads every repeat column in pass order, with errors as np.nan
+    """
+    rows = ["Site,Item,,Nominal,1,2,10",
+            "0,pos,X,100,100.1,100.2,100.3",
+            "0,pos,Y,200,200.1,9999.9999,200.3",
+            "0,w,HW_L1,75,75.1,75.2,75.3",
+            "0,w,VW_L2,95,95.1,95.2,95.3",
+            "1,pos,X,300,9999.9999,9999.9999,9999.9999",
+            "1,pos,Y,400,9999.9999,9999.9999,9999.9999",
+            "1,w,HW_L1,75,9999.9999,9999.9999,9999.9999",
+            "1,w,VW_L2,95,9999.9999,9999.9999,9999.9999"]
+    with tempfile.TemporaryDirectory() as path:
+        filename = os.path.join(path, "wafer.csv")
+        with open(filename, 'w') as csv_file:
+            csv_file.write("\n".join(rows) + "\n")
+        cleaner = Cleaner(filename)
+        assert cleaner.find_repeat_columns() == ['1', '2', '10']
+        nom_X, nom_Y, X_repeats, Y_repeats = cleaner.extract_XY_repeats()
+        assert nom_X == [100]
+        assert np.allclose(X_repeats, [[100.1, 100.2, 100.3]])
+        assert np.isnan(Y_repeats[0, 1])
+        X_widths, Y_widths = cleaner.extract_width_repeats()
+        assert X_widths.shape == Y_widths.shape == (1, 3)
+
+if __name__ == '__main__':
+    test_repeatability()
+    test_missing_passes()
+    test_reproducibility()
+    test_cleaner_repeats()
+    print("gauge R&R tests passed")
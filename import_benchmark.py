@@ -0,0 +1,47 @@
+"""
+Benchmark script that measures how long it takes a fresh interpreter to import each analysis module, and which of the
+heavy libraries (matplotlib.pyplot, pandas, sklearn) each import drags in.
+Every module is imported in its own python process several times and the fastest time is kept.
+The last line imports the heavy libraries eagerly for reference: the difference to each module's time is the
+startup cost saved by only loading those libraries on the code paths that need them.
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import subprocess
+import sys
+
+MODULES = ["cleaner", "positional_analyzer", "super_wafer_pad", "overlay_model", "distortion_model", "site_matcher",
+           "results_store", "Writer", "XYwizard", "vectorProcessor", "outlierAnalyzer", "mutliVector"]
+HEAVY_LIBRARIES = ["matplotlib.pyplot", "pandas", "sklearn"]
+REPEATS = 5
+
+def time_import(statement):
+    """
+    imports a statement in fresh interpreters and reports the fastest import time
+    :param statement: import statement to be timed
+    :return: [fastest import time in milliseconds, list of heavy libraries loaded by the import]
+    """
+    code = ("import sys, time\n"
+            "start = time.perf_counter()\n" +
+            statement + "\n"
+            "elapsed = (time.perf_counter() - start) * 1000\n"
+            "print(elapsed)\n"
+            "print(','.join(m for m in " + repr(HEAVY_LIBRARIES) + " if m in sys.modules))\n")
+    best = None
+    loaded = []
+    for i in range(REPEATS):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        elapsed, libraries = output.split("\n")[:2]
+        best = float(elapsed) if best is None else min(best, float(elapsed))
+        loaded = [library for library in libraries.split(",") if library]
+    return best, loaded
+
+if __name__ == '__main__':
+    print("{:<24}{:>12}   {}".format("module", "import ms", "heavy libraries loaded"))
+    for module in MODULES:
+        elapsed, loaded = time_import("import " + module)
+        print("{:<24}{:>12.1f}   {}".format(module, elapsed, ", ".join(loaded) if loaded else "-"))
+    elapsed, loaded = time_import("import numpy, pandas, matplotlib.pyplot, sklearn.decomposition")
+    print("{:<24}{:>12.1f}   {}".format("(eager reference)", elapsed, ", ".join(loaded)))
@@ -0,0 +1,107 @@
+"""
+Class lot fingerprints decomposes the mean-adjusted error fields of all wafers of a lot into a few dominant
+systematic distortion "fingerprints" and the loading of every wafer on each of them.
+
+Every wafer in a wafer stack (see wafer_stack) is one row of the lot matrix [U_mean_adj of every site,
+V_mean_adj of every site].  Rows are centered by the per-site mean of the lot (unmeasured sites are filled with the
+mean, so they add nothing) and factored with a randomized truncated SVD:
+    1. the range of the matrix is sampled by multiplying it with a random matrix, sharpened by a few power iterations
+    2. the sample is orthonormalized and the matrix is projected onto it
+    3. the small projected matrix is factored exactly
+Every step only needs products of the matrix with thin matrices, which are accumulated over blocks of wafers read
+from the stack, so thousands of wafers x tens of thousands of sites never have to fit in memory at once.
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import numpy as np
+
+class lot_fingerprints(object):
+    # wafers read from the stack at a time
+    BLOCK_WAFERS = 256
+
+    def __init__(self, stack, components=3, oversampling=10, power_iterations=2, seed=0):
+        """
+        constructor for the lot fingerprints class
+        :param stack: wafer_stack of the lot (must contain the U_mean_adj and V_mean_adj metrics)
+        :param components: number of fingerprints to extract
+        :param oversampling: number of extra random directions sampled beyond the number of components
+        :param power_iterations: number of power iterations (more iterations separate close singular values better)
+        :param seed: seed of the random sampling matrix
+        """
+        self.stack = stack
+        self.columns = [stack.meta["metrics"].index("U_mean_adj"), stack.meta["metrics"].index("V_mean_adj")]
+        self.num_wafers = len(stack)
+        self.num_sites = stack.site_x.size
+        self.components = min(components, self.num_wafers, 2 * self.num_sites)
+        self.rank = min(self.components + oversampling, self.num_wafers, 2 * self.num_sites)
+        self.power_iterations = power_iterations
+        self.seed = seed
+        counts, means, stds, frequency = stack.find_site_statistics()
+        # per-site mean of the lot, 0 at sites never measured
+        self.center = np.nan_to_num(means[:, self.columns].T.ravel())
+
+    def read_rows(self, start, stop):
+        """
+        reads the centered lot matrix rows of a block of wafers
+        :param start: row of the first wafer of the block
+        :param stop: row after the last wafer of the block
+        :return: rows of the block (wafers x 2 * sites), [U_mean_adj of every site, V_mean_adj of every site]
+        """
+        block = np.asarray(self.stack.data[start:stop][:, :, self.columns], dtype=float)
+        rows = block.transpose(0, 2, 1).reshape(stop - start, 2 * self.num_sites) - self.center
+        rows[np.isnan(rows)] = 0
+        return rows
+
+    def blocks(self):
+        """
+        :return: generator of (first row, last row + 1, centered rows) over blocks of BLOCK_WAFERS wafers
+        """
+        for start in np.arange(0, self.num_wafers, self.BLOCK_WAFERS):
+            stop = min(start + self.BLOCK_WAFERS, self.num_wafers)
+            yield start, stop, self.read_rows(start, stop)
+
+    def decompose(self):
+        """
+        extracts the fingerprints of the lot
+        :return: dictionary containing
+                    1. "wafers": names of the wafers in row order
+                    2. "singular_values": singular value of every fingerprint
+                    3. "explained_variance": fraction of the lot's total variation each fingerprint explains
+                    4. "loadings": loading of every wafer on every fingerprint (wafers x components)
+                    5. "fingerprints_U", "fingerprints_V": x and y components of every fingerprint at every site
+                       (components x sites), each fingerprint has unit length
+        """
+        rng = np.random.default_rng(self.seed)
+        omega = rng.standard_normal((2 * self.num_sites, self.rank))
+
+        # samples the range of the lot matrix, Y = A omega
+        sample = np.empty((self.num_wafers, self.rank))
+        total = 0
+        for start, stop, rows in self.blocks():
+            sample[start:stop] = rows @ omega
+            total += np.sum(rows ** 2)
+        # power iterations, Y = A (A^T Y), orthonormalizing in between to keep precision
+        for i in np.arange(self.power_iterations):
+            sample = np.linalg.qr(sample)[0]
+            projected = np.zeros((2 * self.num_sites, self.rank))
+            for start, stop, rows in self.blocks():
+                projected += rows.T @ sample[start:stop]
+            projected = np.linalg.qr(projected)[0]
+            for start, stop, rows in self.blocks():
+                sample[start:stop] = rows @ projected
+        basis = np.linalg.qr(sample)[0]
+
+        # projects the lot matrix onto the sampled range, B = Q^T A, and factors the small matrix exactly
+        small = np.zeros((self.rank, 2 * self.num_sites))
+        for start, stop, rows in self.blocks():
+            small += basis[start:stop].T @ rows
+        left, singular_values, right = np.linalg.svd(small, full_matrices=False)
+        k = self.components
+        loadings = (basis @ left[:, :k]) * singular_values[:k]
+        fingerprints = right[:k]
+        return {"wafers": list(self.stack.meta["wafers"]), "singular_values": singular_values[:k],
+                "explained_variance": singular_values[:k] ** 2 / total if total > 0 else np.zeros(k),
+                "loadings": loadings, "fingerprints_U": fingerprints[:, :self.num_sites],
+                "fingerprints_V": fingerprints[:, self.num_sites:]}
@@ -0,0 +1,65 @@
+"""
+Testing script for the fingerprint decomposition of the error fields of a lot
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import tempfile
+import numpy as np
+from wafer_stack import wafer_stack
+from lot_fingerprints import lot_fingerprints
+
+def make_lot(path, num_wafers, rng):
+    """
+    helper stacking a lot whose error fields are a mix of a magnification and a rotation fingerprint plus noise, with
+    a few pads missing on every wafer
+    """
+    site_x, site_y = [grid.ravel() for grid in np.meshgrid(np.arange(-10, 10) * 7000.0, np.arange(-10, 10) * 7000.0)]
+    stack = wafer_stack.create(path, site_x, site_y, ["U_mean_adj", "V_mean_adj"])
+    loadings = rng.normal(0, [3, 1], (num_wafers, 2))
+    for i in np.arange(num_wafers):
+        u = 1e-5 * (loadings[i, 0] * site_x - loadings[i, 1] * site_y) + rng.normal(0, 0.01, site_x.size)
+        v = 1e-5 * (loadings[i, 0] * site_y + loadings[i, 1] * site_x) + rng.normal(0, 0.01, site_x.size)
+        measured = rng.permutation(site_x.size)[:site_x.size - 5]
+        stack.add_wafer(str(i), site_x[measured], site_y[measured], {"U_mean_adj": u[measured],
+                                                                     "V_mean_adj": v[measured]})
+    return stack, site_x, site_y
+
+def test_matches_dense_svd():
+    """
+    the blockwise randomized decomposition matches the exact SVD of the centered lot matrix
+    """
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as path:
+        stack, site_x, site_y = make_lot(path, 60, rng)
+        fingerprints = lot_fingerprints(stack, 2)
+        fingerprints.BLOCK_WAFERS = 7
+        result = fingerprints.decompose()
+        dense = np.vstack([fingerprints.read_rows(i, i + 1) for i in np.arange(60)])
+        exact_values = np.linalg.svd(dense, compute_uv=False)
+        assert np.allclose(result["singular_values"], exact_values[:2], rtol=1e-3)
+        assert np.sum(result["explained_variance"]) > 0.95
+        # the dominant fingerprint is the magnification pattern
+        magnification = np.concatenate([site_x, site_y]) / np.linalg.norm(np.concatenate([site_x, site_y]))
+        first = np.concatenate([result["fingerprints_U"][0], result["fingerprints_V"][0]])
+        assert abs(first @ magnification) > 0.99
+        assert result["loadings"].shape == (60, 2)
+        # the loadings are the projections of every wafer onto the fingerprints
+        projections = dense @ np.hstack([result["fingerprints_U"], result["fingerprints_V"]]).T
+        assert np.allclose(result["loadings"], projections, atol=1e-6)
+
+def test_few_wafers():
+    """
+    lots with fewer wafers than requested fingerprints are decomposed into as many fingerprints as wafers
+    """
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as path:
+        stack, site_x, site_y = make_lot(path, 2, rng)
+        result = lot_fingerprints(stack, 5).decompose()
+        assert result["loadings"].shape == (2, 2) and result["fingerprints_U"].shape == (2, site_x.size)
+
+if __name__ == '__main__':
+    test_matches_dense_svd()
+    test_few_wafers()
+    print("lot fingerprint tests passed")
@@ -6,159 +6,1014 @@ Call this method when usage is necessary.
 
 Author: Sean Lin
 Date Created: 7/8/21
-Last Modified: 8/06/21
+Last Modified: 10/19/26
 """
 import os
+import io
 import shutil
+import datetime
+import numpy as np
 import matplotlib.pyplot as plt
 import csv
+import json
 from cleaner import Cleaner
 from positional_analyzer import positional_analyzer
+from overlay_model import overlay_model
+from distortion_model import distortion_model
 from super_wafer_pad import  super_wafer_pad
 from Writer import Writer
+from results_store import results_store
+from site_matcher import site_matcher
+from build_manifest import build_manifest
+from dimension_stats import dimension_stats
+from gauge_rr import gauge_rr
+from failure_clusters import failure_clusters
+from error_interpolator import error_interpolator
+from wafer_stack import wafer_stack
+from lot_fingerprints import lot_fingerprints
+from spc_tracker import spc_tracker
 
-if __name__ == '__main__':
-    # Navigating to the folder "Nikon_Outputs"
-    home_dir = os.getcwd()
-    Nikon_output_dir = home_dir + "/Nikon_Outputs"
-    processed_dir = home_dir + "/PROCESSED_DATA&PLOTS"
-    os.chdir(Nikon_output_dir)
+# diameter of the wafers in microns
+WAFER_DIAMETER = 300000
+
+# name of the SQLite database (in the home directory) that results of every wafer are stored in.
+# set to None to skip writing results to the database.
+RESULTS_DATABASE = None
+
+# highest order of the high-order distortion model fit to the positional errors ("polynomial" or "zernike" basis).
+# set to None to skip the distortion model fit.
+DISTORTION_ORDER = None
+DISTORTION_BASIS = "polynomial"
+
+# largest distance (microns) between a measured pad and a nominal site for the two to be paired.  The nominal sites
+# are read from the XYin file in the wafer folder (or taken from the Nikon output if there is none).
+# set to None to pair nominal and measured positions by row order of the Nikon output.
+MATCH_TOLERANCE = None
+
+# width (microns) of the grid cells error vectors are averaged over in the error vector field plot, and whether to
+# shade the cells by mean error magnitude.  set FIELD_BIN_SIZE to None to draw one arrow per pad.
+FIELD_BIN_SIZE = None
+FIELD_HEATMAP = False
+
+# width (microns) of the grid cells per-pad metrics (positional error, width errors, model residuals) are averaged over
+# in the wafer maps (WAFER_MAP.png and WAFER_MAP.csv).  set to None to skip the wafer maps.
+WAFER_MAP_CELL_SIZE = None
+
+# number of nearest measured sites used to interpolate errors to every site of the full layout (the
+# "_full_layout_XYin.csv" main_XYin writes when sampling down, placed in the wafer folder), and the interpolation
+# method ("idw" for inverse distance weighting or "rbf" for a local radial basis function fit).  Interpolated errors
+# are written to INTERPOLATED.csv (and INTERPOLATED_MAP.png if WAFER_MAP_CELL_SIZE is set).
+# set INTERPOLATION_NEIGHBORS to None to skip interpolation.
+INTERPOLATION_NEIGHBORS = None
+INTERPOLATION_METHOD = "idw"
+
+# incremental mode records what every wafer's outputs were built from in a manifest and skips wafers whose outputs
+# are current.  Raw Nikon outputs are copied (not moved) into the output folders so that reruns stay idempotent.
+INCREMENTAL = False
+
+# pipelined mode overlaps the three stages of processing a lot: a reader thread loads and cleans upcoming wafers,
+# the main thread analyzes them, and a pool of writer threads encodes the pngs and writes the csv files.
+# PIPELINE_DEPTH is the number of wafers buffered between stages (bounds memory use), PIPELINE_WRITERS the number
+# of writer threads.
+PIPELINE = False
+PIPELINE_DEPTH = 2
+PIPELINE_WRITERS = 2
+
+# pad width tolerance (+/- microns around the nominal pad size) that Cpk of the pad dimensions is computed against.
+# set to None to skip Cpk.
+PAD_WIDTH_TOLERANCE = None
+
+# number of bins (between 50% and 150% of the nominal pad size) of the histogram sketches the pad dimensions of every
+# wafer are summarized in.  The sketches of all wafers of a lot are merged into the lot summary.
+DIMENSION_SKETCH_BINS = 2000
+
+# largest distance (microns) between neighboring failed or misread sites for them to be grouped into a cluster, and
+# the smallest number of sites that forms a cluster.  Clusters are written to FAILURE_CLUSTERS.csv.
+# set FAILURE_CLUSTER_DISTANCE to None to skip clustering.
+FAILURE_CLUSTER_DISTANCE = None
+FAILURE_CLUSTER_MIN_COUNT = 3
+
+# folder (in the home directory) the per-lot wafer stacks are kept in.  The per-pad errors and widths of every wafer
+# are added to its lot's stack, aligned by site, and per-site statistics across the lot are written to
+# <lot>_SITE_STATISTICS.csv.  set to None to skip stacking.
+WAFER_STACK_DIR = None
+
+# number of systematic distortion fingerprints extracted from the mean-adjusted error fields of every lot's wafer
+# stack (needs WAFER_STACK_DIR).  Fingerprints and the loading of every wafer on them are written to
+# <lot>_FINGERPRINTS.csv and <lot>_FINGERPRINTS.png.  set to None to skip the decomposition.
+LOT_FINGERPRINTS = None
+
+# name of the json file (in the home directory) the statistical process control charts of every product are kept in.
+# The first SPC_BASELINE_WAFERS wafers of a product set its baseline, later wafers are charted (EWMA and CUSUM) for
+# every result in SPC_METRICS, written to <wafer>_SPC.csv and flagged as soon as they are processed if out of control.
+# set SPC_STATE_FILE to None to skip process control.
+SPC_STATE_FILE = None
+SPC_BASELINE_WAFERS = 20
+SPC_METRICS = ["X bias", "Y bias", "Overlay X scale", "Overlay Y scale",
+               "Positional X error vs X reference regression slope",
+               "Positional Y error vs Y reference regression slope"]
+
+def identify_wafer(folder, name):
+    """
+    determines the lot and product of a wafer from where its raw Nikon output lives.
+    Wafer sub-folders within "Nikon_Outputs" are treated as lots, and the product is the part of the file name
+    before the first underscore (for example "9574A1" for "9574A1_Golden_Wafer_Nikon_out_2.1.csv").
+
+    :param folder: name of the wafer sub-folder the raw Nikon output was found in
+    :param name: name of the raw Nikon output file without its extension
+    :return: wafer name, lot, product (3 strings)
+    """
+    return name, folder, name.split("_")[0]
+
+def analysis_parameters():
+    """
+    collects every setting that changes the outputs of a wafer or where they are recorded (results database, SPC state,
+    wafer stacks), so that incremental runs rebuild wafers when any of them change
+    :return: dictionary of analysis parameters
+    """
+    return {"WAFER_DIAMETER": WAFER_DIAMETER, "DISTORTION_ORDER": DISTORTION_ORDER,
+            "DISTORTION_BASIS": DISTORTION_BASIS, "MATCH_TOLERANCE": MATCH_TOLERANCE,
+            "FIELD_BIN_SIZE": FIELD_BIN_SIZE, "FIELD_HEATMAP": FIELD_HEATMAP,
+            "WAFER_MAP_CELL_SIZE": WAFER_MAP_CELL_SIZE,
+            "PAD_WIDTH_TOLERANCE": PAD_WIDTH_TOLERANCE, "DIMENSION_SKETCH_BINS": DIMENSION_SKETCH_BINS,
+            "FAILURE_CLUSTER_DISTANCE": FAILURE_CLUSTER_DISTANCE,
+            "FAILURE_CLUSTER_MIN_COUNT": FAILURE_CLUSTER_MIN_COUNT,
+            "INTERPOLATION_NEIGHBORS": INTERPOLATION_NEIGHBORS, "INTERPOLATION_METHOD": INTERPOLATION_METHOD,
+            "RESULTS_DATABASE": RESULTS_DATABASE, "WAFER_STACK_DIR": WAFER_STACK_DIR,
+            "SPC_STATE_FILE": SPC_STATE_FILE, "SPC_METRICS": SPC_METRICS, "SPC_BASELINE_WAFERS": SPC_BASELINE_WAFERS}
+
+def spec_limits(nominal):
+    """
+    :param nominal: nominal pad dimension
+    :return: [lower spec limit, upper spec limit] of the pad dimension (None, None if no tolerance is set)
+    """
+    if PAD_WIDTH_TOLERANCE is None:
+        return None, None
+    return nominal - PAD_WIDTH_TOLERANCE, nominal + PAD_WIDTH_TOLERANCE
+
+def sketch_dimensions(nominal, dims):
+    """
+    summarizes pad dimensions in a histogram sketch that can be merged with the sketches of other wafers.  Without a
+    nominal pad dimension (nominal of 0) there is no range to bin, so every dimension is kept instead.
+    :param nominal: nominal pad dimension
+    :param dims: list of measured pad dimensions
+    :return: dimension_stats
+    """
+    if not nominal > 0:
+        stats = dimension_stats()
+        stats.update(dims)
+        return stats
+    stats = dimension_stats(np.linspace(0.5 * nominal, 1.5 * nominal, DIMENSION_SKETCH_BINS + 1))
+    stats.update(dims)
+    return stats
+
+def find_wafer_sites(wafer):
+    """
+    :param wafer: dictionary of the cleaned wafer data (see load_wafer)
+    :return: [x positions, y positions] of every nominal site of the wafer (measured, misread and failed pads)
+    """
+    return np.unique(np.column_stack(
+        [np.concatenate([wafer["nom_X_pos"], wafer["misread_nom_X_pos"], wafer["X_fail_locations"]]),
+         np.concatenate([wafer["nom_Y_pos"], wafer["misread_nom_Y_pos"], wafer["Y_fail_locations"]])]), axis=0).T
+
+def find_layout_file(wafer_dir, files):
+    """
+    finds the XYin layout file used to match pads to nominal sites, if site matching is enabled
+    :param wafer_dir: path of the wafer folder
+    :param files: names of all files in the wafer folder
+    :return: path of the layout file, or None if site matching is disabled or the folder has no layout file
+    """
+    if MATCH_TOLERANCE is None:
+        return None
+    layout_files = [f for f in files if f.__contains__("XYin") and not f.__contains__("_full_layout_XYin")]
+    if len(layout_files) == 0:
+        return None
+    return os.path.join(wafer_dir, sorted(layout_files)[0])
+
+def find_full_layout_file(wafer_dir, files):
+    """
+    finds the full layout file errors are interpolated to, if interpolation is enabled
+    :param wafer_dir: path of the wafer folder
+    :param files: names of all files in the wafer folder
+    :return: path of the full layout file, or None if interpolation is disabled or the folder has no full layout
+    """
+    if INTERPOLATION_NEIGHBORS is None:
+        return None
+    layout_files = [f for f in files if f.__contains__("_full_layout_XYin")]
+    if len(layout_files) == 0:
+        return None
+    return os.path.join(wafer_dir, sorted(layout_files)[0])
+
+def load_wafer(wafer_dir, file_name, layout_file, full_layout_file=None):
+    """
+    reads a raw Nikon output, cleans it, pairs measured pads with nominal sites and removes outliers
+    :param wafer_dir: path of the wafer folder the raw Nikon output is in
+    :param file_name: name of the raw Nikon output file
+    :param layout_file: path of the XYin layout file to match pads against (None to use the Nikon output itself)
+    :param full_layout_file: path of the full layout file to interpolate errors to (None to skip interpolation)
+    :return: dictionary of the cleaned wafer data
+    """
+    # READING IN THE DATA CSV FILE and letting the cleaner class work
+    cleaner = Cleaner(os.path.join(wafer_dir, file_name))
+    nom_X_dims, nom_Y_dims = cleaner.get_nominal_pad_sizes()
+    nom_X_pos, nom_Y_pos, meas_X_pos, meas_Y_pos = cleaner.extract_XY()
+    meas_X_dims, meas_Y_dims = cleaner.extract_widths()
+    wafer = {"name": file_name[:len(file_name) - 4], "wafer_dir": wafer_dir,
+             "nom_X_dims": nom_X_dims, "nom_Y_dims": nom_Y_dims,
+             "X_fail_locations": cleaner.get_X_fails(), "Y_fail_locations": cleaner.get_Y_fails()}
+
+    if full_layout_file is not None:
+        wafer["full_layout_X"], wafer["full_layout_Y"] = site_matcher.read_layout(full_layout_file)
+
+    # keeps every pass of every site when the recipe measures each site several times (for gauge R&R)
+    if len(cleaner.find_repeat_columns()) > 1:
+        repeat_nom_X, repeat_nom_Y, X_pos_repeats, Y_pos_repeats = cleaner.extract_XY_repeats()
+        wafer["X_pos_repeats"] = X_pos_repeats - np.asarray(repeat_nom_X, dtype=float)[:, np.newaxis]
+        wafer["Y_pos_repeats"] = Y_pos_repeats - np.asarray(repeat_nom_Y, dtype=float)[:, np.newaxis]
+        wafer["X_dim_repeats"], wafer["Y_dim_repeats"] = cleaner.extract_width_repeats()
+
+    # pairs every measured pad with its nearest nominal site instead of relying on row order
+    if MATCH_TOLERANCE is not None:
+        if layout_file is not None:
+            site_X_pos, site_Y_pos = site_matcher.read_layout(layout_file)
+        else:
+            site_X_pos, site_Y_pos = np.unique(np.column_stack([nom_X_pos, nom_Y_pos]), axis=0).T
+        site_X_pos = np.asarray(site_X_pos)
+        site_Y_pos = np.asarray(site_Y_pos)
+        matcher = site_matcher(site_X_pos, site_Y_pos)
+        sites, unmatched, duplicates, unmeasured = matcher.match(meas_X_pos, meas_Y_pos, MATCH_TOLERANCE)
+        # the cleaner already removed failed pads, their sites are reported as failures rather than unmeasured
+        failed_sites = matcher.match(wafer["X_fail_locations"], wafer["Y_fail_locations"], MATCH_TOLERANCE)[0]
+        unmeasured = np.setdiff1d(unmeasured, failed_sites)
+        print(str(len(unmatched)) + " unmatched, " + str(len(duplicates)) + " duplicate and " +
+              str(len(unmeasured)) + " unmeasured sites found while matching")
+        not_paired = np.concatenate([unmatched, duplicates]).astype(int)
+        wafer["unpaired_X_pos"] = np.asarray(meas_X_pos)[not_paired].tolist()
+        wafer["unpaired_Y_pos"] = np.asarray(meas_Y_pos)[not_paired].tolist()
+        wafer["unmeasured_X_pos"] = site_X_pos[unmeasured].tolist()
+        wafer["unmeasured_Y_pos"] = site_Y_pos[unmeasured].tolist()
+        wafer["num_unmatched"] = len(unmatched)
+        wafer["num_duplicates"] = len(duplicates)
+        if layout_file is not None:
+            # the product's layout keys the cached factorization of the distortion model
+            wafer["layout_X"], wafer["layout_Y"] = site_X_pos, site_Y_pos
+        paired = sites >= 0
+        nom_X_pos = site_X_pos[sites[paired]].tolist()
+        nom_Y_pos = site_Y_pos[sites[paired]].tolist()
+        meas_X_pos = np.asarray(meas_X_pos)[paired].tolist()
+        meas_Y_pos = np.asarray(meas_Y_pos)[paired].tolist()
+        meas_X_dims = np.asarray(meas_X_dims)[paired].tolist()
+        meas_Y_dims = np.asarray(meas_Y_dims)[paired].tolist()
+
+    meas_X_dims, meas_Y_dims, meas_X_pos, meas_Y_pos, nom_X_pos, nom_Y_pos, \
+    misread_X_dims, misread_Y_dims, misread_X_pos, misread_Y_pos, misread_nom_X_pos, \
+    misread_nom_Y_pos = cleaner.remove_outliers(meas_X_dims, meas_Y_dims, meas_X_pos, meas_Y_pos,
+                                                nom_X_pos, nom_Y_pos)
+    wafer.update({"meas_X_dims": meas_X_dims, "meas_Y_dims": meas_Y_dims, "meas_X_pos": meas_X_pos,
+                  "meas_Y_pos": meas_Y_pos, "nom_X_pos": nom_X_pos, "nom_Y_pos": nom_Y_pos,
+                  "misread_X_dims": misread_X_dims, "misread_Y_dims": misread_Y_dims, "misread_X_pos": misread_X_pos,
+                  "misread_Y_pos": misread_Y_pos, "misread_nom_X_pos": misread_nom_X_pos,
+                  "misread_nom_Y_pos": misread_nom_Y_pos})
+    return wafer
+
+def csv_text(rows_function):
+    """
+    renders the rows written by rows_function into the text of a csv file
+    :param rows_function: function taking a csv writer and a Writer and writing rows with them
+    :return: contents of the csv file (string)
+    """
+    buffer = io.StringIO()
+    rows_function(csv.writer(buffer, quoting=csv.QUOTE_ALL), Writer())
+    return buffer.getvalue()
+
+def analyze_wafer(wafer):
+    """
+    runs every analysis on a cleaned wafer and builds its figures and csv files in memory
+    :param wafer: dictionary of the cleaned wafer data (see load_wafer)
+    :return: dictionary containing
+                1. "figures": {output file name: matplotlib figure}
+                2. "tables": {output file name: contents of the csv file}
+                3. "scalars": {scalar result name: value}
+                4. "pads": {per-pad column: list of per-pad values}
+                5. "stack": {wafer stack metric: list of per-pad values}
+    """
+    name = wafer["name"]
+    nom_X_dims, nom_Y_dims = wafer["nom_X_dims"], wafer["nom_Y_dims"]
+    X_fail_locations, Y_fail_locations = wafer["X_fail_locations"], wafer["Y_fail_locations"]
+    nom_X_pos, nom_Y_pos = wafer["nom_X_pos"], wafer["nom_Y_pos"]
+    meas_X_pos, meas_Y_pos = wafer["meas_X_pos"], wafer["meas_Y_pos"]
+    meas_X_dims, meas_Y_dims = wafer["meas_X_dims"], wafer["meas_Y_dims"]
+    figures = {}
+    tables = {}
+
+    # analyzes global wafer pad positions
+    pa = positional_analyzer(WAFER_DIAMETER, nom_X_pos, nom_Y_pos, meas_X_pos, meas_Y_pos)
+    U, V, U_mean_adj, V_mean_adj = pa.find_vectors()
+    figures[name + "_ERR_VECTORS.png"] = pa.plot_field(U, V, U_mean_adj, V_mean_adj, X_fail_locations,
+                                                       Y_fail_locations, wafer["misread_nom_X_pos"],
+                                                       wafer["misread_nom_Y_pos"], FIELD_BIN_SIZE, FIELD_HEATMAP)
+    p_xvx_reg, p_yvy_reg, p_xvy_reg, p_yvx_reg, figures[name + "_ERR_POSITIONS.png"] = pa.plot_errors(
+        U_mean_adj, V_mean_adj, "positional error")
+    # fits the linear overlay model (translation, scale, rotation, non-orthogonality) to all pads
+    overlay = overlay_model(nom_X_pos, nom_Y_pos).fit(U, V)
+
+    # fits the high-order distortion model and saves its coefficients and residual map
+    if DISTORTION_ORDER is not None:
+        dm = distortion_model(nom_X_pos, nom_Y_pos, DISTORTION_ORDER, DISTORTION_BASIS, pa.diam / 2,
+                              wafer.get("layout_X"), wafer.get("layout_Y"))
+        if dm.rank < len(dm.terms):
+            print("!!! the pads of " + name + " only support " + str(dm.rank) + " of the " + str(len(dm.terms)) +
+                  " distortion terms, their coefficients are not unique")
+        distortion = dm.fit(U, V)
+        figures[name + "_ERR_RESIDUALS.png"] = dm.plot_residuals(distortion["residual_U"], distortion["residual_V"],
+                                                                 pa.diam)
+
+        def write_distortion(wr, writer):
+            writer.write_single_value(wr, "Residual X RMS (microns)", distortion["residual_rms_x"])
+            writer.write_single_value(wr, "Residual Y RMS (microns)", distortion["residual_rms_y"])
+            wr.writerow([])
+            wr.writerow(["Term", "X error coefficient", "Y error coefficient"])
+            for term, coeff_x, coeff_y in zip(distortion["terms"], distortion["coefficients_U"],
+                                              distortion["coefficients_V"]):
+                wr.writerow([term, coeff_x, coeff_y])
+            wr.writerow([])
+            wr.writerow(["Nominal X positions", "Nominal Y positions", "Residual X errors", "Residual Y errors"])
+            writer.write_4_values(wr, nom_X_pos, nom_Y_pos, distortion["residual_U"], distortion["residual_V"])
+        tables[name + '_DISTORTION.csv'] = csv_text(write_distortion)
+
+    # analyzes super wafer pad overlay
+    swp = super_wafer_pad(nom_X_dims, nom_Y_dims, meas_X_dims, meas_Y_dims)
+    avg_x, avg_y = swp.find_average_dimensions()
+    std_x, std_y, quartiles_x, quartiles_y = swp.find_std_and_quartile()
+    stats_x, stats_y = swp.find_statistics()
+    summary_x = stats_x.summary(*spec_limits(nom_X_dims))
+    summary_y = stats_y.summary(*spec_limits(nom_Y_dims))
+    fig, ax1, ax2, ax3 = swp.initiate_plots()
+    swp.plot_nominal_rect(ax3)
+    swp.plot_measured_rects(ax3)
+    swp.plot_average_rect(ax3)
+    ax1.hist(meas_X_dims)
+    ax2.hist(meas_Y_dims)
+    swp.plot_nom_averages_stds(avg_x, avg_y, std_x, std_y, ax1, ax2)
+    ax1.legend(loc='lower right')
+    ax2.legend(loc='lower right')
+    ax3.legend(loc='upper left')
+    figures[name + "_PAD_OVERLAY.png"] = fig
+
+    # cross-analyzes pad dimension error vs reference position
+    X_dims_errors = [nom_X_dims - j for j in meas_X_dims]
+    Y_dims_errors = [nom_Y_dims - j for j in meas_Y_dims]
+    d_xvx_reg, d_yvy_reg, d_xvy_reg, d_yvx_reg, figures[name + "_ERR_DIMENSIONS.png"] = pa.plot_errors(
+        X_dims_errors, Y_dims_errors, "pad width error")
 
+    # maps the mean and spread of every per-pad metric over a grid of cells on the wafer
+    if WAFER_MAP_CELL_SIZE is not None:
+        metrics = {"Positional Error Magnitude": np.hypot(U, V),
+                   "Overlay Residual Magnitude": np.hypot(overlay["corrected_U"], overlay["corrected_V"])}
+        if DISTORTION_ORDER is not None:
+            metrics["Distortion Residual Magnitude"] = np.hypot(distortion["residual_U"], distortion["residual_V"])
+        metrics["X Width Error"] = X_dims_errors
+        metrics["Y Width Error"] = Y_dims_errors
+        figures[name + "_WAFER_MAP.png"] = pa.plot_wafer_maps(metrics, WAFER_MAP_CELL_SIZE)
+
+        def write_wafer_map(wr, writer):
+            statistics = [pa.find_binned_statistics(values, WAFER_MAP_CELL_SIZE) for values in metrics.values()]
+            centers = positional_analyzer.grid_centers(pa.diam, WAFER_MAP_CELL_SIZE)[1]
+            rows, cols = np.nonzero(~np.isnan(statistics[0][2]))
+            header = ["Cell X center", "Cell Y center", "Pads"]
+            for title in metrics:
+                header += ["Mean " + title, "Std Dev " + title]
+            wr.writerow(header)
+            for row, col in zip(rows, cols):
+                values = [centers[col], centers[row], int(statistics[0][2][row, col])]
+                for means, stds, counts in statistics:
+                    values += [means[row, col], stds[row, col]]
+                wr.writerow(values)
+        tables[name + '_WAFER_MAP.csv'] = csv_text(write_wafer_map)
+
+    # predicts the errors at every site of the full layout from the sampled-down sites that were measured
+    if "full_layout_X" in wafer:
+        measured = np.column_stack([U, V, X_dims_errors, Y_dims_errors])
+        interpolated = error_interpolator(nom_X_pos, nom_Y_pos, INTERPOLATION_NEIGHBORS, INTERPOLATION_METHOD).predict(
+            wafer["full_layout_X"], wafer["full_layout_Y"], measured)
+
+        def write_interpolated(wr, writer):
+            wr.writerow(["Nominal X positions", "Nominal Y positions", "Interpolated X errors",
+                         "Interpolated Y errors", "Interpolated X width errors", "Interpolated Y width errors"])
+            for site_x, site_y, errors in zip(wafer["full_layout_X"], wafer["full_layout_Y"], interpolated):
+                wr.writerow([site_x, site_y] + errors.tolist())
+        tables[name + '_INTERPOLATED.csv'] = csv_text(write_interpolated)
+        if WAFER_MAP_CELL_SIZE is not None:
+            figures[name + "_INTERPOLATED_MAP.png"] = positional_analyzer.wafer_maps(
+                WAFER_DIAMETER, wafer["full_layout_X"], wafer["full_layout_Y"],
+                {"Interpolated Error Magnitude": np.hypot(interpolated[:, 0], interpolated[:, 1]),
+                 "Interpolated X Width Error": interpolated[:, 2],
+                 "Interpolated Y Width Error": interpolated[:, 3]}, WAFER_MAP_CELL_SIZE)
+
+    # repeatability and reproducibility of positional errors and pad widths over the passes of each site
+    gauges = None
+    if "X_pos_repeats" in wafer:
+        width_tolerance = None if PAD_WIDTH_TOLERANCE is None else 2 * PAD_WIDTH_TOLERANCE
+        gauges = [gauge_rr(wafer["X_pos_repeats"]).analyze(), gauge_rr(wafer["Y_pos_repeats"]).analyze(),
+                  gauge_rr(wafer["X_dim_repeats"]).analyze(width_tolerance),
+                  gauge_rr(wafer["Y_dim_repeats"]).analyze(width_tolerance)]
+
+    # writes data to PROCESSED.csv
+    def write_processed(wr, writer):
+        writer.write_single_value(wr, "Nominal Pad X dimension (microns)", nom_X_dims)
+        writer.write_single_value(wr, "Average Measured Pad X dimension", avg_x)
+        writer.write_single_value(wr, "X bias", avg_x - nom_X_dims)
+        writer.write_single_value(wr, "Nominal Pad Y dimension (microns)", nom_Y_dims)
+        writer.write_single_value(wr, "Average Measured Pad Y dimension", avg_y)
+        writer.write_single_value(wr, "Y bias", avg_y - nom_Y_dims)
+        wr.writerow([])
+        for axis, summary in [("X", summary_x), ("Y", summary_y)]:
+            writer.write_single_value(wr, "Measured Pad " + axis + " dimension std", summary["std"])
+            writer.write_single_value(wr, "Measured Pad " + axis + " dimension minimum", summary["min"])
+            writer.write_single_value(wr, "Measured Pad " + axis + " dimension first quartile", summary["Q1"])
+            writer.write_single_value(wr, "Measured Pad " + axis + " dimension median", summary["median"])
+            writer.write_single_value(wr, "Measured Pad " + axis + " dimension third quartile", summary["Q3"])
+            writer.write_single_value(wr, "Measured Pad " + axis + " dimension maximum", summary["max"])
+            if "Cpk" in summary:
+                writer.write_single_value(wr, "Measured Pad " + axis + " dimension Cpk", summary["Cpk"])
+        wr.writerow([])
+        writer.write_single_value(wr, "Positional X error vs X reference regression slope", p_xvx_reg)
+        writer.write_single_value(wr, "Positional Y error vs Y reference regression slope", p_yvy_reg)
+        writer.write_single_value(wr, "Positional X error vs Y reference regression slope", p_xvy_reg)
+        writer.write_single_value(wr, "Positional Y error vs X reference regression slope", p_yvx_reg)
+        wr.writerow([])
+        writer.write_single_value(wr, "Overlay X translation (microns)", overlay["Tx"])
+        writer.write_single_value(wr, "Overlay Y translation (microns)", overlay["Ty"])
+        writer.write_single_value(wr, "Overlay X scale (ppm)", overlay["scale_x"] * 1000000)
+        writer.write_single_value(wr, "Overlay Y scale (ppm)", overlay["scale_y"] * 1000000)
+        writer.write_single_value(wr, "Overlay rotation (microradians)", overlay["rotation"] * 1000000)
+        writer.write_single_value(wr, "Overlay non-orthogonality (microradians)",
+                                  overlay["non_orthogonality"] * 1000000)
+        writer.write_single_value(wr, "Overlay X residual RMS (microns)", overlay["residual_rms_x"])
+        writer.write_single_value(wr, "Overlay Y residual RMS (microns)", overlay["residual_rms_y"])
+        wr.writerow([])
+        writer.write_single_value(wr, "Dimensional X error vs X reference regression slope", d_xvx_reg)
+        writer.write_single_value(wr, "Dimensional Y error vs Y reference regression slope", d_yvy_reg)
+        writer.write_single_value(wr, "Dimensional X error vs Y reference regression slope", d_xvy_reg)
+        writer.write_single_value(wr, "Dimensional Y error vs X reference regression slope", d_yvx_reg)
+        wr.writerow([])
+        if gauges is not None:
+            wr.writerow(["Gauge R&R (microns, % of total variation)", "X position error", "Y position error",
+                         "Pad X dimension", "Pad Y dimension"])
+            for statistic in gauges[2]:
+                wr.writerow([statistic] + [gauge.get(statistic, "") for gauge in gauges])
+            wr.writerow([])
+        wr.writerow(["Measured pad X Dimensions", "Measured pad Y Dimensions"])
+        writer.write_2_values(wr, meas_X_dims, meas_Y_dims)
+        wr.writerow([])
+        wr.writerow(["Nominal X positions", "Nominal Y positions", "Measured X positions", "Measured Y positions"])
+        writer.write_4_values(wr, nom_X_pos, nom_Y_pos, meas_X_pos, meas_Y_pos)
+    tables[name + '_PROCESSED.csv'] = csv_text(write_processed)
+
+    # histogram sketches of the pad dimensions, merged into the summary of the wafer's lot
+    tables[name + '_DIMENSION_STATS.json'] = json.dumps(
+        {"nom_x": float(nom_X_dims), "nom_y": float(nom_Y_dims),
+         "x": sketch_dimensions(nom_X_dims, meas_X_dims).to_dict(),
+         "y": sketch_dimensions(nom_Y_dims, meas_Y_dims).to_dict()})
+
+    # writes failures and misreads into the FAILURES.csv
+    def write_failures(wr, writer):
+        wr.writerow(["Failed X locations", "Failed Y locations"])
+        writer.write_2_values(wr, X_fail_locations, Y_fail_locations)
+        wr.writerow([])
+        wr.writerow(["Nominal X locations", "Nominal Y locations", "Misread X locations", "Misread Y locations"])
+        writer.write_4_values(wr, wafer["misread_nom_X_pos"], wafer["misread_nom_Y_pos"], wafer["misread_X_pos"],
+                              wafer["misread_Y_pos"])
+        wr.writerow([])
+        wr.writerow(["Misread Pad X dimension", "Misread Pad Y dimension"])
+        writer.write_2_values(wr, wafer["misread_X_dims"], wafer["misread_Y_dims"])
+        if MATCH_TOLERANCE is not None:
+            wr.writerow([])
+            wr.writerow(["Unmatched measured X locations", "Unmatched measured Y locations"])
+            writer.write_2_values(wr, wafer["unpaired_X_pos"], wafer["unpaired_Y_pos"])
+            wr.writerow([])
+            wr.writerow(["Unmeasured site X locations", "Unmeasured site Y locations"])
+            writer.write_2_values(wr, wafer["unmeasured_X_pos"], wafer["unmeasured_Y_pos"])
+    tables[name + '_FAILURES.csv'] = csv_text(write_failures)
+
+    # groups failed and misread sites into spatial clusters to flag systematic defects
+    clusters = None
+    if FAILURE_CLUSTER_DISTANCE is not None:
+        fail_labels, misread_labels, clusters = failure_clusters(
+            WAFER_DIAMETER, FAILURE_CLUSTER_DISTANCE, FAILURE_CLUSTER_MIN_COUNT).find_clusters(
+            X_fail_locations, Y_fail_locations, wafer["misread_nom_X_pos"], wafer["misread_nom_Y_pos"])
+        print(str(len(clusters)) + " failure clusters found")
+
+        def write_clusters(wr, writer):
+            writer.write_single_value(wr, "Failure clusters", len(clusters))
+            writer.write_single_value(wr, "Edge failure clusters", sum(cluster["edge"] for cluster in clusters))
+            writer.write_single_value(wr, "Unclustered failed and misread sites",
+                                      int(np.sum(fail_labels < 0) + np.sum(misread_labels < 0)))
+            wr.writerow([])
+            wr.writerow(["Cluster", "Centroid X location", "Centroid Y location", "Radius (microns)", "Sites",
+                         "Failures", "Misreads", "Edge"])
+            for cluster in clusters:
+                wr.writerow([cluster["label"] + 1, cluster["centroid_x"], cluster["centroid_y"], cluster["radius"],
+                             cluster["count"], cluster["fails"], cluster["misreads"], cluster["edge"]])
+        tables[name + '_FAILURE_CLUSTERS.csv'] = csv_text(write_clusters)
+
+    # scalar results and per-pad arrays for the results database
+    scalars = {"Nominal Pad X dimension": nom_X_dims,
+               "Average Measured Pad X dimension": avg_x,
+               "X bias": avg_x - nom_X_dims,
+               "Nominal Pad Y dimension": nom_Y_dims,
+               "Average Measured Pad Y dimension": avg_y,
+               "Y bias": avg_y - nom_Y_dims,
+               "Measured Pad X dimension std": std_x,
+               "Measured Pad X dimension median": quartiles_x[1],
+               "Measured Pad Y dimension std": std_y,
+               "Measured Pad Y dimension median": quartiles_y[1],
+               "Positional X error vs X reference regression slope": p_xvx_reg,
+               "Positional Y error vs Y reference regression slope": p_yvy_reg,
+               "Positional X error vs Y reference regression slope": p_xvy_reg,
+               "Positional Y error vs X reference regression slope": p_yvx_reg,
+               "Dimensional X error vs X reference regression slope": d_xvx_reg,
+               "Dimensional Y error vs Y reference regression slope": d_yvy_reg,
+               "Dimensional X error vs Y reference regression slope": d_xvy_reg,
+               "Dimensional Y error vs X reference regression slope": d_yvx_reg,
+               "Overlay X translation": overlay["Tx"],
+               "Overlay Y translation": overlay["Ty"],
+               "Overlay X scale": overlay["scale_x"],
+               "Overlay Y scale": overlay["scale_y"],
+               "Overlay rotation": overlay["rotation"],
+               "Overlay non-orthogonality": overlay["non_orthogonality"],
+               "Overlay X residual RMS": overlay["residual_rms_x"],
+               "Overlay Y residual RMS": overlay["residual_rms_y"],
+               "Failure count": len(X_fail_locations),
+               "Misread count": len(wafer["misread_X_pos"])}
+    if clusters is not None:
+        scalars["Failure cluster count"] = len(clusters)
+        scalars["Edge failure cluster count"] = sum(cluster["edge"] for cluster in clusters)
+    if gauges is not None:
+        scalars["X position error %GRR"] = gauges[0]["%GRR"]
+        scalars["Y position error %GRR"] = gauges[1]["%GRR"]
+        scalars["Pad X dimension %GRR"] = gauges[2]["%GRR"]
+        scalars["Pad Y dimension %GRR"] = gauges[3]["%GRR"]
+    if PAD_WIDTH_TOLERANCE is not None:
+        scalars["Measured Pad X dimension Cpk"] = summary_x["Cpk"]
+        scalars["Measured Pad Y dimension Cpk"] = summary_y["Cpk"]
+    if MATCH_TOLERANCE is not None:
+        scalars["Unmatched count"] = wafer["num_unmatched"]
+        scalars["Duplicate count"] = wafer["num_duplicates"]
+        scalars["Unmeasured site count"] = len(wafer["unmeasured_X_pos"])
+    pads = {"nom_x": nom_X_pos, "nom_y": nom_Y_pos, "meas_x": meas_X_pos, "meas_y": meas_Y_pos,
+            "x_dim": meas_X_dims, "y_dim": meas_Y_dims}
+    stack = {"U": U, "V": V, "U_mean_adj": U_mean_adj, "V_mean_adj": V_mean_adj, "x_dim": meas_X_dims,
+             "y_dim": meas_Y_dims}
+    return {"figures": figures, "tables": tables, "scalars": scalars, "pads": pads, "stack": stack}
+
+def save_outputs(output_folder, outputs, close_figures=True):
+    """
+    saves the figures (as pngs) and csv files built by analyze_wafer into the output folder
+    :param output_folder: path of the wafer's output folder
+    :param outputs: dictionary returned by analyze_wafer
+    :param close_figures: T/F to close the figures in pyplot once saved (writer threads leave pyplot alone, the
+                          figures are closed by the main thread before being handed over)
+    :return: list of paths of all files written
+    """
+    written = []
+    for file_name, fig in outputs["figures"].items():
+        fig.savefig(os.path.join(output_folder, file_name), dpi=199)
+        if close_figures:
+            plt.close(fig)
+        written.append(os.path.join(output_folder, file_name))
+    for file_name, text in outputs["tables"].items():
+        with open(os.path.join(output_folder, file_name), 'w', newline="") as myfile:
+            myfile.write(text)
+        written.append(os.path.join(output_folder, file_name))
+    return written
+
+def prepare_output_folder(output_folder, stale_outputs):
+    """
+    creates the output folder of a wafer.  In incremental mode only the outputs of the previous build are removed,
+    otherwise an existing output folder is deleted and recreated empty.
+    :param output_folder: path of the wafer's output folder
+    :param stale_outputs: output files recorded for the wafer by the previous incremental build (None if not running
+                          incrementally)
+    :return: NA
+    """
+    if stale_outputs is not None:
+        if not (os.path.isdir(output_folder)):
+            os.mkdir(output_folder)
+        for output in stale_outputs:
+            if os.path.isfile(output):
+                os.remove(output)
+    elif not (os.path.isdir(output_folder)):
+        os.mkdir(output_folder)
+    else:
+        shutil.rmtree(output_folder)
+        os.mkdir(output_folder)
+
+def record_wafer(store, folder, wafer, outputs):
+    """
+    writes the scalar results and per-pad arrays of a wafer to the results database
+    :param store: results_store to write to
+    :param folder: name of the wafer sub-folder the raw Nikon output was found in
+    :param wafer: dictionary of the cleaned wafer data (see load_wafer)
+    :param outputs: dictionary returned by analyze_wafer
+    :return: NA
+    """
+    wafer_name, lot, product = identify_wafer(folder, wafer["name"])
+    timestamp = datetime.datetime.fromtimestamp(
+        os.path.getmtime(os.path.join(wafer["wafer_dir"], wafer["name"] + '.csv'))).isoformat()
+    store.write_wafer(wafer_name, lot, product, timestamp, outputs["scalars"], outputs["pads"])
+
+def track_wafer(tracker, job, wafer, outputs):
+    """
+    charts the results of a wafer on the process control charts of its product, adds the charts' report to the
+    wafer's outputs (<wafer>_SPC.csv) and flags the wafer if it is out of control
+    :param tracker: spc_tracker to update
+    :param job: dictionary describing the wafer (see find_jobs)
+    :param wafer: dictionary of the cleaned wafer data (see load_wafer)
+    :param outputs: dictionary returned by analyze_wafer, the report is added to its tables
+    :return: NA
+    """
+    wafer_name, lot, product = identify_wafer(job["folder"], wafer["name"])
+    report = tracker.update(product, wafer_name, {metric: outputs["scalars"][metric] for metric in SPC_METRICS})
+    flagged = [entry["metric"] for entry in report if entry["out_of_control"]]
+    if len(flagged) > 0:
+        print("\n!!! " + wafer_name + " is OUT OF CONTROL for: " + ", ".join(flagged) + " !!!")
+
+    def write_report(wr, writer):
+        writer.write_single_value(wr, "Product", product)
+        writer.write_single_value(wr, "Out of control", len(flagged) > 0)
+        wr.writerow([])
+        wr.writerow(["Metric", "Value", "Chart phase", "EWMA", "EWMA lower limit", "EWMA upper limit",
+                     "Upper CUSUM", "Lower CUSUM", "Out of control"])
+        for entry in report:
+            wr.writerow([entry["metric"], entry["value"], entry["phase"], entry["ewma"], entry["lower_limit"],
+                         entry["upper_limit"], entry["cusum_upper"], entry["cusum_lower"], entry["out_of_control"]])
+    outputs["tables"][wafer["name"] + '_SPC.csv'] = csv_text(write_report)
+
+def stack_wafer(stacks, job, wafer, outputs):
+    """
+    adds the per-pad errors and widths of a wafer to the stack of its lot, creating the stack from the wafer's XYin
+    layout (or its own nominal and failed sites if there is none) the first time the lot is seen
+    :param stacks: dictionary {lot: wafer_stack} of the stacks opened so far
+    :param job: dictionary describing the wafer (see find_jobs)
+    :param wafer: dictionary of the cleaned wafer data (see load_wafer)
+    :param outputs: dictionary returned by analyze_wafer
+    :return: NA
+    """
+    wafer_name, lot, product = identify_wafer(job["folder"], wafer["name"])
+    if lot not in stacks:
+        stack_path = os.path.join(os.getcwd(), WAFER_STACK_DIR, lot)
+        if os.path.isfile(os.path.join(stack_path, wafer_stack.META_FILE)):
+            stacks[lot] = wafer_stack(stack_path)
+        else:
+            if job["layout_file"] is not None:
+                site_X_pos, site_Y_pos = site_matcher.read_layout(job["layout_file"])
+            else:
+                site_X_pos, site_Y_pos = find_wafer_sites(wafer)
+            stacks[lot] = wafer_stack.create(stack_path, site_X_pos, site_Y_pos)
+    unaligned = stacks[lot].add_wafer(wafer_name, wafer["nom_X_pos"], wafer["nom_Y_pos"], outputs["stack"],
+                                      wafer["X_fail_locations"], wafer["Y_fail_locations"],
+                                      MATCH_TOLERANCE if MATCH_TOLERANCE is not None else 1.0)
+    if unaligned > 0:
+        print(str(unaligned) + " pads did not align with the sites of the " + lot + " wafer stack")
+
+def write_site_statistics(processed_dir, lot_wafers):
+    """
+    writes the per-site statistics of the wafer stack of each lot to <lot>_SITE_STATISTICS.csv in the processed
+    directory
+    :param processed_dir: path of the PROCESSED_DATA&PLOTS directory
+    :param lot_wafers: dictionary {lot: list of (wafer name, output folder) of its wafers} (see find_jobs)
+    :return: NA
+    """
+    for lot in lot_wafers:
+        stack_path = os.path.join(os.getcwd(), WAFER_STACK_DIR, lot)
+        if not os.path.isfile(os.path.join(stack_path, wafer_stack.META_FILE)):
+            continue
+        stack = wafer_stack(stack_path)
+        counts, means, stds, frequency = stack.find_site_statistics()
+        metrics = stack.meta["metrics"]
+        with open(os.path.join(processed_dir, lot + '_SITE_STATISTICS.csv'), 'w', newline="") as myfile:
+            wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+            writer = Writer()
+            writer.write_single_value(wr, "Wafers", len(stack))
+            wr.writerow([])
+            wr.writerow(["Nominal X positions", "Nominal Y positions", "Wafers measured", "Failure frequency"] +
+                        [metric + " " + statistic for metric in metrics for statistic in ["mean", "std"]])
+            for i in np.arange(stack.site_x.size):
+                wr.writerow([stack.site_x[i], stack.site_y[i], int(counts[i].max()), frequency[i]] +
+                            [value for j in np.arange(len(metrics)) for value in (means[i, j], stds[i, j])])
+
+def write_lot_fingerprints(processed_dir, lot_wafers):
+    """
+    decomposes the error fields in the wafer stack of each lot into its dominant fingerprints and writes them to
+    <lot>_FINGERPRINTS.csv and <lot>_FINGERPRINTS.png in the processed directory
+    :param processed_dir: path of the PROCESSED_DATA&PLOTS directory
+    :param lot_wafers: dictionary {lot: list of (wafer name, output folder) of its wafers} (see find_jobs)
+    :return: NA
+    """
+    for lot in lot_wafers:
+        stack_path = os.path.join(os.getcwd(), WAFER_STACK_DIR, lot)
+        if not os.path.isfile(os.path.join(stack_path, wafer_stack.META_FILE)):
+            continue
+        stack = wafer_stack(stack_path)
+        if len(stack) < 2:
+            continue
+        result = lot_fingerprints(stack, LOT_FINGERPRINTS).decompose()
+        components = len(result["singular_values"])
+        names = ["Fingerprint " + str(i + 1) for i in np.arange(components)]
+        with open(os.path.join(processed_dir, lot + '_FINGERPRINTS.csv'), 'w', newline="") as myfile:
+            wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+            wr.writerow(["Fingerprint", "Singular value", "Fraction of variation explained"])
+            for i in np.arange(components):
+                wr.writerow([names[i], result["singular_values"][i], result["explained_variance"][i]])
+            wr.writerow([])
+            wr.writerow(["Wafer"] + [name + " loading" for name in names])
+            for wafer_name, loadings in zip(result["wafers"], result["loadings"]):
+                wr.writerow([wafer_name] + list(loadings))
+            wr.writerow([])
+            wr.writerow(["Nominal X positions", "Nominal Y positions"] +
+                        [name + " " + axis for name in names for axis in ["X", "Y"]])
+            for i in np.arange(stack.site_x.size):
+                wr.writerow([stack.site_x[i], stack.site_y[i]] +
+                            [value for j in np.arange(components)
+                             for value in (result["fingerprints_U"][j, i], result["fingerprints_V"][j, i])])
+
+        fig, ax = plt.subplots(1, components, figsize=[6.4 * components, 6.4], squeeze=False)
+        for i in np.arange(components):
+            positional_analyzer.vector_field(ax[0][i], WAFER_DIAMETER, stack.site_x, stack.site_y,
+                                             result["fingerprints_U"][i], result["fingerprints_V"][i], FIELD_BIN_SIZE,
+                                             False)
+            ax[0][i].add_patch(plt.Circle((0, 0), WAFER_DIAMETER / 2, color='b', fill=False))
+            ax[0][i].set_title(names[i] + " (" + str(round(100 * result["explained_variance"][i], 1)) +
+                               "% of variation)\n**Vector Magnitudes Relative**")
+            ax[0][i].set_xlim(-WAFER_DIAMETER / 1.6, WAFER_DIAMETER / 1.6)
+            ax[0][i].set_ylim(-WAFER_DIAMETER / 1.6, WAFER_DIAMETER / 1.6)
+            ax[0][i].set_aspect('equal', adjustable='box')
+        fig.tight_layout()
+        fig.savefig(os.path.join(processed_dir, lot + '_FINGERPRINTS.png'), dpi=199)
+        plt.close(fig)
+
+def find_jobs(Nikon_output_dir, processed_dir, manifest, params, lot_wafers):
+    """
+    crawls through all wafer sub-folders of the Nikon_Outputs directory and lists the raw Nikon outputs to process.
+    In incremental mode, wafers whose outputs are current are skipped.
+    :param Nikon_output_dir: path of the Nikon_Outputs directory
+    :param processed_dir: path of the PROCESSED_DATA&PLOTS directory
+    :param manifest: build_manifest of the processed directory (None if not running incrementally)
+    :param params: dictionary of analysis parameters (see analysis_parameters)
+    :param lot_wafers: dictionary {lot: list of output folders of its wafers}, filled in for every wafer found
+                       (skipped or not)
+    :return: generator of jobs, each a dictionary describing one raw Nikon output and where its outputs go
+    """
     # Iterate through all wafer sub-folders within "Nikon_Outputs"
     for root, osubdirs, ofiles in os.walk(Nikon_output_dir):
         for folder in osubdirs:
-            # Navigate into the wafer folder iterated across
-            os.chdir(Nikon_output_dir + "/" + folder)
-            curr_wafer_folder_dir = os.getcwd()
+            curr_wafer_folder_dir = os.path.join(Nikon_output_dir, folder)
             for root, subdirs, files in os.walk(curr_wafer_folder_dir):
+                layout_file = find_layout_file(curr_wafer_folder_dir, files)
+                full_layout_file = find_full_layout_file(curr_wafer_folder_dir, files)
                 # iterating through each file in the wafer's folder
                 for name in files:
-                    # checking that file iterated across is not a PROCESSED.csv output, XYin.csv input,
-                    # FAILURE.csv output, or image
+                    # checking that file iterated across is not an XYin.csv input
                     if not (name.__contains__("XYin")):
-                        # creates the output folder in the "PROCESSED_DATA&PLOTS" directory if not already present
-                        # if output folder is already present, delete it and recreate an empty one with same name
-                        output_folder = os.path.join(processed_dir, name[:len(name) - 4] + "_DATA&PLOTS")
-                        if not (os.path.isdir(output_folder)):
-                            os.mkdir(output_folder)
-                        else:
-                            shutil.rmtree(output_folder)
-                            os.mkdir(output_folder)
-                        print("\n\n\n-----" + name[:len(name) - 4] + "-----\n")
-
-                        # READING IN THE DATA CSV FILE and letting the cleaner class work
-                        cleaner = Cleaner(name)
-                        nom_X_dims, nom_Y_dims = cleaner.get_nominal_pad_sizes()
-                        X_fail_locations = cleaner.get_X_fails()
-                        Y_fail_locations = cleaner.get_Y_fails()
                         name = name[:len(name) - 4]
-                        nom_X_pos, nom_Y_pos, meas_X_pos, meas_Y_pos = cleaner.extract_XY()
-                        meas_X_dims, meas_Y_dims = cleaner.extract_widths()
-                        meas_X_dims, meas_Y_dims, meas_X_pos, meas_Y_pos, nom_X_pos, nom_Y_pos, \
-                        misread_X_dims, misread_Y_dims, misread_X_pos, misread_Y_pos, misread_nom_X_pos, \
-                        misread_nom_Y_pos = cleaner.remove_outliers(meas_X_dims, meas_Y_dims, meas_X_pos, meas_Y_pos,
-                                                                    nom_X_pos, nom_Y_pos)
-
-                        # walk into the folder where all output plot pngs and output csvs will be deposited
-                        os.chdir(output_folder)
-
-                        # analyzes global wafer pad positions
-                        pa = positional_analyzer(300000, nom_X_pos, nom_Y_pos, meas_X_pos, meas_Y_pos)
-                        U, V, U_mean_adj, V_mean_adj = pa.find_vectors()
-                        err_vector_fig = pa.plot_field(U, V, U_mean_adj, V_mean_adj, X_fail_locations, Y_fail_locations,
-                                                       misread_nom_X_pos, misread_nom_Y_pos)
-                        p_xvx_reg, p_yvy_reg, p_xvy_reg, p_yvx_reg, XY_positional_error_fig = pa.plot_errors(U_mean_adj,
-                                                        V_mean_adj, "positional error")
-                        # saves the error vector field as a png
-                        err_vector_fig.savefig(name + "_ERR_VECTORS.png", dpi=199)
-                        plt.close()
-                        # saves the positional error vs positional reference plot as a png
-                        XY_positional_error_fig.savefig(name + "_ERR_POSITIONS.png", dpi=199)
-                        plt.close()
-
-                        # analyzes super wafer pad overlay
-                        swp = super_wafer_pad(nom_X_dims, nom_Y_dims, meas_X_dims, meas_Y_dims)
-                        avg_x, avg_y = swp.find_average_dimensions()
-                        std_x, std_y = swp.find_std_and_quartile()
-                        fig, ax1, ax2, ax3 = swp.initiate_plots()
-                        swp.plot_nominal_rect(ax3)
-                        swp.plot_measured_rects(ax3)
-                        swp.plot_average_rect(ax3)
-                        ax1.hist(meas_X_dims)
-                        ax2.hist(meas_Y_dims)
-                        swp.plot_nom_averages_stds(avg_x, avg_y, std_x, std_y, ax1, ax2)
-                        ax1.legend(loc='lower right')
-                        ax2.legend(loc='lower right')
-                        ax3.legend(loc='upper left')
-                        # saves the super bond-pad style overlay plot as a png
-                        fig.savefig(name + "_PAD_OVERLAY.png", dpi=199)
-                        plt.close()
-
-                        # cross-analyzes pad dimension error vs reference position
-                        X_dims_errors = [nom_X_dims - j for j in meas_X_dims]
-                        Y_dims_errors = [nom_Y_dims - j for j in meas_Y_dims]
-                        d_xvx_reg, d_yvy_reg, d_xvy_reg, d_yvx_reg, XY_dimensional_error_figs\
-                            = pa.plot_errors(X_dims_errors, Y_dims_errors, "pad width error")
-                        # saves the dimensional error vs positional reference plot as a png
-                        XY_dimensional_error_figs.savefig(name + "_ERR_DIMENSIONS.png", dpi=199)
-                        plt.close()
-
-                        # writes data to PROCESSED.csv
-                        with open(name + '_PROCESSED.csv', 'w', newline="") as myfile:
-                            wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
-                            writer = Writer()
-                            writer.write_single_value(wr, "Nominal Pad X dimension (microns)", nom_X_dims)
-                            writer.write_single_value(wr, "Average Measured Pad X dimension", avg_x)
-                            writer.write_single_value(wr, "X bias", avg_x - nom_X_dims)
-                            writer.write_single_value(wr, "Nominal Pad Y dimension (microns)", nom_Y_dims)
-                            writer.write_single_value(wr, "Average Measured Pad Y dimension", avg_y)
-                            writer.write_single_value(wr, "Y bias", avg_y - nom_Y_dims)
-                            wr.writerow([])
-                            writer.write_single_value(wr, "Positional X error vs X reference regression slope",
-                                                      p_xvx_reg)
-                            writer.write_single_value(wr, "Positional Y error vs Y reference regression slope",
-                                                      p_yvy_reg)
-                            writer.write_single_value(wr, "Positional X error vs Y reference regression slope",
-                                                      p_xvy_reg)
-                            writer.write_single_value(wr, "Positional Y error vs X reference regression slope",
-                                                      p_yvx_reg)
-                            wr.writerow([])
-                            writer.write_single_value(wr, "Dimensional X error vs X reference regression slope",
-                                                      d_xvx_reg)
-                            writer.write_single_value(wr, "Dimensional Y error vs Y reference regression slope",
-                                                      d_yvy_reg)
-                            writer.write_single_value(wr, "Dimensional X error vs Y reference regression slope",
-                                                      d_xvy_reg)
-                            writer.write_single_value(wr, "Dimensional Y error vs X reference regression slope",
-                                                      d_yvx_reg)
-                            wr.writerow([])
-                            wr.writerow(["Measured pad X Dimensions", "Measured pad Y Dimensions"])
-                            writer.write_2_values(wr, meas_X_dims, meas_Y_dims)
-                            wr.writerow([])
-                            wr.writerow(["Nominal X positions", "Nominal Y positions", "Measured X positions",
-                                         "Measured Y positions"])
-                            writer.write_4_values(wr, nom_X_pos, nom_Y_pos, meas_X_pos, meas_Y_pos)
-
-                        # writes failures and misreads into the FAILURES.csv
-                        with open(name + '_FAILURES.csv', 'w', newline='') as myfile:
-                            wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
-                            writer = Writer()
-                            wr.writerow(["Failed X locations", "Failed Y locations"])
-                            writer.write_2_values(wr, X_fail_locations, Y_fail_locations)
-                            wr.writerow([])
-                            wr.writerow(["Nominal X locations", "Nominal Y locations", "Misread X locations",
-                                         "Misread Y locations"])
-                            writer.write_4_values(wr, misread_nom_X_pos, misread_nom_Y_pos, misread_X_pos,
-                                                  misread_Y_pos)
-                            wr.writerow([])
-                            wr.writerow(["Misread Pad X dimension", "Misread Pad Y dimension"])
-                            writer.write_2_values(wr, misread_X_dims, misread_Y_dims)
-                        print('\n' + name + ' processed and plotted!')
-
-                        # moves the file with the raw Nikon output you have been reading from into the output folder
-                        shutil.move(curr_wafer_folder_dir + '/' + name + '.csv', output_folder)
-
-                        # return to the wafer folder you were in to keep looking for input files
-                        os.chdir(curr_wafer_folder_dir)
+                        output_folder = os.path.join(processed_dir, name + "_DATA&PLOTS")
+                        lot_wafers.setdefault(folder, []).append((name, output_folder))
+                        input_files = [os.path.join(curr_wafer_folder_dir, name + '.csv')]
+                        if layout_file is not None:
+                            input_files.append(layout_file)
+                        if full_layout_file is not None:
+                            input_files.append(full_layout_file)
+
+                        # skips wafers whose outputs were already built from the same inputs and parameters
+                        input_hash = None
+                        if manifest is not None:
+                            input_hash = build_manifest.hash_inputs(input_files)
+                            if manifest.is_current(name, input_hash, params):
+                                print("\n" + name + " is up to date, skipping")
+                                continue
+                        yield {"folder": folder, "wafer_dir": curr_wafer_folder_dir, "name": name,
+                               "layout_file": layout_file, "full_layout_file": full_layout_file,
+                               "input_files": input_files, "input_hash": input_hash,
+                               "output_folder": output_folder}
+
+def write_lot_summaries(processed_dir, lot_wafers):
+    """
+    merges the dimension sketches of all wafers of each lot and writes the lot's summary to
+    <lot>_LOT_SUMMARY.csv in the processed directory.  Wafers whose sketches cannot be merged with those of the lot's
+    first wafer (a different nominal pad size) are left out of the summary and counted.
+    :param processed_dir: path of the PROCESSED_DATA&PLOTS directory
+    :param lot_wafers: dictionary {lot: list of (wafer name, output folder) of its wafers} (see find_jobs)
+    :return: NA
+    """
+    for lot, wafers in lot_wafers.items():
+        lot_x = None
+        lot_y = None
+        num_wafers = 0
+        skipped = []
+        for name, output_folder in wafers:
+            stats_file = os.path.join(output_folder, name + '_DIMENSION_STATS.json')
+            if not os.path.isfile(stats_file):
+                continue
+            with open(stats_file) as json_file:
+                sketches = json.load(json_file)
+            if lot_x is None:
+                nom_x, nom_y = sketches["nom_x"], sketches["nom_y"]
+                lot_x = dimension_stats.from_dict(sketches["x"])
+                lot_y = dimension_stats.from_dict(sketches["y"])
+            else:
+                sketch_x = dimension_stats.from_dict(sketches["x"])
+                sketch_y = dimension_stats.from_dict(sketches["y"])
+                if not (lot_x.can_merge(sketch_x) and lot_y.can_merge(sketch_y)):
+                    skipped.append(name)
+                    continue
+                lot_x.merge(sketch_x)
+                lot_y.merge(sketch_y)
+            num_wafers += 1
+        if num_wafers == 0:
+            continue
+        if len(skipped) > 0:
+            print("!!! " + lot + " lot summary leaves out wafers with a different nominal pad size: " +
+                  ", ".join(skipped))
+        summary_x = lot_x.summary(*spec_limits(nom_x))
+        summary_y = lot_y.summary(*spec_limits(nom_y))
+        with open(os.path.join(processed_dir, lot + '_LOT_SUMMARY.csv'), 'w', newline="") as myfile:
+            wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+            writer = Writer()
+            writer.write_single_value(wr, "Wafers", num_wafers)
+            if len(skipped) > 0:
+                writer.write_single_value(wr, "Wafers left out (different nominal pad size)", len(skipped))
+            writer.write_single_value(wr, "Nominal Pad X dimension (microns)", nom_x)
+            writer.write_single_value(wr, "Nominal Pad Y dimension (microns)", nom_y)
+            wr.writerow([])
+            wr.writerow(["Statistic", "Measured Pad X dimension", "Measured Pad Y dimension"])
+            for statistic in summary_x:
+                wr.writerow([statistic, summary_x[statistic], summary_y[statistic]])
+
+def start_wafer(job, manifest):
+    """
+    creates the output folder of a wafer in the "PROCESSED_DATA&PLOTS" directory
+    :param job: dictionary describing the wafer (see find_jobs)
+    :param manifest: build_manifest of the processed directory (None if not running incrementally)
+    :return: NA
+    """
+    prepare_output_folder(job["output_folder"], manifest.get_outputs(job["name"]) if manifest is not None else None)
+    print("\n\n\n-----" + job["name"] + "-----\n")
+
+def finish_wafer(job, written, manifest, params):
+    """
+    moves (or in incremental mode copies) the raw Nikon output into the output folder once all outputs of the wafer
+    are written, and records the wafer in the manifest
+    :param job: dictionary describing the wafer (see find_jobs)
+    :param written: list of paths of all outputs written for the wafer
+    :param manifest: build_manifest of the processed directory (None if not running incrementally)
+    :param params: dictionary of analysis parameters (see analysis_parameters)
+    :return: NA
+    """
+    print('\n' + job["name"] + ' processed and plotted!')
+    if manifest is not None:
+        # keeps the raw Nikon output in place and records the finished wafer in the manifest
+        shutil.copy2(job["input_files"][0], job["output_folder"])
+        manifest.record(job["name"], job["input_hash"], params,
+                        written + [os.path.join(job["output_folder"], job["name"] + '.csv')])
+    else:
+        # moves the file with the raw Nikon output you have been reading from into the output folder
+        shutil.move(job["input_files"][0], job["output_folder"])
+
+def process_sequential(jobs, store, manifest, params, stacks=None, tracker=None):
+    """
+    loads, analyzes and saves the outputs of one wafer after the other
+    :param jobs: iterable of jobs (see find_jobs)
+    :param store: results_store to write results to (None to skip)
+    :param manifest: build_manifest of the processed directory (None if not running incrementally)
+    :param params: dictionary of analysis parameters (see analysis_parameters)
+    :param stacks: dictionary {lot: wafer_stack} to add every wafer to (None to skip stacking)
+    :param tracker: spc_tracker to chart every wafer on (None to skip process control)
+    :return: NA
+    """
+    for job in jobs:
+        process_job(job, store, manifest, params, stacks, tracker)
+
+def process_job(job, store, manifest, params, stacks=None, tracker=None):
+    """
+    loads, analyzes and saves the outputs of a single wafer, and records it in the results database, SPC charts,
+    wafer stack and manifest
+    :param job: dictionary describing the wafer (see find_jobs)
+    :param store: results_store to write results to (None to skip)
+    :param manifest: build_manifest of the processed directory (None if not running incrementally)
+    :param params: dictionary of analysis parameters (see analysis_parameters)
+    :param stacks: dictionary {lot: wafer_stack} to add the wafer to (None to skip stacking)
+    :param tracker: spc_tracker to chart the wafer on (None to skip process control)
+    :return: list of paths of the output files written
+    """
+    start_wafer(job, manifest)
+    wafer = load_wafer(job["wafer_dir"], job["name"] + '.csv', job["layout_file"], job["full_layout_file"])
+    outputs = analyze_wafer(wafer)
+    if tracker is not None:
+        track_wafer(tracker, job, wafer, outputs)
+    written = save_outputs(job["output_folder"], outputs)
+    # writes the scalar results and per-pad arrays to the results database
+    if store is not None:
+        record_wafer(store, job["folder"], wafer, outputs)
+    if stacks is not None:
+        stack_wafer(stacks, job, wafer, outputs)
+    finish_wafer(job, written, manifest, params)
+    return written
+
+def process_pipelined(jobs, store, manifest, params, stacks=None, tracker=None):
+    """
+    processes the wafers in three overlapping stages connected by bounded queues:
+        1. a reader thread finds, loads and cleans upcoming wafers
+        2. the main thread analyzes each wafer and writes its results to the database (sqlite connections and pyplot
+           stay in the thread that created them)
+        3. a pool of writer threads saves the pngs and csv files of analyzed wafers
+    At most PIPELINE_DEPTH wafers wait between stages, so memory stays bounded no matter how many wafers a lot has.
+
+    :param jobs: iterable of jobs (see find_jobs)
+    :param store: results_store to write results to (None to skip)
+    :param manifest: build_manifest of the processed directory (None if not running incrementally)
+    :param params: dictionary of analysis parameters (see analysis_parameters)
+    :param stacks: dictionary {lot: wafer_stack} to add every wafer to (None to skip stacking)
+    :param tracker: spc_tracker to chart every wafer on (None to skip process control)
+    :return: NA
+    """
+    import collections
+    import queue
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    loaded = queue.Queue(maxsize=PIPELINE_DEPTH)
+
+    def read():
+        try:
+            for job in jobs:
+                loaded.put((job, load_wafer(job["wafer_dir"], job["name"] + '.csv', job["layout_file"],
+                                            job["full_layout_file"])))
+        except BaseException as error:
+            # hands the error to the main thread so it is raised there
+            loaded.put((None, error))
+            return
+        loaded.put(None)
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=PIPELINE_WRITERS) as writers:
+        while True:
+            item = loaded.get()
+            if item is None:
+                break
+            job, wafer = item
+            if job is None:
+                raise wafer
+            start_wafer(job, manifest)
+            outputs = analyze_wafer(wafer)
+            if tracker is not None:
+                track_wafer(tracker, job, wafer, outputs)
+            # the figures are detached from pyplot here so the writer threads never touch pyplot's global state
+            for fig in outputs["figures"].values():
+                plt.close(fig)
+            if store is not None:
+                record_wafer(store, job["folder"], wafer, outputs)
+            if stacks is not None:
+                stack_wafer(stacks, job, wafer, outputs)
+            # waits for the oldest wafer to be written before queuing more outputs than the pipeline can hold
+            while len(pending) >= PIPELINE_DEPTH:
+                done_job, future = pending.popleft()
+                finish_wafer(done_job, future.result(), manifest, params)
+            pending.append((job, writers.submit(save_outputs, job["output_folder"], outputs, False)))
+        while len(pending) > 0:
+            done_job, future = pending.popleft()
+            finish_wafer(done_job, future.result(), manifest, params)
+    reader.join()
+
+if __name__ == '__main__':
+    # Navigating to the folder "Nikon_Outputs"
+    home_dir = os.getcwd()
+    Nikon_output_dir = home_dir + "/Nikon_Outputs"
+    processed_dir = home_dir + "/PROCESSED_DATA&PLOTS"
+    store = None
+    if RESULTS_DATABASE is not None:
+        store = results_store(os.path.join(home_dir, RESULTS_DATABASE))
+    manifest = build_manifest(os.path.join(processed_dir, "MANIFEST.json")) if INCREMENTAL else None
+    params = analysis_parameters()
+    stacks = {} if WAFER_STACK_DIR is not None else None
+    tracker = None
+    if SPC_STATE_FILE is not None:
+        tracker = spc_tracker(os.path.join(home_dir, SPC_STATE_FILE), SPC_BASELINE_WAFERS)
+
+    lot_wafers = {}
+    jobs = find_jobs(Nikon_output_dir, processed_dir, manifest, params, lot_wafers)
+    if PIPELINE:
+        process_pipelined(jobs, store, manifest, params, stacks, tracker)
+    else:
+        process_sequential(jobs, store, manifest, params, stacks, tracker)
+    write_lot_summaries(processed_dir, lot_wafers)
+    if WAFER_STACK_DIR is not None:
+        write_site_statistics(processed_dir, lot_wafers)
+        if LOT_FINGERPRINTS is not None:
+            write_lot_fingerprints(processed_dir, lot_wafers)
 
+    if store is not None:
+        store.close()
     input("\nPress \'Enter\' to exit Program")
@@ -3,14 +3,292 @@ Executable python function that is directly called by user.
 
 Author: Sean Lin
 Date Created: 6/21/21
-Last Modified: 7/30/21
+Last Modified: 10/19/26
 """
 import csv
 import os
 import numpy as np
 import pandas as pd
+import matplotlib.pyplot as plt
 from mutliVector import multiVector
 from outlierAnalyzer import outlierAnalyzer
+from profileStore import profileStore
+from markClusterer import markClusterer
+from markLibrary import markLibrary
+from markAnomalyScorer import markAnomalyScorer
+from roughnessAnalyzer import roughnessAnalyzer
+
+# folder (within the home directory) that multi-cursor exports are converted into memory-mapped profile stores in.
+# each export is converted once and analyzed from its store afterwards.  set to None to analyze the exports directly.
+PROFILE_STORE_DIR = None
+
+# number of points (odd) and polynomial order of the Savitzky-Golay filter single-cursor profiles are smoothed with
+# before their extrema and slopes are found, so noise spikes are not reported as the steepest slopes.
+# set SMOOTHING_WINDOW to None to find extrema and slopes from the raw profile.
+SMOOTHING_WINDOW = None
+SMOOTHING_ORDER = 2
+
+# number of points in the sliding windows roughness and texture metrics (Ra, Rq, Rz, peak count and slope RMS) of
+# single-cursor profiles are computed over.  The metrics of every window are written to _ROUGHNESS_DATA.csv.
+# set to None to skip roughness analysis.
+ROUGHNESS_WINDOW = None
+
+# aligns the multi-cursor marks to their average by FFT cross-correlation (with sub-sample shifts) before they are
+# averaged and compared, so marks shifted along x by probe placement still correlate.  The shift of every mark is
+# added to the correlation data.  set to False to only snip the marks to a common length.
+ALIGN_MARKS = False
+
+# number of mark shapes the multi-cursor marks are clustered into.  The shape of every mark and the centroid profile
+# of every shape are written to _CLUSTER_DATA.csv and plotted to _CLUSTERS.png.  set to None to skip clustering.
+MARK_CLUSTERS = None
+
+# folder (within the home directory) of the library of historical marks.  Every analyzed mark is matched against the
+# library (its MARK_LIBRARY_MATCHES most similar historical marks are written to _LIBRARY_MATCHES.csv) and then added
+# to it.  set MARK_LIBRARY_DIR to None to skip the library.
+MARK_LIBRARY_DIR = None
+MARK_LIBRARY_MATCHES = 5
+
+# name of the .npz file (within the home directory) of the basis multi-cursor marks are scored for anomalies against.
+# If the file does not exist yet, a MARK_ANOMALY_COMPONENTS component basis is fit to the multi-cursor exports of good
+# marks in the folder MARK_ANOMALY_REFERENCE_DIR and saved.  Scores and flags are written to _ANOMALY_DATA.csv.
+# set MARK_ANOMALY_MODEL to None to skip anomaly scoring.
+MARK_ANOMALY_MODEL = None
+MARK_ANOMALY_REFERENCE_DIR = "reference_marks"
+MARK_ANOMALY_COMPONENTS = 5
+
+def match_marks(name, marks):
+    """
+    finds the most similar historical marks of every mark in the mark library, writes them to a csv file next to the
+    export and adds the marks to the library
+    :param name: path of the VEECO export without its extension
+    :param marks: aligned and patched marks of the export, one mark per row
+    :return: path of the output file written
+    """
+    library_path = os.path.join(os.getcwd(), MARK_LIBRARY_DIR)
+    if os.path.isfile(os.path.join(library_path, markLibrary.METADATA_FILE)):
+        library = markLibrary(library_path)
+    else:
+        library = markLibrary.create(library_path)
+    mark_names = [os.path.basename(name) + " mark " + str(i + 1) for i in np.arange(len(marks))]
+    with open(name + "_LIBRARY_MATCHES" + ".csv", 'w', newline="") as myfile:
+        wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+        wr.writerow(["Scrub Mark Profile", "Match", "Historical Mark", "Similarity"])
+        for i in np.arange(len(marks)):
+            for j, (match, similarity) in enumerate(library.query(marks[i], MARK_LIBRARY_MATCHES, [mark_names[i]])):
+                wr.writerow([i + 1, j + 1, match, similarity])
+    library.add(marks, mark_names)
+    return name + "_LIBRARY_MATCHES.csv"
+
+def analyze_single_cursor(filename, num_extrema):
+    """
+    runs the single-cursor slope and outlier analysis on a scrub mark profile export and saves the plot and the
+    slope and extrema data next to the export
+    :param filename: path of the single-cursor VEECO export csv file
+    :param num_extrema: number of extreme values to observe
+    :return: list of paths of the output files written
+    """
+    # read scrub mark profile information
+    raw_vector = pd.read_csv(filename).drop([0, 1])
+    raw_vector.name = filename
+    name = filename[:len(filename) - 4]
+
+    # extract x values
+    x = list(map(float, raw_vector.x.tolist()))
+
+    # extract z values
+    z_values = raw_vector.iloc[:, 1].tolist()
+    z_values = [z if z != " ---" else np.NAN for z in z_values]  # replace all instances of " ---" with np.NAN
+    z_values = list(map(float, z_values))
+
+    # runs the single-cursor slope and outlier analyzer
+    oa = outlierAnalyzer(x, z_values, SMOOTHING_WINDOW, SMOOTHING_ORDER)
+    extreme_data, slope_data, fig = oa.plot_vector(num_extrema, num_extrema)
+
+    # saves the plot to a png file
+    fig.savefig(name + "_PLOT.png")
+    plt.close(fig)
+
+    # saves the output data to a csv file
+    with open(name + "_SLOPE&EXTREMA_DATA" + ".csv", 'w', newline="") as myfile:
+        wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+
+        # write the minimum Z values on the scrub mark profile vector and their locations
+        wr.writerow(["minimum Z Values", "X-location"])
+        for i in np.arange(len(extreme_data[0])):
+            min = extreme_data[1][i]
+            min_loc = extreme_data[0][i]
+            wr.writerow([min, min_loc])
+        wr.writerow([])
+
+        # write the maximum Z values on the scrub mark profile vector and their locations
+        wr.writerow(["maximum Z Values", "X-location"])
+        for i in np.arange(len(extreme_data[2])):
+            max = extreme_data[3][i]
+            max_loc = extreme_data[2][i]
+            wr.writerow([max, max_loc])
+        wr.writerow([])
+
+        # write the minimum profile slopes and their location and weight
+        wr.writerow(["Minimum Slopes (microns/micron)", "X-location", "Weight"])
+        for i in np.arange(len(slope_data[1])):
+            min_slope = slope_data[2][i]
+            min_slope_loc = slope_data[1][i]
+            min_slope_weight = slope_data[3][i]
+            wr.writerow([min_slope, min_slope_loc, min_slope_weight])
+        wr.writerow([])
+
+        # write the maximum profile slopes and their location and weight
+        wr.writerow(["Maximum Slopes (microns/micron)", "X-location", "Weight"])
+        for i in np.arange(len(slope_data[1])):
+            max_slope = slope_data[2][i]
+            max_slope_loc = slope_data[1][i]
+            max_slope_weight = slope_data[3][i]
+            wr.writerow([max_slope, max_slope_loc, max_slope_weight])
+    outputs = [name + "_PLOT.png", name + "_SLOPE&EXTREMA_DATA.csv"]
+
+    # computes roughness metrics in sliding windows along the preprocessed profile
+    if ROUGHNESS_WINDOW is not None and roughnessAnalyzer.fitting_window(len(oa.xVals), ROUGHNESS_WINDOW) is None:
+        print("profile of " + str(len(oa.xVals)) + " points is too short for roughness windows, no roughness data is "
+              "written")
+    elif ROUGHNESS_WINDOW is not None:
+        ra = roughnessAnalyzer(oa.xVals, ROUGHNESS_WINDOW)
+        roughness = ra.analyze(oa.vector)
+        with open(name + "_ROUGHNESS_DATA" + ".csv", 'w', newline="") as myfile:
+            wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+            wr.writerow(["Window (points)", ra.window])
+            wr.writerow([])
+            wr.writerow(["Window center X-location"] + roughnessAnalyzer.METRICS)
+            for i in np.arange(ra.centers.size):
+                wr.writerow([ra.centers[i]] + [roughness[metric][0, i] for metric in roughnessAnalyzer.METRICS])
+        outputs.append(name + "_ROUGHNESS_DATA.csv")
+
+    # matches the mark against the library of historical marks
+    if MARK_LIBRARY_DIR is not None:
+        outputs.append(match_marks(name, [oa.vector]))
+    return outputs
+
+def read_multi_cursor(filename):
+    """
+    reads the x values and scrub mark profiles of a multi-cursor VEECO export
+    :param filename: path of the multi-cursor VEECO export csv file
+    :return: [x values (list), 2D list of scrub mark profiles]
+    """
+    # read in the data file
+    raw_data = pd.read_csv(filename).drop([0, 1])
+    raw_data.name = filename
+
+    # prime the vectors for analysis
+    x = list(map(float, raw_data.x.tolist()))
+    raw_vectors = []
+    for i in np.arange(1, len(raw_data.columns)):
+        y = raw_data.iloc[:, i]
+        y = [z if z != " ---" else np.NAN for z in y]  # replace all instances of " ---" with np.NAN
+        y = list(map(float, y))
+        raw_vectors.append(y)
+    return x, raw_vectors
+
+def load_anomaly_scorer():
+    """
+    loads the anomaly scoring basis, fitting it to the reference exports of good marks the first time
+    :return: markAnomalyScorer
+    """
+    model_file = os.path.join(os.getcwd(), MARK_ANOMALY_MODEL)
+    if os.path.isfile(model_file):
+        return markAnomalyScorer.load(model_file)
+    reference_sets = []
+    for root, subdirs, names in os.walk(os.path.join(os.getcwd(), MARK_ANOMALY_REFERENCE_DIR)):
+        for name in names:
+            if name.endswith(".csv"):
+                x, raw_vectors = read_multi_cursor(os.path.join(root, name))
+                reference_sets.append(multiVector(x, raw_vectors, ALIGN_MARKS).data)
+    assert len(reference_sets) > 0, "no reference exports of good marks found in " + MARK_ANOMALY_REFERENCE_DIR
+    scorer = markAnomalyScorer.fit(reference_sets, MARK_ANOMALY_COMPONENTS)
+    scorer.save(model_file)
+    return scorer
+
+def analyze_multi_cursor(filename, store_dir=None):
+    """
+    runs the multi-vector correlation analysis on a multi-cursor VEECO export and saves the plot and the correlation
+    data next to the export
+    :param filename: path of the multi-cursor VEECO export csv file
+    :param store_dir: folder that exports are converted into profile stores in (None to analyze the export directly)
+    :return: list of paths of the output files written
+    """
+    name = filename[:len(filename) - 4]
+    if store_dir is not None:
+        # converts the export into a profile store the first time it is seen, and again whenever it changes
+        store_path = os.path.join(store_dir, os.path.basename(name))
+        store = None
+        if os.path.isfile(os.path.join(store_path, profileStore.METADATA_FILE)):
+            store = profileStore(store_path)
+            if not store.is_current(filename):
+                store = None
+        if store is None:
+            store = profileStore.from_veeco_csv(filename, store_path)
+        x, raw_vectors = store.xVals, store.data
+    else:
+        x, raw_vectors = read_multi_cursor(filename)
+
+    # perform multi-vector analysis and plot to an image
+    smartypants = multiVector(x, raw_vectors, ALIGN_MARKS)
+    correlations, fig = smartypants.plot_vectors(False)
+    fig.savefig(name + "_PLOT.png")
+    plt.close(fig)
+
+    # write correlation data to an output csv
+    with open(name + "_CORRELATION_DATA" + ".csv", 'w', newline="") as myfile:
+        wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+        if smartypants.lags is None:
+            wr.writerow(["Scrub Mark Profile", "Correlation Coefficient"])
+        else:
+            wr.writerow(["Scrub Mark Profile", "Correlation Coefficient", "Shift (microns)"])
+        for i in np.arange(len(correlations)):
+            coefficient = correlations[i]
+            if smartypants.lags is None:
+                wr.writerow([i + 1, coefficient])
+            else:
+                wr.writerow([i + 1, coefficient, smartypants.lags[i]])
+    outputs = [name + "_PLOT.png", name + "_CORRELATION_DATA.csv"]
+
+    # clusters the marks by shape and plots the shapes instead of every mark
+    if MARK_CLUSTERS is not None:
+        labels, centroids, sizes = markClusterer(MARK_CLUSTERS).cluster(smartypants.data)
+        fig = markClusterer.plot_centroids(smartypants.xVals, centroids, sizes)
+        fig.savefig(name + "_CLUSTERS.png")
+        plt.close(fig)
+        with open(name + "_CLUSTER_DATA" + ".csv", 'w', newline="") as myfile:
+            wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+            wr.writerow(["Mark Shape", "Number of Marks"])
+            for i in np.arange(len(sizes)):
+                wr.writerow([i + 1, sizes[i]])
+            wr.writerow([])
+            wr.writerow(["Scrub Mark Profile", "Mark Shape"])
+            for i in np.arange(len(labels)):
+                wr.writerow([i + 1, labels[i] + 1])
+            wr.writerow([])
+            wr.writerow(["X-location"] + ["Shape " + str(i + 1) + " normalized Z" for i in np.arange(len(sizes))])
+            for j in np.arange(len(smartypants.xVals)):
+                wr.writerow([smartypants.xVals[j]] + list(centroids[:, j]))
+        outputs.extend([name + "_CLUSTERS.png", name + "_CLUSTER_DATA.csv"])
+
+    # matches the marks against the library of historical marks
+    if MARK_LIBRARY_DIR is not None:
+        outputs.append(match_marks(name, smartypants.data))
+
+    # scores the marks by how badly the basis of good marks reconstructs them
+    if MARK_ANOMALY_MODEL is not None:
+        scorer = load_anomaly_scorer()
+        scores, flags = scorer.score(smartypants.data)
+        with open(name + "_ANOMALY_DATA" + ".csv", 'w', newline="") as myfile:
+            wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+            wr.writerow(["Threshold", scorer.threshold])
+            wr.writerow(["Anomalous marks", int(np.sum(flags))])
+            wr.writerow([])
+            wr.writerow(["Scrub Mark Profile", "Anomaly Score", "Anomalous"])
+            for i in np.arange(len(scores)):
+                wr.writerow([i + 1, scores[i], flags[i]])
+        outputs.append(name + "_ANOMALY_DATA.csv")
+    return outputs
 
 if __name__ == '__main__':
     # ask user whether performing single-cursor or multi-cursor analysis
@@ -22,114 +300,34 @@ if __name__ == '__main__':
 
         # Navigate to folder named "single_cursor"
         home_dir = os.getcwd()
-        os.chdir(home_dir + "/single_cursor")
-        single_cursor_dir = os.getcwd()
+        single_cursor_dir = os.path.join(home_dir, "single_cursor")
         for files in os.walk(single_cursor_dir):
             names = files[2]
             for name in names:
 
                 # ensure that image files and output data from this script are not read as inputs
-                if not ((name.__contains__(".png")) or (name.__contains__("_SLOPE&EXTREMA_DATA"))):
-                    # read scrub mark profile information
-                    raw_vector = pd.read_csv(name).drop([0, 1])
-                    raw_vector.name = name
+                if not ((name.__contains__(".png")) or (name.__contains__("_SLOPE&EXTREMA_DATA")) or
+                        (name.__contains__("_LIBRARY_MATCHES")) or (name.__contains__("_ROUGHNESS_DATA"))):
                     print("\n\n" + name)
-                    name = name[:len(name) - 4]
-
-                    # extract x values
-                    x = list(map(float, raw_vector.x.tolist()))
-
-                    # extract z values
-                    z_values = raw_vector.iloc[:, 1].tolist()
-                    z_values = [z if z != " ---" else np.NAN for z in z_values]  # replace all instances of " ---" with np.NAN
-                    z_values = list(map(float, z_values))
-
-                    # runs the single-cursor slope and outlier analyzer
-                    oa = outlierAnalyzer(x, z_values)
-                    extreme_data, slope_data, fig = oa.plot_vector(num_extrema, num_extrema)
-
-                    # saves the plot to a png file
-                    fig.savefig(name + "_PLOT.png")
-
-                    # saves the output data to a csv file
-                    with open(name + "_SLOPE&EXTREMA_DATA" + ".csv", 'w', newline="") as myfile:
-                        wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
-
-                        # write the minimum Z values on the scrub mark profile vector and their locations
-                        wr.writerow(["minimum Z Values", "X-location"])
-                        for i in np.arange(len(extreme_data[0])):
-                            min = extreme_data[1][i]
-                            min_loc = extreme_data[0][i]
-                            wr.writerow([min, min_loc])
-                        wr.writerow([])
-
-                        # write the maximum Z values on the scrub mark profile vector and their locations
-                        wr.writerow(["maximum Z Values", "X-location"])
-                        for i in np.arange(len(extreme_data[2])):
-                            max = extreme_data[3][i]
-                            max_loc = extreme_data[2][i]
-                            wr.writerow([max, max_loc])
-                        wr.writerow([])
-
-                        # write the minimum profile slopes and their location and weight
-                        wr.writerow(["Minimum Slopes (microns/micron)", "X-location", "Weight"])
-                        for i in np.arange(len(slope_data[1])):
-                            min_slope = slope_data[2][i]
-                            min_slope_loc = slope_data[1][i]
-                            min_slope_weight = slope_data[3][i]
-                            wr.writerow([min_slope, min_slope_loc, min_slope_weight])
-                        wr.writerow([])
-
-                        # write the maximum profile slopes and their location and weight
-                        wr.writerow(["Maximum Slopes (microns/micron)", "X-location", "Weight"])
-                        for i in np.arange(len(slope_data[1])):
-                            max_slope = slope_data[2][i]
-                            max_slope_loc = slope_data[1][i]
-                            max_slope_weight = slope_data[3][i]
-                            wr.writerow([max_slope, max_slope_loc, max_slope_weight])
-                    print("\nData file and plots for " + name + " generated!")
+                    analyze_single_cursor(os.path.join(files[0], name), num_extrema)
+                    print("\nData file and plots for " + name[:len(name) - 4] + " generated!")
     elif prompt_analysis_type == "m" or prompt_analysis_type == "M":
 
         # navigate to the folder named "multi_cursor"
         home_dir = os.getcwd()
-        os.chdir(home_dir + "/multi_cursor")
-        multi_cursor_dir = os.getcwd()
+        multi_cursor_dir = os.path.join(home_dir, "multi_cursor")
+        store_dir = None if PROFILE_STORE_DIR is None else os.path.join(home_dir, PROFILE_STORE_DIR)
         for files in os.walk(multi_cursor_dir):
             names = files[2]
             for name in names:
 
                 # ensure that image files and output data from this script are not read as inputs
-                if not ((name.__contains__(".png")) or (name.__contains__("CORRELATION_DATA"))):
-
-                    # read in the data file
-                    raw_data = pd.read_csv(name).drop([0, 1])
-                    raw_data.name = name
+                if not ((name.__contains__(".png")) or (name.__contains__("CORRELATION_DATA")) or
+                        (name.__contains__("CLUSTER_DATA")) or (name.__contains__("_LIBRARY_MATCHES")) or
+                        (name.__contains__("_ANOMALY_DATA"))):
                     print("\n\n" + name)
-                    name = name[:len(name) - 4]
-
-                    # prime the vectors for analysis
-                    x = list(map(float, raw_data.x.tolist()))
-                    raw_vectors = []
-                    for i in np.arange(1, len(raw_data.columns)):
-                        y = raw_data.iloc[:, i]
-                        y = [z if z != " ---" else np.NAN for z in y]  # replace all instances of " ---" with np.NAN
-                        y = list(map(float, y))
-                        raw_vectors.append(y)
-
-                    # perform multi-vector analysis and plot to an image
-                    smartypants = multiVector(x, raw_vectors)
-                    correlations, fig = smartypants.plot_vectors(False)
-                    fig.savefig(name + "_PLOT.png")
-
-                    # write correlation data to an output csv
-                    with open(name + "_CORRELATION_DATA" + ".csv", 'w', newline="") as myfile:
-                        wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
-                        wr.writerow(["Scrub Mark Profile", "Correlation Coefficient"])
-                        for i in np.arange(len(correlations)):
-                            coefficient = correlations[i]
-                            wr.writerow([i + 1, coefficient])
-                    print("\nData file and plots for " + name + " generated!")
+                    analyze_multi_cursor(os.path.join(files[0], name), store_dir)
+                    print("\nData file and plots for " + name[:len(name) - 4] + " generated!")
     else:
         print("your analysis type was not one of the two options.")
     input("\nPress \'Enter\' to exit program")
-
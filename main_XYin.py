@@ -4,7 +4,7 @@ the "Nikon CAD inputs" subfolder.
 
 Author: Sean Lin
 Date Created: 7/26/21
-Last Modified: 8/06/21
+Last Modified: 10/19/26
 """
 from XYwizard import XYwizard
 import shutil
@@ -16,7 +16,8 @@ def generate_input_csv(data):
     """
     uses an instance of the XYwizard class to generate points on the wafer
     :param data: the pandas dataframe that the data will be read from
-    :return: X and Y coordinates generated by XYwizard (2 lists), extension to append to output file name (string)
+    :return: X and Y coordinates generated by XYwizard (2 lists), extension to append to output file name (string),
+             X and Y coordinates of the full layout (2 lists, None if the coordinates were not sampled down)
     """
     wiz = XYwizard()
 
@@ -58,13 +59,16 @@ def generate_input_csv(data):
         trying = (try_again == 'y')
 
     # replacing the lists that cover the full wafer with the sampled-down lists
+    full_x, full_y = None, None
     if sampled_down:
+        full_x = [i * 0.001 for i in x]
+        full_y = [j * 0.001 for j in y]
         x, y = x_new, y_new
 
     # converting all coordinate units from microns to millimeters
     x = [i * 0.001 for i in x]
     y = [j * 0.001 for j in y]
-    return x, y, file_extension
+    return x, y, file_extension, full_x, full_y
 
 if __name__ == '__main__':
     home_dir = os.getcwd()
@@ -80,7 +84,7 @@ if __name__ == '__main__':
                 name = name[:len(name) - 4]
                 data.name = name
                 print("\n\n\n-- NOW DOWNSAMPLING " + data.name + " --")
-                x, y, file_extension = generate_input_csv(data)
+                x, y, file_extension, full_x, full_y = generate_input_csv(data)
                 if (os.path.isdir(Nikon_ready_csvs + "/" + name)):
                     shutil.rmtree(Nikon_ready_csvs + "/" + name)
                     os.mkdir(Nikon_ready_csvs + "/" + name)
@@ -92,6 +96,12 @@ if __name__ == '__main__':
                     for i in range(len(x)):
                         wr.writerow([x[i], y[i]])
                 print('CSV file \'' + name + file_extension + '.csv\' generated and ready for Nikons!')
+                # keeps the full layout next to the sampled-down one so errors can be interpolated to every site
+                if full_x is not None:
+                    with open(name + '_full_layout_XYin.csv', 'w', newline="") as myfile:
+                        wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+                        for i in range(len(full_x)):
+                            wr.writerow([full_x[i], full_y[i]])
             shutil.move(CAD_input_dir + "/" + name + ".csv", Nikon_ready_csvs + "/" + name)
             os.chdir(CAD_input_dir)
     input("Press \'enter\' to exit program")
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Class markAnomalyScorer screens VEECO scrub mark profiles for anomalous shapes.  A k component principal component
+basis is fit to a reference set of good marks and saved; new marks are then scored by how badly the basis
+reconstructs them.
+
+Marks are resampled and normalized to magnitude 1 as in the mark library (see markLibrary.normalize_marks), so the
+score only depends on the shape of a mark.  The score of a mark is the RMS of its reconstruction error
+    sqrt((|x - mean|^2 - |(x - mean) C|^2) / points)
+with C the orthonormal basis, so a whole batch of marks is scored with one matrix multiply.  Marks scoring above the
+threshold (a high quantile of the scores of the reference marks) are flagged.
+
+The basis is fit from the covariance of the reference marks accumulated chunk by chunk, so reference sets of any
+size fit in bounded memory.
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import numpy as np
+from markLibrary import markLibrary
+
+class markAnomalyScorer(object):
+    # number of marks scored at once
+    CHUNK_ROWS = 4096
+
+    def __init__(self, mean, components, threshold):
+        """
+        constructor for the markAnomalyScorer class (see fit and load)
+        :param mean: mean normalized reference mark
+        :param components: orthonormal basis (points x components) of the normalized reference marks
+        :param threshold: score above which a mark is flagged as anomalous
+        """
+        self.mean = np.asarray(mean, dtype=float)
+        self.components = np.asarray(components, dtype=float)
+        self.threshold = float(threshold)
+        self.num_points = self.mean.size
+
+    @staticmethod
+    def fit(reference_sets, num_components=5, num_points=256, quantile=0.99):
+        """
+        fits the basis to reference sets of good marks
+        :param reference_sets: list of 2D arrays (or 2D lists) of aligned and patched good marks, one mark per row.
+                               Marks of different sets may have different lengths.
+        :param num_components: number of principal components of the basis
+        :param num_points: number of points every mark is resampled to
+        :param quantile: quantile of the reference marks' scores used as the threshold
+        :return: the fitted markAnomalyScorer
+        """
+        def chunks():
+            for marks in reference_sets:
+                for start in np.arange(0, len(marks), markAnomalyScorer.CHUNK_ROWS):
+                    yield markLibrary.normalize_marks(marks[start:start + markAnomalyScorer.CHUNK_ROWS],
+                                                      num_points).astype(float)
+
+        # sums of the marks and of their outer products, chunk by chunk
+        count = 0
+        total = np.zeros(num_points)
+        outer = np.zeros((num_points, num_points))
+        for chunk in chunks():
+            count += chunk.shape[0]
+            total += chunk.sum(axis=0)
+            outer += chunk.T @ chunk
+        assert count > 1, "at least 2 reference marks are needed"
+        mean = total / count
+        covariance = outer / count - np.outer(mean, mean)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        num_components = min(num_components, num_points, count - 1)
+        components = eigenvectors[:, ::-1][:, :num_components]
+
+        scorer = markAnomalyScorer(mean, components, np.inf)
+        scores = np.concatenate([scorer.score_prepared(chunk) for chunk in chunks()])
+        scorer.threshold = float(np.quantile(scores, quantile))
+        return scorer
+
+    def score_prepared(self, prepared):
+        """
+        :param prepared: 2D array of normalized marks resampled to the number of points of the basis
+        :return: reconstruction error RMS of every mark
+        """
+        residual = prepared - self.mean
+        coordinates = residual @ self.components
+        squared = np.sum(residual ** 2, axis=1) - np.sum(coordinates ** 2, axis=1)
+        return np.sqrt(np.maximum(squared, 0) / self.num_points)
+
+    def score(self, marks):
+        """
+        scores marks, chunk by chunk
+        :param marks: 2D array (or 2D list) of aligned and patched marks, one mark per row
+        :return: [anomaly score of every mark, T/F of every mark to indicate whether it scores above the threshold]
+        """
+        scores = np.empty(len(marks))
+        for start in np.arange(0, len(marks), self.CHUNK_ROWS):
+            chunk = markLibrary.normalize_marks(marks[start:start + self.CHUNK_ROWS], self.num_points).astype(float)
+            scores[start:start + chunk.shape[0]] = self.score_prepared(chunk)
+        return scores, scores > self.threshold
+
+    def save(self, filename):
+        """
+        saves the basis and threshold to a .npz file
+        :param filename: path of the .npz file
+        :return: NA
+        """
+        np.savez(filename, mean=self.mean, components=self.components, threshold=self.threshold)
+
+    @staticmethod
+    def load(filename):
+        """
+        :param filename: path of a .npz file written by save
+        :return: the saved markAnomalyScorer
+        """
+        with np.load(filename) as saved:
+            return markAnomalyScorer(saved["mean"], saved["components"], saved["threshold"])
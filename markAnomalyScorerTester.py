@@ -0,0 +1,56 @@
+"""
+Testing script for the reconstruction error anomaly scoring of scrub marks
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import os
+import tempfile
+import time
+import numpy as np
+from markAnomalyScorer import markAnomalyScorer
+
+def make_good_marks(num_marks, num_points, rng):
+    """
+    helper that builds good marks: a single dip whose depth, width and position vary a little
+    """
+    grid = np.linspace(0, 1, num_points)
+    centers = rng.normal(0.5, 0.01, (num_marks, 1))
+    widths = rng.normal(0.1, 0.005, (num_marks, 1))
+    depths = rng.uniform(0.5, 2, (num_marks, 1))
+    return -depths * np.exp(-((grid - centers) / widths) ** 2) + rng.normal(0, 0.005, (num_marks, num_points))
+
+def test_flags_bad_marks():
+    """
+    double dips are flagged, good marks (including marks of another length) mostly are not, and the basis survives
+    a round trip through its file
+    """
+    rng = np.random.default_rng(0)
+    reference = [make_good_marks(400, 300, rng), make_good_marks(200, 250, rng)]
+    scorer = markAnomalyScorer.fit(reference, 5)
+    grid = np.linspace(0, 1, 300)
+    bad = -np.exp(-((grid - 0.35) / 0.05) ** 2) - np.exp(-((grid - 0.65) / 0.05) ** 2)
+    with tempfile.TemporaryDirectory() as path:
+        scorer.save(os.path.join(path, "basis.npz"))
+        scorer = markAnomalyScorer.load(os.path.join(path, "basis.npz"))
+    scores, flags = scorer.score(np.vstack([make_good_marks(200, 300, rng), bad[np.newaxis, :]]))
+    assert flags[-1] and scores[-1] > 5 * scorer.threshold
+    assert np.mean(flags[:-1]) < 0.05
+
+def test_many_marks():
+    """
+    a production card worth of marks is scored in well under a second
+    """
+    rng = np.random.default_rng(1)
+    scorer = markAnomalyScorer.fit([make_good_marks(500, 256, rng)], 5)
+    marks = make_good_marks(50000, 256, rng)
+    start = time.perf_counter()
+    scores, flags = scorer.score(marks)
+    assert time.perf_counter() - start < 1
+    assert scores.shape == (50000,)
+
+if __name__ == '__main__':
+    test_flags_bad_marks()
+    test_many_marks()
+    print("markAnomalyScorer tests passed")
@@ -0,0 +1,112 @@
+"""
+   class markClusterer groups a SET of VEECO scrub mark profiles into clusters of similar mark shapes, so large probe
+   card qualifications show how many distinct mark shapes there are instead of every mark's correlation with a
+   single average.
+
+   Marks are normalized to magnitude 1 (as multiVector.dot_products does), reduced to a few principal components with
+   incremental PCA and clustered with mini-batch k-means.  Every step works through the marks chunk by chunk, so tens
+   of thousands of marks (for example the memory-mapped data of a profileStore) are clustered in bounded memory.
+
+   Author: Sean Lin
+   Date Created: 10/19/2026
+   Last Modified: 10/19/2026
+"""
+import numpy as np
+
+class markClusterer(object):
+    # number of marks processed at once
+    CHUNK_ROWS = 4096
+
+    def __init__(self, num_clusters=5, num_components=10, passes=3, seed=0):
+        """
+        constructor for the markClusterer class
+        :param num_clusters: number of mark shapes to find
+        :param num_components: number of principal components marks are reduced to before clustering
+        :param passes: number of passes of mini-batch k-means over all marks
+        :param seed: seed of the k-means initialization
+        """
+        self.num_clusters = num_clusters
+        self.num_components = num_components
+        self.passes = passes
+        self.seed = seed
+
+    def chunks(self, num_rows, min_rows):
+        """
+        splits the marks into chunks of CHUNK_ROWS marks, merging a short last chunk into the one before it
+        :param num_rows: number of marks
+        :param min_rows: smallest number of marks in a chunk
+        :return: list of (first mark, last mark + 1) of every chunk
+        """
+        bounds = [[start, min(start + self.CHUNK_ROWS, num_rows)] for start in np.arange(0, num_rows, self.CHUNK_ROWS)]
+        if len(bounds) > 1 and bounds[-1][1] - bounds[-1][0] < min_rows:
+            bounds[-2][1] = bounds.pop()[1]
+        return bounds
+
+    @staticmethod
+    def normalize(chunk):
+        """
+        :param chunk: 2D array of marks, one mark per row
+        :return: marks normalized to magnitude 1
+        """
+        chunk = np.asarray(chunk, dtype=float)
+        norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return chunk / norms
+
+    def cluster(self, data):
+        """
+        clusters the marks by shape
+        :param data: aligned and patched 2D array (or 2D list) of marks, one mark per row (see multiVector)
+        :return: [cluster label of every mark, centroid profile of every cluster (the average of its normalized
+                  marks), number of marks in every cluster]
+        """
+        from sklearn.decomposition import IncrementalPCA
+        from sklearn.cluster import MiniBatchKMeans
+        if not isinstance(data, np.ndarray):
+            data = np.asarray(data, dtype=float)
+        num_marks, num_points = data.shape
+        num_clusters = min(self.num_clusters, num_marks)
+        num_components = min(self.num_components, num_points, num_marks)
+        bounds = self.chunks(num_marks, max(num_components, num_clusters))
+
+        # reduces the normalized marks to their leading principal components
+        pca = IncrementalPCA(n_components=num_components)
+        for start, stop in bounds:
+            pca.partial_fit(self.normalize(data[start:stop]))
+        # clusters the reduced marks, chunk by chunk
+        kmeans = MiniBatchKMeans(n_clusters=num_clusters, random_state=self.seed, n_init=3)
+        for i in np.arange(self.passes):
+            for start, stop in bounds:
+                kmeans.partial_fit(pca.transform(self.normalize(data[start:stop])))
+
+        # labels every mark and averages the normalized marks of every cluster
+        labels = np.empty(num_marks, dtype=int)
+        sums = np.zeros((num_clusters, num_points))
+        for start, stop in bounds:
+            chunk = self.normalize(data[start:stop])
+            labels[start:stop] = kmeans.predict(pca.transform(chunk))
+            np.add.at(sums, labels[start:stop], chunk)
+        sizes = np.bincount(labels, minlength=num_clusters)
+        centroids = sums / np.maximum(sizes, 1)[:, np.newaxis]
+        return labels, centroids, sizes
+
+    @staticmethod
+    def plot_centroids(xVals, centroids, sizes):
+        """
+        plots the centroid profile of every cluster instead of every mark
+        :param xVals: x values of the marks
+        :param centroids: centroid profile of every cluster (see cluster)
+        :param sizes: number of marks in every cluster
+        :return: figure to be saved
+        """
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(2, figsize=(12.6, 9.8))
+        for i in np.arange(len(centroids)):
+            ax[0].plot(xVals, centroids[i], '-', label="shape " + str(i + 1) + " (" + str(sizes[i]) + " marks)")
+        ax[1].bar(["shape " + str(i + 1) for i in np.arange(len(sizes))], sizes)
+        fig.tight_layout(pad=2.0)
+        ax[0].set_title("Normalized Z-height of every mark shape")
+        ax[0].set_ylabel("normalized Z-height")
+        ax[1].set_title("Number of marks of every shape")
+        ax[0].legend()
+        return fig
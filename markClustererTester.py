@@ -0,0 +1,53 @@
+"""
+Testing script for the clustering of scrub mark shapes
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import time
+import numpy as np
+from markClusterer import markClusterer
+
+def make_marks(num_marks, rng):
+    """
+    helper that builds noisy marks of three shapes (a single dip, a dip with a lip, a double dip) of varying depth
+    """
+    grid = np.arange(150)
+    shapes = [-np.exp(-((grid - 75) / 10.0) ** 2),
+              -np.exp(-((grid - 75) / 10.0) ** 2) + 0.5 * np.exp(-((grid - 100) / 5.0) ** 2),
+              -np.exp(-((grid - 55) / 6.0) ** 2) - np.exp(-((grid - 95) / 6.0) ** 2)]
+    truth = rng.integers(0, 3, num_marks)
+    depths = rng.uniform(0.5, 2, num_marks)[:, np.newaxis]
+    data = np.array(shapes)[truth] * depths + rng.normal(0, 0.02, (num_marks, grid.size))
+    return grid, data, truth
+
+def test_three_shapes():
+    """
+    marks of three shapes are found as three clusters regardless of their depth
+    """
+    rng = np.random.default_rng(0)
+    grid, data, truth = make_marks(300, rng)
+    labels, centroids, sizes = markClusterer(3).cluster(data)
+    assert sorted(sizes) == sorted(np.bincount(truth))
+    for shape in np.arange(3):
+        assert np.unique(labels[truth == shape]).size == 1
+    assert centroids.shape == (3, grid.size)
+
+def test_many_marks():
+    """
+    tens of thousands of marks are clustered chunk by chunk quickly, and short last chunks are handled
+    """
+    rng = np.random.default_rng(1)
+    grid, data, truth = make_marks(20003, rng)
+    start = time.perf_counter()
+    labels, centroids, sizes = markClusterer(3).cluster(data)
+    assert time.perf_counter() - start < 30
+    assert sizes.sum() == 20003
+    agreement = min(np.bincount(labels[truth == shape]).max() / np.sum(truth == shape) for shape in np.arange(3))
+    assert agreement > 0.99
+
+if __name__ == '__main__':
+    test_three_shapes()
+    test_many_marks()
+    print("markClusterer tests passed")
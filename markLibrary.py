@@ -0,0 +1,244 @@
+"""
+Class markLibrary keeps a persistent library of historical VEECO scrub mark profiles (for example marks of known bad
+probe cards) and finds the historical marks most similar to a new mark.  A library is a folder containing
+    a. profiles.f32: float32 matrix with one row per mark, resampled to a fixed number of points and normalized to
+       magnitude 1 (as multiVector.dot_products normalizes them), so the similarity of two marks is their dot product
+    b. basis_<n>.npy: the leading principal components of (a sample of) the first n marks of the library
+    c. projections_<n>.f32: float32 matrix of the coordinates of every mark on those principal components
+    d. metadata.json: the number of points and principal components, the number of marks the basis was fit to and
+       the name of every mark
+Marks are appended to the files, so adding marks never rewrites the marks already stored.  The files are cut back to
+the marks named in metadata.json before every add, so rows left behind by an interrupted add are dropped.  Whenever
+the library has grown BASIS_GROWTH times larger than the marks its basis was fit to, the basis is refit and every
+mark re-projected (chunk by chunk) into a new pair of files, so the basis follows the marks instead of staying frozen
+to the first few ones.  Growing by a constant factor keeps the cost of refitting to a constant per mark added.  The
+new files only replace the old ones when metadata.json is replaced, so an interrupted refit leaves the library as it
+was.
+
+A query is answered in two steps: the dot products of the query's coordinates with the coordinates of all marks pick
+a short list of candidates (mark shapes vary in only a few directions, so a few principal components preserve most
+of every dot product), and the candidates are then reranked by their exact dot products with the query.  Only the
+small coordinate matrix is read in full, so queries across hundreds of thousands of marks take milliseconds.
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import json
+import os
+import numpy as np
+
+class markLibrary(object):
+    PROFILES_FILE = "profiles.f32"
+    # names of the projection and basis files of a basis fit to a number of marks
+    PROJECTIONS_FILE = "projections_%d.f32"
+    BASIS_FILE = "basis_%d.npy"
+    METADATA_FILE = "metadata.json"
+    # growth of the library (factor) after which the basis is refit
+    BASIS_GROWTH = 2
+    # largest number of marks the basis is fit to
+    BASIS_SAMPLE_MARKS = 8192
+    # number of marks re-projected at once
+    CHUNK_ROWS = 4096
+    # number of candidates reranked exactly per match requested
+    CANDIDATES_PER_MATCH = 20
+
+    def __init__(self, path):
+        """
+        constructor for the markLibrary class.  Opens an existing library.
+        :param path: folder of the library
+        """
+        self.path = path
+        with open(os.path.join(path, self.METADATA_FILE)) as metadata_file:
+            self.metadata = json.load(metadata_file)
+        self.names = self.metadata["names"]
+        self.lookup = set(self.names)
+        self.projection = None
+        if self.metadata["basis_marks"] > 0:
+            self.projection = np.load(os.path.join(path, self.BASIS_FILE % self.metadata["basis_marks"]))
+        self.open_files()
+
+    @staticmethod
+    def create(path, num_points=256, num_projections=32):
+        """
+        creates an empty library (replacing any library already in the folder)
+        :param path: folder of the library
+        :param num_points: number of points every mark is resampled to
+        :param num_projections: number of principal components candidates are searched on
+        :return: the opened markLibrary
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        markLibrary.remove_bases(path, None)
+        with open(os.path.join(path, markLibrary.PROFILES_FILE), 'wb'):
+            pass
+        with open(os.path.join(path, markLibrary.METADATA_FILE), 'w') as metadata_file:
+            json.dump({"num_points": num_points, "num_projections": min(num_projections, num_points),
+                       "basis_marks": 0, "names": []}, metadata_file)
+        return markLibrary(path)
+
+    @staticmethod
+    def remove_bases(path, keep):
+        """
+        removes the basis and projection files of the library except those of the current basis
+        :param path: folder of the library
+        :param keep: number of marks the current basis was fit to (None to remove all)
+        :return: NA
+        """
+        for file_name in os.listdir(path):
+            for template in [markLibrary.BASIS_FILE, markLibrary.PROJECTIONS_FILE]:
+                prefix, suffix = template.split("%d")
+                if file_name.startswith(prefix) and file_name.endswith(suffix) and \
+                        (keep is None or file_name != template % keep):
+                    os.remove(os.path.join(path, file_name))
+
+    def open_files(self):
+        """
+        maps the profile and projection files into memory with the current number of marks
+        :return: NA
+        """
+        self.profiles = None
+        self.projections = None
+        if len(self.names) > 0:
+            self.profiles = np.memmap(os.path.join(self.path, self.PROFILES_FILE), dtype=np.float32, mode='r',
+                                      shape=(len(self.names), self.metadata["num_points"]))
+            self.projections = np.memmap(os.path.join(self.path, self.PROJECTIONS_FILE % self.metadata["basis_marks"]),
+                                         dtype=np.float32, mode='r',
+                                         shape=(len(self.names), self.metadata["num_projections"]))
+
+    def prepare(self, marks):
+        """
+        resamples marks to the number of points of the library and normalizes them to magnitude 1
+        :param marks: 2D array (or 2D list) of aligned and patched marks, one mark per row
+        :return: 2D float32 array of prepared marks
+        """
+        return markLibrary.normalize_marks(marks, self.metadata["num_points"])
+
+    @staticmethod
+    def normalize_marks(marks, num_points):
+        """
+        resamples marks (linearly, over their own length) to a number of points and normalizes them to magnitude 1,
+        all marks at once
+        :param marks: 2D array (or 2D list) of aligned and patched marks, one mark per row (or a single mark)
+        :param num_points: number of points every mark is resampled to
+        :return: 2D float32 array of normalized marks
+        """
+        marks = np.asarray(marks, dtype=float)
+        if marks.ndim == 1:
+            marks = marks[np.newaxis, :]
+        if marks.shape[1] != num_points:
+            positions = np.linspace(0, marks.shape[1] - 1, num_points)
+            below = np.clip(np.floor(positions).astype(int), 0, marks.shape[1] - 2)
+            fraction = positions - below
+            marks = marks[:, below] * (1 - fraction) + marks[:, below + 1] * fraction
+        norms = np.linalg.norm(marks, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return (marks / norms).astype(np.float32)
+
+    def find_basis(self, prepared):
+        """
+        finds the principal components of a set of marks.  If there are fewer marks than components, the basis is
+        completed with random orthonormal directions (until the basis is refit to more marks).
+        :param prepared: prepared marks (see prepare)
+        :return: float32 matrix (points x components) with orthonormal columns
+        """
+        num_points = self.metadata["num_points"]
+        num_projections = self.metadata["num_projections"]
+        components = np.linalg.svd(prepared.astype(float), full_matrices=False)[2][:num_projections].T
+        if components.shape[1] < num_projections:
+            random = np.random.default_rng(0).standard_normal((num_points, num_projections - components.shape[1]))
+            components = np.linalg.qr(np.hstack([components, random]))[0]
+        return components.astype(np.float32)
+
+    def add(self, marks, names):
+        """
+        adds marks to the library.  Marks whose name is already in the library are skipped.
+        :param marks: 2D array (or 2D list) of aligned and patched marks, one mark per row
+        :param names: name of every mark (for example the export file name and mark number)
+        :return: number of marks added
+        """
+        assert len(names) == len(marks), "number of names does not match number of marks"
+        new = [i for i in np.arange(len(names)) if names[i] not in self.lookup]
+        if len(new) == 0:
+            return 0
+        prepared = self.prepare(np.asarray(marks, dtype=float)[new])
+        self.profiles = None
+        self.projections = None
+        basis_marks = self.metadata["basis_marks"]
+        # drops rows written by an add that was interrupted before the metadata was saved
+        os.truncate(os.path.join(self.path, self.PROFILES_FILE), len(self.names) * self.metadata["num_points"] * 4)
+        if self.projection is not None:
+            os.truncate(os.path.join(self.path, self.PROJECTIONS_FILE % basis_marks),
+                        len(self.names) * self.metadata["num_projections"] * 4)
+        with open(os.path.join(self.path, self.PROFILES_FILE), 'ab') as profiles_file:
+            profiles_file.write(prepared.tobytes())
+        num_marks = len(self.names) + len(new)
+        if self.projection is None or num_marks >= self.BASIS_GROWTH * basis_marks:
+            self.refit_basis(num_marks)
+        else:
+            with open(os.path.join(self.path, self.PROJECTIONS_FILE % basis_marks), 'ab') as projections_file:
+                projections_file.write((prepared @ self.projection).astype(np.float32).tobytes())
+        self.names.extend([names[i] for i in new])
+        self.lookup.update(names[i] for i in new)
+        temp_filename = os.path.join(self.path, self.METADATA_FILE + ".tmp")
+        with open(temp_filename, 'w') as metadata_file:
+            json.dump(self.metadata, metadata_file)
+        os.replace(temp_filename, os.path.join(self.path, self.METADATA_FILE))
+        if self.metadata["basis_marks"] != basis_marks:
+            self.remove_bases(self.path, self.metadata["basis_marks"])
+        self.open_files()
+        return len(new)
+
+    def refit_basis(self, num_marks):
+        """
+        fits the basis to a sample of all marks of the library (including marks being added) and projects every mark
+        on it, into new basis and projection files that are used once the metadata is saved
+        :param num_marks: number of marks in the profile file
+        :return: NA
+        """
+        profiles = np.memmap(os.path.join(self.path, self.PROFILES_FILE), dtype=np.float32, mode='r',
+                             shape=(num_marks, self.metadata["num_points"]))
+        sample = np.unique(np.linspace(0, num_marks - 1, min(num_marks, self.BASIS_SAMPLE_MARKS)).astype(int))
+        self.projection = self.find_basis(np.asarray(profiles[sample]))
+        np.save(os.path.join(self.path, self.BASIS_FILE % num_marks), self.projection)
+        with open(os.path.join(self.path, self.PROJECTIONS_FILE % num_marks), 'wb') as projections_file:
+            for start in np.arange(0, num_marks, self.CHUNK_ROWS):
+                projections = np.asarray(profiles[start:start + self.CHUNK_ROWS]) @ self.projection
+                projections_file.write(projections.astype(np.float32).tobytes())
+        del profiles
+        self.metadata["basis_marks"] = num_marks
+
+    def query(self, mark, k=5, exclude=()):
+        """
+        finds the marks of the library most similar to a mark
+        :param mark: aligned and patched mark
+        :param k: number of matches to return
+        :param exclude: names of marks not to return (for example the mark itself if it is already in the library)
+        :return: list of (name, similarity) of the k most similar marks, most similar first.  The similarity is the
+                 dot product of the normalized marks (1 for identical shapes).
+        """
+        if len(self.names) == 0:
+            return []
+        prepared = self.prepare(mark)[0]
+        # coarse search over the projections of all marks
+        num_candidates = min(len(self.names), (k + len(exclude)) * self.CANDIDATES_PER_MATCH)
+        approximate = self.projections @ (prepared @ self.projection)
+        if num_candidates < len(self.names):
+            candidates = np.sort(np.argpartition(-approximate, num_candidates - 1)[:num_candidates])
+        else:
+            candidates = np.arange(len(self.names))
+        # exact rerank of the candidates
+        similarities = np.asarray(self.profiles[candidates]) @ prepared
+        matches = []
+        for i in np.argsort(-similarities):
+            if self.names[candidates[i]] not in exclude:
+                matches.append((self.names[candidates[i]], float(similarities[i])))
+            if len(matches) == k:
+                break
+        return matches
+
+    def __len__(self):
+        """
+        :return: number of marks in the library
+        """
+        return len(self.names)
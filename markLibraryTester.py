@@ -0,0 +1,93 @@
+"""
+Testing script for the library of historical scrub marks
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import os
+import tempfile
+import time
+import numpy as np
+from markLibrary import markLibrary
+
+def make_marks(num_marks, num_points, rng):
+    """
+    helper that builds marks whose dip position, width and lip height vary from mark to mark
+    """
+    grid = np.linspace(0, 1, num_points)
+    centers = rng.uniform(0.3, 0.7, (num_marks, 1))
+    widths = rng.uniform(0.03, 0.1, (num_marks, 1))
+    lips = rng.uniform(0, 0.6, (num_marks, 1))
+    return -np.exp(-((grid - centers) / widths) ** 2) + lips * np.exp(-((grid - centers - 2 * widths) / 0.03) ** 2)
+
+def test_add_and_query():
+    """
+    a slightly noisy copy of a stored mark finds that mark first, marks are only added once, and the library
+    reopens with all its marks
+    """
+    rng = np.random.default_rng(0)
+    marks = make_marks(500, 300, rng)
+    with tempfile.TemporaryDirectory() as path:
+        library = markLibrary.create(path)
+        assert library.query(marks[0]) == []
+        assert library.add(marks[:300], ["m" + str(i) for i in np.arange(300)]) == 300
+        assert library.add(marks[250:], ["m" + str(i) for i in np.arange(250, 500)]) == 200
+        # an add interrupted before its metadata was saved leaves rows that the next add drops
+        with open(os.path.join(path, markLibrary.PROFILES_FILE), 'ab') as profiles_file:
+            profiles_file.write(np.ones((3, 256), dtype=np.float32).tobytes())
+        library = markLibrary(path)
+        assert library.add(marks[400:], ["m" + str(i) for i in np.arange(400, 500)]) == 0
+        assert library.add(marks[:1], ["extra"]) == 1
+        assert library.query(marks[0], 2)[1][0] in ["m0", "extra"]
+        library = markLibrary(path)
+        assert len(library) == 501
+        for i in [3, 260, 499]:
+            matches = library.query(marks[i] * 2 + rng.normal(0, 0.01, 300), 3)
+            assert matches[0][0] == "m" + str(i) and matches[0][1] > 0.99
+            assert matches[0][1] >= matches[1][1] >= matches[2][1]
+        assert library.query(marks[3], 3, exclude=["m3"])[0][0] != "m3"
+
+def test_basis_refit():
+    """
+    the basis is refit as the library grows, and only the files of the current basis are kept
+    """
+    rng = np.random.default_rng(2)
+    marks = make_marks(400, 100, rng)
+    with tempfile.TemporaryDirectory() as path:
+        library = markLibrary.create(path, num_points=100, num_projections=8)
+        library.add(marks[:2], ["m0", "m1"])
+        first_basis = library.projection
+        library.add(marks[2:3], ["m2"])
+        assert library.projection is first_basis
+        library.add(marks[3:], ["m" + str(i) for i in np.arange(3, 400)])
+        assert library.metadata["basis_marks"] == 400
+        assert sorted(os.listdir(path)) == ["basis_400.npy", "metadata.json", "profiles.f32", "projections_400.f32"]
+        library = markLibrary(path)
+        assert np.allclose(library.projections, library.profiles @ library.projection, atol=1e-5)
+        assert library.query(marks[7])[0][0] == "m7"
+
+def test_large_library():
+    """
+    queries across a hundred thousand marks take milliseconds and agree with a brute force search
+    """
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as path:
+        library = markLibrary.create(path, num_points=128)
+        for block in np.arange(10):
+            marks = make_marks(10000, 128, rng)
+            library.add(marks, [str(block) + "_" + str(i) for i in np.arange(10000)])
+        queries = make_marks(20, 128, rng)
+        start = time.perf_counter()
+        results = [library.query(query, 5) for query in queries]
+        assert (time.perf_counter() - start) / len(queries) < 0.05
+        profiles = np.asarray(library.profiles)
+        for query, matches in zip(queries, results):
+            exact = profiles @ library.prepare(query)[0]
+            assert np.isclose(matches[0][1], exact.max(), atol=1e-3)
+
+if __name__ == '__main__':
+    test_add_and_query()
+    test_basis_refit()
+    test_large_library()
+    print("markLibrary tests passed")
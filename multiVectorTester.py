@@ -0,0 +1,80 @@
+"""
+Testing script for the cross-correlation alignment of scrub mark profiles in multiVector
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import os
+import tempfile
+import time
+import numpy as np
+from mutliVector import multiVector
+
+def make_marks(shifts, num_points=200):
+    """
+    helper that builds scrub mark profiles (a dip with a raised lip) shifted along x by the given number of samples
+    """
+    xVals = np.arange(num_points) * 0.5
+    grid = np.arange(num_points)
+    data = np.array([-np.exp(-((grid - 100 - shift) / 8.0) ** 2) + 0.4 * np.exp(-((grid - 120 - shift) / 4.0) ** 2)
+                     for shift in shifts])
+    return xVals, data
+
+def test_find_lags():
+    """
+    integer and sub-sample shifts are recovered relative to the reference
+    """
+    shifts = np.array([0, 3, -7.5, 12.25, -0.4])
+    xVals, data = make_marks(shifts)
+    lags = multiVector.find_lags(data, data[0])
+    assert np.allclose(lags, shifts, atol=0.15)
+
+def test_align_marks():
+    """
+    aligned marks correlate with their average far better than misaligned ones, share one x range and keep their
+    shifts in the units of x
+    """
+    shifts = np.array([0, 6, -6, 10, -10, 3])
+    xVals, data = make_marks(shifts)
+    misaligned = multiVector(xVals.tolist(), data.tolist())
+    aligned = multiVector(xVals.tolist(), data.tolist(), True)
+    assert min(aligned.dot_products(aligned.data)) > 0.99
+    assert min(aligned.dot_products(aligned.data)) > min(misaligned.dot_products(misaligned.data))
+    assert len(aligned.xVals) == aligned.data.shape[1] < len(xVals)
+    assert not np.isnan(aligned.data).any()
+    assert np.allclose(np.diff(aligned.lags), np.diff(shifts) * 0.5, atol=0.1)
+
+def test_many_marks():
+    """
+    tens of thousands of marks are aligned in one pass of batched FFTs
+    """
+    rng = np.random.default_rng(0)
+    shifts = rng.uniform(-20, 20, 20000)
+    xVals, data = make_marks(shifts)
+    start = time.perf_counter()
+    lags = multiVector.find_lags(data, make_marks([0])[1][0])
+    assert time.perf_counter() - start < 5
+    assert np.allclose(lags, shifts, atol=0.15)
+
+def test_shift_memory_mapped():
+    """
+    memory-mapped marks are shifted into a float32 scratch file that leaves nothing behind
+    """
+    shifts = np.array([0, 4.5, -9, 2])
+    xVals, data = make_marks(shifts)
+    with tempfile.TemporaryDirectory() as path:
+        mapped = np.memmap(os.path.join(path, "marks.f32"), dtype=np.float32, mode='w+', shape=data.shape)
+        mapped[:] = data
+        shifted = multiVector.shift_array(mapped, -shifts)
+        assert isinstance(shifted, np.memmap) and shifted.dtype == np.float32
+        assert np.allclose(shifted, multiVector.shift_array(data, -shifts), atol=1e-5, equal_nan=True)
+        assert os.listdir(path) == ["marks.f32"]
+        del mapped, shifted
+
+if __name__ == '__main__':
+    test_find_lags()
+    test_align_marks()
+    test_many_marks()
+    test_shift_memory_mapped()
+    print("multiVector tests passed")
@@ -3,14 +3,18 @@
 
    Author: Sean Lin
    Date Created: 6/22/2021
-   Last Modified: 7/29/2021
+   Last Modified: 10/19/2026
 """
+import os
+import tempfile
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
 from vectorProcessor import vectorProcessor
 
 class multiVector(object):
+    # number of vectors processed at once when working through large (memory-mapped) sets of vectors
+    CHUNK_ROWS = 4096
+    # largest shift (fraction of the vector length) searched for when aligning marks by cross-correlation
+    MAX_LAG_FRACTION = 0.25
 
     def find_PC(self, data):
         """
@@ -19,6 +23,7 @@ class multiVector(object):
         :param data: 2D list of vectors
         :return: first principle component vector
         """
+        from sklearn.decomposition import PCA
         pca = PCA(n_components=1)
         pca.fit(data)
         return pca.components_[0]
@@ -28,41 +33,34 @@ class multiVector(object):
         takes a dot product between the normalized vector i and normalized average vector to determine a correlation
         coefficient.  This coefficient acts as a metric for how similar each individual vector is to the average vector.
 
-        :param data: 2D list of vectors
+        :param data: 2D list (or 2D array) of vectors
         :return: list of dot products (correlation coefficients)
         """
-        # finds the norm of the average scrub mark profile vector
-        avg_norm = np.linalg.norm(self.average_vector(data))
-        # uses norm found above to normalize average scrub mark profile vector to magnitude 1
-        avg_normalized = [x / avg_norm for x in self.average_vector(data)]
+        # finds the average scrub mark profile vector and normalizes it to magnitude 1
+        avg_vector = np.asarray(self.average_vector(data))
+        avg_normalized = avg_vector / np.linalg.norm(avg_vector)
         d_prods = []
-        count = 0
         print("\n-------------CORR COEFFS--------------")
-        for lst in data:
-            count += 1
-            # finds the norm of the ith scrub mark profile vector
-            list_norm = np.linalg.norm(lst)
-            # uses norm found above to normalize ith scrub mark profile vector to magnitude 1
-            list_normalized = [x / list_norm for x in lst]
-            d_prod = np.dot(list_normalized, avg_normalized)
-            d_prods.append(d_prod)
-            print("Correlation coefficient of vector " + str(count) + " : " + str(d_prod))
+        # works through the vectors in chunks so memory-mapped data is never loaded all at once
+        for start in np.arange(0, len(data), self.CHUNK_ROWS):
+            chunk = np.asarray(data[start:start + self.CHUNK_ROWS], dtype=float)
+            # normalizes each scrub mark profile vector to magnitude 1 before taking the dot product
+            d_prods.extend((chunk @ avg_normalized / np.linalg.norm(chunk, axis=1)).tolist())
+        for count in np.arange(len(d_prods)):
+            print("Correlation coefficient of vector " + str(count + 1) + " : " + str(d_prods[count]))
         return d_prods
 
     @staticmethod
     def average_vector(data):
         """
         finds the single average vector of all vectors in data
-        :param data: 2D list of vectors
+        :param data: 2D list (or 2D array) of vectors
         :return: average vector
         """
-        avg_vector = []
-        for i in np.arange(len(data[0])):
-            values = []
-            for lst in data:
-                values.append(lst[i])
-            avg_vector.append(np.mean(values))
-        return avg_vector
+        total = np.zeros(len(data[0]))
+        for start in np.arange(0, len(data), multiVector.CHUNK_ROWS):
+            total += np.sum(np.asarray(data[start:start + multiVector.CHUNK_ROWS], dtype=float), axis=0)
+        return (total / len(data)).tolist()
 
     def plot_vectors(self, boolPCA):
         """
@@ -71,6 +69,7 @@ class multiVector(object):
         :return: [correlation coefficients of all the individuals scrub marks with average scrub mark (list),
          figure to be saved]
         """
+        import matplotlib.pyplot as plt
         colors = ["tab:blue", "tab:orange", "tab:green", "tab:red", "tab:purple", "tab:brown", "tab:pink", "tab:gray", "tab:olive", "tab:cyan"]
         fig, ax = plt.subplots(2, figsize=(12.6, 9.8))
         d_prods = self.dot_products(self.data)
@@ -105,9 +104,11 @@ class multiVector(object):
         and return the number of elements snipped.
 
         :param xVals: x values corresponding to all vectors
-        :param data: 2D list of vectors
+        :param data: 2D list of vectors (2D arrays are aligned by align_array)
         :return: aligned 2D list of vectors (may not be patched)
         """
+        if isinstance(data, np.ndarray):
+            return multiVector.align_array(xVals, data)
         global list
         vp = vectorProcessor()
         allNumCutFront = []
@@ -133,6 +134,136 @@ class multiVector(object):
         xVals_snipped = xVals[maxCutFront:len(list) - maxCutBack]
         return xVals_snipped, snipped_data
 
+    @staticmethod
+    def align_array(xVals, data):
+        """
+        2D array version of align_data.  Finds the number of np.NAN values at the front and back of every vector
+        (chunk by chunk) and returns a slice of data, which is a zero-copy view for numpy and memory-mapped arrays.
+
+        :param xVals: x values corresponding to all vectors
+        :param data: 2D array of vectors, one vector per row
+        :return: aligned x values, aligned 2D array of vectors (may not be patched)
+        """
+        num_points = data.shape[1]
+        maxCutFront = 0
+        maxCutBack = 0
+        for start in np.arange(0, data.shape[0], multiVector.CHUNK_ROWS):
+            valid = ~np.isnan(data[start:start + multiVector.CHUNK_ROWS])
+            # rows without any valid value are cut entirely, as cut_front would
+            numCutFront = np.where(valid.any(axis=1), np.argmax(valid, axis=1), num_points)
+            numCutBack = np.where(valid.any(axis=1), np.argmax(valid[:, ::-1], axis=1), num_points)
+            maxCutFront = max(maxCutFront, int(numCutFront.max()))
+            maxCutBack = max(maxCutBack, int(numCutBack.max()))
+        return xVals[maxCutFront:num_points - maxCutBack], data[:, maxCutFront:num_points - maxCutBack]
+
+    @staticmethod
+    def find_lags(data, reference, max_lag=None):
+        """
+        finds the shift of every vector relative to the reference vector by FFT cross-correlation, in O(n log n) per
+        vector and for a whole chunk of vectors at once.  The peak of the cross-correlation is refined to a sub-sample
+        shift by fitting a parabola through it and its two neighbors.
+
+        :param data: patched 2D array of vectors, one vector per row
+        :param reference: patched reference vector the vectors are aligned to
+        :param max_lag: largest shift (number of samples) searched for, defaults to MAX_LAG_FRACTION of the length
+        :return: array of the shift (fractional number of samples) of every vector, positive when a vector's
+                 features lie further along x than the reference's
+        """
+        num_points = data.shape[1]
+        if max_lag is None:
+            max_lag = int(num_points * multiVector.MAX_LAG_FRACTION)
+        max_lag = max(1, min(max_lag, num_points - 1))
+        # zero padding to at least twice the length keeps the correlation from wrapping around
+        num_fft = 1 << int(np.ceil(np.log2(2 * num_points)))
+        reference = np.asarray(reference, dtype=float)
+        reference_fft = np.conj(np.fft.rfft(reference - reference.mean(), num_fft))
+        # lags -max_lag..max_lag are gathered in order from the circular correlation
+        lag_indices = np.arange(-max_lag, max_lag + 1) % num_fft
+        lags = np.empty(data.shape[0])
+        for start in np.arange(0, data.shape[0], multiVector.CHUNK_ROWS):
+            chunk = np.asarray(data[start:start + multiVector.CHUNK_ROWS], dtype=float)
+            chunk = chunk - chunk.mean(axis=1, keepdims=True)
+            correlation = np.fft.irfft(np.fft.rfft(chunk, num_fft, axis=1) * reference_fft, num_fft, axis=1)
+            correlation = correlation[:, lag_indices]
+            peak = np.clip(np.argmax(correlation, axis=1), 1, 2 * max_lag - 1)
+            rows = np.arange(chunk.shape[0])
+            before, at, after = correlation[rows, peak - 1], correlation[rows, peak], correlation[rows, peak + 1]
+            curvature = before - 2 * at + after
+            with np.errstate(invalid='ignore', divide='ignore'):
+                offset = np.where(curvature < 0, 0.5 * (before - after) / curvature, 0)
+            lags[start:start + chunk.shape[0]] = peak - max_lag + np.clip(offset, -0.5, 0.5)
+        return lags
+
+    @staticmethod
+    def shift_array(data, lags):
+        """
+        resamples every vector onto the common grid by shifting it back by its lag, with linear interpolation for
+        sub-sample shifts.  Points shifted in from beyond the ends of a vector are np.NAN, so that align_array can
+        snip all vectors down to the range they share.
+
+        Memory-mapped vectors (for example the profiles of a profileStore) are shifted chunk by chunk into a float32
+        scratch file next to them, which is removed once the shifted vectors are no longer used, so they are never
+        held in memory all at once.
+
+        :param data: patched 2D array of vectors, one vector per row
+        :param lags: shift (fractional number of samples) of every vector (see find_lags)
+        :return: 2D array of shifted vectors (memory-mapped float32 array for memory-mapped vectors)
+        """
+        num_points = data.shape[1]
+        if isinstance(data, np.memmap):
+            scratch_dir = os.path.dirname(data.filename) if data.filename is not None else None
+            with tempfile.TemporaryFile(dir=scratch_dir) as scratch_file:
+                shifted = np.memmap(scratch_file, dtype=np.float32, mode='w+', shape=data.shape)
+        else:
+            shifted = np.empty(data.shape)
+        grid = np.arange(num_points)
+        for start in np.arange(0, data.shape[0], multiVector.CHUNK_ROWS):
+            chunk = np.asarray(data[start:start + multiVector.CHUNK_ROWS], dtype=float)
+            positions = grid + np.asarray(lags[start:start + chunk.shape[0]])[:, np.newaxis]
+            below = np.clip(np.floor(positions).astype(int), 0, num_points - 2)
+            fraction = positions - below
+            rows = np.arange(chunk.shape[0])[:, np.newaxis]
+            values = chunk[rows, below] * (1 - fraction) + chunk[rows, below + 1] * fraction
+            values[(positions < 0) | (positions > num_points - 1)] = np.NAN
+            shifted[start:start + chunk.shape[0]] = values
+        return shifted
+
+    def align_lags(self, max_lag=None):
+        """
+        aligns the marks to their average by cross-correlation, so marks shifted along x by probe placement are
+        compared feature to feature, and snips all marks to the x range they share.  The shift of every mark (in the
+        units of x) is kept in self.lags.
+
+        :param max_lag: largest shift (number of samples) searched for, defaults to MAX_LAG_FRACTION of the length
+        :return: NA
+        """
+        data = np.asarray(self.data, dtype=float) if not isinstance(self.data, np.ndarray) else self.data
+        lags = self.find_lags(data, self.average_vector(data), max_lag)
+        self.lags = (lags * np.mean(np.diff(self.xVals))).tolist()
+        self.xVals, self.data = self.align_array(np.asarray(self.xVals), self.shift_array(data, lags))
+        self.xVals = self.xVals.tolist()
+
+    @staticmethod
+    def patch_array(data):
+        """
+        2D array version of patch_data.  Vectors are only copied if any of them still contain np.NAN values,
+        otherwise data is returned as is (for example profiles from a profileStore, which are patched on creation).
+
+        :param data: aligned 2D array of vectors, one vector per row
+        :return: patched 2D array of vectors
+        """
+        rows_to_patch = []
+        for start in np.arange(0, data.shape[0], multiVector.CHUNK_ROWS):
+            has_nan = np.isnan(data[start:start + multiVector.CHUNK_ROWS]).any(axis=1)
+            rows_to_patch.extend((start + np.flatnonzero(has_nan)).tolist())
+        if len(rows_to_patch) == 0:
+            return data
+        vp = vectorProcessor()
+        patched_data = np.array(data)
+        for i in rows_to_patch:
+            patched_data[i] = vp.patch_vector(patched_data[i].tolist())
+        return patched_data
+
     @staticmethod
     def patch_data(data):
         """
@@ -140,9 +271,11 @@ class multiVector(object):
         lists in data.
         Utilizes vectorProcessor class.
 
-        :param data: 2D list of all vectors
+        :param data: 2D list of all vectors (2D arrays are patched by patch_array)
         :return: patched 2D list of all vectors
         """
+        if isinstance(data, np.ndarray):
+            return multiVector.patch_array(data)
         vp = vectorProcessor()
         patched_data = []
         for lst in data:
@@ -150,11 +283,17 @@ class multiVector(object):
             patched_data.append(patched_list)
         return patched_data
 
-    def __init__(self, xVals, data):
+    def __init__(self, xVals, data, align_marks=False):
         """
         constructor for the PCA class
         :param xVals: list of all x values on vector(s)
-        :param data: 2D list containing all vectors
+        :param data: 2D list containing all vectors, or a 2D array with one vector per row (such as the data of a
+                     profileStore) which is analyzed without copying
+        :param align_marks: T/F to align the marks by cross-correlation before they are averaged and compared
+                            (see align_lags)
         """
         self.xVals, unpatched_data = self.align_data(xVals, data)
         self.data = self.patch_data(unpatched_data)
+        self.lags = None
+        if align_marks:
+            self.align_lags()
@@ -8,20 +8,23 @@
 
     Author: Sean Lin
     Date Created: 6/23/21
-    Last Modified 7/30/21
+    Last Modified 10/19/26
 """
-import matplotlib.pyplot as plt
 import numpy as np
-from vectorProcessorTester import vectorProcessor
+from vectorProcessor import vectorProcessor
+from profileSmoother import profileSmoother
 
 class outlierAnalyzer(object):
-    def __init__(self, xVals, vector):
+    def __init__(self, xVals, vector, smoothing_window=None, smoothing_order=2):
         """
         Constructor for the outlier analyzer class.
         Constructor also type checks the input vector and 'patches' it up
 
         :param xVals: the x-values of the scrub mark profile
         :param vector: the z-values of the scrub mark profile
+        :param smoothing_window: number of points of the Savitzky-Golay filter the extrema and slopes are found from
+                                 (odd), None to find them from the raw profile
+        :param smoothing_order: order of the polynomial of the Savitzky-Golay filter
         """
         vp = vectorProcessor()
         p_vec = []
@@ -40,6 +43,16 @@ class outlierAnalyzer(object):
         else:
             print("something went wrong during processing")
 
+        # smoothed profile and its slopes at every point (see profileSmoother)
+        self.smoother = None
+        self.smoothed = None
+        if smoothing_window is not None and \
+                profileSmoother.fitting_window(len(self.xVals), smoothing_window, smoothing_order) is None:
+            print("profile of " + str(len(self.xVals)) + " points is too short to smooth, it is analyzed unsmoothed")
+        elif smoothing_window is not None:
+            self.smoother = profileSmoother(self.xVals, smoothing_window, smoothing_order)
+            self.smoothed = self.smoother.smooth(self.vector)[0].tolist()
+
     @staticmethod
     def is_local_minima(lst, index):
         """
@@ -94,13 +107,13 @@ class outlierAnalyzer(object):
 
     def find_extrema(self, num):
         """
-        Finds the max/min extrema of the vector passed to the class
+        Finds the max/min extrema of the vector passed to the class (of the smoothed vector if smoothing)
 
         :param num: number of max and min extrema to be found
         :return: a list of lists:
                 [locations of mins, values of mins, locations of maxes, values of maxes]
         """
-        v = self.vector
+        v = self.vector if self.smoothed is None else self.smoothed
         mins = []
         corr_mins_x_values = []
         maxes = []
@@ -138,15 +151,20 @@ class outlierAnalyzer(object):
         Finds the weight of each of the n maximum and minimum derivatives on the scrub mark profile
         **NOTE**
         for documentation of what weight is, see @staticmethod derivative_weight
+        When smoothing, the slopes are those of the Savitzky-Golay fits at every point (one slope per point) instead
+        of the differences between neighboring points divided by the mean step.
 
         :param num: The number of derivative extremes user desires to observe
         :return: a list of lists
                 [list of all discrete slopes, location of min slopes, min slopes, weights of min slopes,
                 location of max slopes, max slopes, weights of max slopes]
         """
-        xstep = np.mean(np.diff(self.xVals))
-        ysteps = np.diff(self.vector)
-        yderiv = ysteps / xstep
+        if self.smoother is None:
+            xstep = np.mean(np.diff(self.xVals))
+            ysteps = np.diff(self.vector)
+            yderiv = ysteps / xstep
+        else:
+            yderiv = self.smoother.derivative(self.vector)[0]
         derivmin = np.sort(yderiv)[0:num]
         derivmax = np.sort(yderiv)[::-1][0:num]
         weightsmin = []
@@ -222,12 +240,15 @@ class outlierAnalyzer(object):
         :param: num_derivs: number of max and min slopes to be analyzed on the scrub mark profile
         :return: [extreme_data (list), slope_data(list), figure to be saved]
         """
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots(2, figsize=(12.6, 9.8))
 
         # plots the original scrub mark profile
         ax[0].set_title("Z-values")
         ax[0].set_ylabel("microns")
         ax[0].plot(self.xVals, self.vector)
+        if self.smoothed is not None:
+            ax[0].plot(self.xVals, self.smoothed, 'k-', linewidth=1)
         ax[0].hlines(y = np.mean(self.vector), xmin=self.xVals[0], xmax=self.xVals[len(self.xVals)-1],
                    linestyles='--', colors='plum')
 
@@ -241,7 +262,7 @@ class outlierAnalyzer(object):
         ax[0].grid(axis="x")
         ax[1].set_title("Slopes")
         ax[1].set_ylabel("microns/micron")
-        ax[1].plot(self.xVals[:len(self.xVals) - 1], slope_data[0], 'orange')
+        ax[1].plot(self.xVals[:len(slope_data[0])], slope_data[0], 'orange')
         ax[1].hlines(y=np.mean(slope_data[0]), xmin=self.xVals[0], xmax=self.xVals[len(self.xVals)-1],
                    linestyles='--', colors='plum')
 
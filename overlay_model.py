@@ -0,0 +1,84 @@
+"""
+Class overlay model fits the standard linear wafer overlay model to the positional error vectors of a wafer.
+All parameters are found in ONE least squares solve across all pads:
+    U = Tx + a1 * x + a2 * y
+    V = Ty + b1 * x + b2 * y
+where (x, y) are the nominal pad positions and (U, V) the positional errors.  From the affine coefficients
+    a. translation: Tx, Ty (microns)
+    b. scale: scale_x = a1, scale_y = b2
+    c. rotation: (b1 - a2) / 2
+    d. non-orthogonality: b1 + a2 (the deviation of the angle between the X and Y grid axes from 90 degrees)
+The coefficients a1, b2, a2, b1 are also the X vs X, Y vs Y, X vs Y and Y vs X slopes of the errors to the
+positional references, with the effects of the other axis accounted for.
+
+The pseudo-inverse of the design matrix only depends on the nominal layout, so it is computed once per layout and
+every wafer (or stack of wafers) sharing that layout is fit with a single matrix product.
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import numpy as np
+
+class overlay_model(object):
+    # names of the fitted parameters, in the order they are returned by solve
+    PARAMETERS = ("Tx", "Ty", "scale_x", "scale_y", "rotation", "non_orthogonality")
+
+    def __init__(self, nominal_x, nominal_y):
+        """
+        constructor for the overlay model class.  Builds the design matrix of the layout and its pseudo-inverse.
+        :param nominal_x: nominal x positions of wafer bond pads
+        :param nominal_y: nominal y positions of wafer bond pads
+        """
+        self.nom_x = np.asarray(nominal_x, dtype=float)
+        self.nom_y = np.asarray(nominal_y, dtype=float)
+        assert self.nom_x.shape == self.nom_y.shape, "lists provided are not of comparable length"
+        self.design = np.column_stack([np.ones(self.nom_x.size), self.nom_x, self.nom_y])
+        self.pinv = np.linalg.pinv(self.design)
+
+    def solve(self, U, V):
+        """
+        finds the affine coefficients of the X and Y errors.
+        U and V may be a single wafer (1D, one value per pad) or a stack of wafers sharing the layout
+        (2D, one row per wafer).
+
+        :param U: x components of error vectors
+        :param V: y components of error vectors
+        :return: [coefficients of U (Tx, a1, a2), coefficients of V (Ty, b1, b2)], one row per wafer for stacks
+        """
+        U = np.asarray(U, dtype=float)
+        V = np.asarray(V, dtype=float)
+        assert U.shape[-1] == V.shape[-1] == self.nom_x.size, "errors do not match the layout of the model"
+        return U @ self.pinv.T, V @ self.pinv.T
+
+    def fit(self, U, V):
+        """
+        fits the linear overlay model to the error vectors of one wafer or a stack of wafers sharing the layout.
+
+        :param U: x components of error vectors (1D for one wafer, 2D with one row per wafer)
+        :param V: y components of error vectors (1D for one wafer, 2D with one row per wafer)
+        :return: dictionary containing
+                    1. the overlay parameters named in PARAMETERS
+                    2. the slopes "slope_xvx", "slope_yvy", "slope_xvy", "slope_yvx"
+                    3. "corrected_U", "corrected_V": per-pad errors left after removing the model
+                    4. "residual_rms_x", "residual_rms_y": root mean square of the corrected errors
+        """
+        coeff_u, coeff_v = self.solve(U, V)
+        corrected_U = np.asarray(U, dtype=float) - coeff_u @ self.design.T
+        corrected_V = np.asarray(V, dtype=float) - coeff_v @ self.design.T
+        a0, a1, a2 = np.moveaxis(coeff_u, -1, 0)
+        b0, b1, b2 = np.moveaxis(coeff_v, -1, 0)
+        return {"Tx": a0,
+                "Ty": b0,
+                "scale_x": a1,
+                "scale_y": b2,
+                "rotation": (b1 - a2) / 2,
+                "non_orthogonality": b1 + a2,
+                "slope_xvx": a1,
+                "slope_yvy": b2,
+                "slope_xvy": a2,
+                "slope_yvx": b1,
+                "corrected_U": corrected_U,
+                "corrected_V": corrected_V,
+                "residual_rms_x": np.sqrt(np.mean(corrected_U ** 2, axis=-1)),
+                "residual_rms_y": np.sqrt(np.mean(corrected_V ** 2, axis=-1))}
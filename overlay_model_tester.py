@@ -0,0 +1,68 @@
+"""
+Tester script for class overlay_model
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import numpy as np
+from overlay_model import overlay_model
+
+def make_layout(num_pads, diameter=300000, seed=0):
+    """
+    helper that generates random nominal pad positions on a wafer
+    """
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-diameter / 2, diameter / 2, num_pads), rng.uniform(-diameter / 2, diameter / 2, num_pads)
+
+def test_recovers_known_model():
+    """
+    errors generated from known overlay parameters are fit back exactly
+    """
+    x, y = make_layout(1000)
+    U = 1.5 + 2e-6 * x - 3e-6 * y
+    V = -0.5 + 5e-6 * x + 4e-6 * y
+    result = overlay_model(x, y).fit(U, V)
+    assert np.isclose(result["Tx"], 1.5)
+    assert np.isclose(result["Ty"], -0.5)
+    assert np.isclose(result["scale_x"], 2e-6)
+    assert np.isclose(result["scale_y"], 4e-6)
+    assert np.isclose(result["rotation"], 4e-6)
+    assert np.isclose(result["non_orthogonality"], 2e-6)
+    assert np.allclose(result["corrected_U"], 0, atol=1e-8)
+    assert result["residual_rms_y"] < 1e-8
+
+def test_matches_polyfit_on_symmetric_grid():
+    """
+    on a symmetric grid the slopes of the joint model match the separate regressions in plot_errors
+    """
+    grid = np.arange(-5, 6) * 10000.0
+    x, y = [a.ravel() for a in np.meshgrid(grid, grid)]
+    rng = np.random.default_rng(2)
+    U = rng.normal(0, 1, x.size) + 1e-5 * x
+    V = rng.normal(0, 1, x.size) - 2e-5 * x
+    result = overlay_model(x, y).fit(U, V)
+    assert np.isclose(result["slope_xvx"], np.polyfit(x, U, 1)[0])
+    assert np.isclose(result["slope_yvx"], np.polyfit(x, V, 1)[0])
+    assert np.isclose(result["slope_xvy"], np.polyfit(y, U, 1)[0])
+
+def test_batch_matches_single():
+    """
+    a stack of wafers sharing a layout is fit in one product and matches fitting each wafer alone
+    """
+    x, y = make_layout(500)
+    rng = np.random.default_rng(3)
+    U = rng.normal(0, 1, (4, 500))
+    V = rng.normal(0, 1, (4, 500))
+    model = overlay_model(x, y)
+    batch = model.fit(U, V)
+    for i in np.arange(4):
+        single = model.fit(U[i], V[i])
+        assert np.isclose(batch["rotation"][i], single["rotation"])
+        assert np.allclose(batch["corrected_V"][i], single["corrected_V"])
+
+if __name__ == '__main__':
+    test_recovers_known_model()
+    test_matches_polyfit_on_symmetric_grid()
+    test_batch_matches_single()
+    print("overlay model tests passed")
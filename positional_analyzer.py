@@ -5,11 +5,9 @@ Also plots the X/Y dimensional errors vs X/Y positional references.
 
 Author: Sean Lin
 Date Created: 6/30/21
-Last Modified: 7/30/21
+Last Modified: 10/19/26
 """
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
 class positional_analyzer(object):
     def __init__(self, wafer_diameter, nominal_x, nominal_y, measured_x, measured_y):
         """
@@ -41,6 +39,58 @@ class positional_analyzer(object):
         V_mean_adj = [i - V_mean for i in V]
         return U, V, U_mean_adj, V_mean_adj
 
+    @staticmethod
+    def find_moment_sums(U, V, sums=None):
+        """
+        finds the sums needed to compute the principal components of the error vectors:
+        [number of vectors, sum of U, sum of V, sum of U^2, sum of V^2, sum of UV]
+        Sums of separate chunks of error vectors simply add, so very large wafers can be streamed through this
+        method chunk by chunk without ever holding the full list of vectors in memory.
+
+        :param U: x components of error vectors (chunk)
+        :param V: y components of error vectors (chunk)
+        :param sums: running sums of previous chunks to add onto (None to start new sums)
+        :return: numpy array of the 6 sums listed above
+        """
+        U = np.asarray(U, dtype=float)
+        V = np.asarray(V, dtype=float)
+        chunk_sums = np.array([U.size, U.sum(), V.sum(), np.dot(U, U), np.dot(V, V), np.dot(U, V)])
+        if sums is None:
+            return chunk_sums
+        return sums + chunk_sums
+
+    @staticmethod
+    def principal_components_from_sums(sums):
+        """
+        finds the 2 principal components of the error vectors from their moment sums (see find_moment_sums).
+        Results match fitting sklearn's PCA on the error vectors with every vector paired with a [0, 0] zero vector,
+        which anchors the principal components to the origin of the vector field.
+
+        Uses the closed form eigendecomposition of the 2x2 scatter matrix
+            [[S_uu, S_uv],
+             [S_uv, S_vv]]
+        the principal directions sit at angle 0.5 * atan2(2 * S_uv, S_uu - S_vv) and its perpendicular.
+
+        :param sums: [number of vectors, sum of U, sum of V, sum of U^2, sum of V^2, sum of UV]
+        :return: [principal components (2x2 array, one component per row), corresponding singular values]
+        """
+        n, sum_u, sum_v, sum_uu, sum_vv, sum_uv = sums
+        # every error vector is paired with a zero vector, doubling the number of samples
+        num_samples = 2 * n
+        s_uu = sum_uu - sum_u * sum_u / num_samples
+        s_vv = sum_vv - sum_v * sum_v / num_samples
+        s_uv = sum_uv - sum_u * sum_v / num_samples
+        half_trace = (s_uu + s_vv) / 2
+        radius = np.hypot((s_uu - s_vv) / 2, s_uv)
+        eigenvalues = np.array([half_trace + radius, half_trace - radius])
+        theta = 0.5 * np.arctan2(2 * s_uv, s_uu - s_vv)
+        components = np.array([[np.cos(theta), np.sin(theta)],
+                               [-np.sin(theta), np.cos(theta)]])
+        # sign convention of sklearn: the largest entry (in magnitude) of each component is positive
+        max_abs = components[np.arange(2), np.argmax(np.abs(components), axis=1)]
+        components = components * np.sign(max_abs)[:, np.newaxis]
+        return components, np.sqrt(np.maximum(eigenvalues, 0))
+
     @staticmethod
     def find_principal_components(U, V):
         """
@@ -50,22 +100,182 @@ class positional_analyzer(object):
         :param V: y components of error vectors
         :return: [principal components, corresponding singular values]
         """
-        pca = PCA(n_components=2)
-        data = []
-        for i in np.arange(len(U)):
-            vector = []
-            zero_vec = [0, 0]
-            vector.append(U[i])
-            vector.append(V[i])
-            data.append(vector)
-            data.append(zero_vec)
-        pca.fit(data)
-        return pca.components_, pca.singular_values_
+        sums = positional_analyzer.find_moment_sums(U, V)
+        return positional_analyzer.principal_components_from_sums(sums)
+
+    @staticmethod
+    def grid_centers(diameter, cell_size):
+        """
+        :param diameter: diameter of the wafer
+        :param cell_size: width of a grid cell (microns)
+        :return: [number of cells along one side of the square grid covering the wafer, centers of the cells along
+                  one side of the grid]
+        """
+        num_cells = int(np.ceil(diameter / cell_size))
+        return num_cells, -num_cells * cell_size / 2 + (np.arange(num_cells) + 0.5) * cell_size
+
+    @staticmethod
+    def grid_bins(diameter, x, y, cell_size):
+        """
+        assigns positions to the cells of a square grid covering the wafer
+        :param diameter: diameter of the wafer
+        :param x: x positions
+        :param y: y positions
+        :param cell_size: width of a grid cell (microns)
+        :return: [flat cell index of each position, number of cells along one side of the grid,
+                  centers of the cells along one side of the grid]
+        """
+        num_cells, centers = positional_analyzer.grid_centers(diameter, cell_size)
+        edges_start = -num_cells * cell_size / 2
+        col = np.clip(((np.asarray(x, dtype=float) - edges_start) // cell_size).astype(int), 0, num_cells - 1)
+        row = np.clip(((np.asarray(y, dtype=float) - edges_start) // cell_size).astype(int), 0, num_cells - 1)
+        return row * num_cells + col, num_cells, centers
+
+    def bin_vectors(self, U, V, cell_size):
+        """
+        averages the error vectors of all pads that fall within the same cell of a square grid over the wafer
+        (see binned_vectors)
+        """
+        return positional_analyzer.binned_vectors(self.diam, self.nom_x, self.nom_y, U, V, cell_size)
+
+    @staticmethod
+    def binned_vectors(diameter, x, y, U, V, cell_size):
+        """
+        averages the error vectors of all pads that fall within the same cell of a square grid over the wafer.
+        Cells without any pads are dropped.
+
+        :param diameter: diameter of the wafer
+        :param x: nominal x positions of the pads
+        :param y: nominal y positions of the pads
+        :param U: x components of error vectors
+        :param V: y components of error vectors
+        :param cell_size: width of a grid cell (microns)
+        :return: [x centers of occupied cells, y centers of occupied cells, mean U per cell, mean V per cell,
+                  number of pads per cell, flat index of each occupied cell, number of cells along one side]
+        """
+        cells, num_cells, centers = positional_analyzer.grid_bins(diameter, x, y, cell_size)
+        counts = np.bincount(cells, minlength=num_cells ** 2)
+        sum_U = np.bincount(cells, weights=np.asarray(U, dtype=float), minlength=num_cells ** 2)
+        sum_V = np.bincount(cells, weights=np.asarray(V, dtype=float), minlength=num_cells ** 2)
+        occupied = np.flatnonzero(counts)
+        return centers[occupied % num_cells], centers[occupied // num_cells], sum_U[occupied] / counts[occupied], \
+            sum_V[occupied] / counts[occupied], counts[occupied], occupied, num_cells
 
-    def plot_field(self, U, V, U_mean_adj, V_mean_adj, X_fails, Y_fails, X_misread, Y_misread):
+    def find_binned_statistics(self, values, cell_size):
+        """
+        finds the mean, standard deviation and number of pads of a per-pad metric in every cell of a square grid over
+        the wafer (see binned_statistics)
+        """
+        return positional_analyzer.binned_statistics(self.diam, self.nom_x, self.nom_y, values, cell_size)
+
+    @staticmethod
+    def binned_statistics(diameter, x, y, values, cell_size):
+        """
+        finds the mean, standard deviation and number of pads of a per-pad metric in every cell of a square grid over
+        the wafer.  Pads whose value is np.nan are left out.
+
+        :param diameter: diameter of the wafer
+        :param x: nominal x positions of the pads
+        :param y: nominal y positions of the pads
+        :param values: per-pad metric (same order as the positions)
+        :param cell_size: width of a grid cell (microns)
+        :return: [mean per cell, std per cell, pads per cell] as num_cells x num_cells arrays (row = y, column = x),
+                 np.nan where a cell has no pads
+        """
+        values = np.asarray(values, dtype=float)
+        cells, num_cells, centers = positional_analyzer.grid_bins(diameter, x, y, cell_size)
+        valid = ~np.isnan(values)
+        cells = cells[valid]
+        values = values[valid]
+        counts = np.bincount(cells, minlength=num_cells ** 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.bincount(cells, weights=values, minlength=num_cells ** 2) / counts
+            squares = np.bincount(cells, weights=(values - means[cells]) ** 2, minlength=num_cells ** 2)
+            stds = np.sqrt(squares / counts)
+        counts = counts.astype(float)
+        counts[counts == 0] = np.nan
+        return means.reshape(num_cells, num_cells), stds.reshape(num_cells, num_cells), \
+            counts.reshape(num_cells, num_cells)
+
+    def plot_wafer_maps(self, metrics, cell_size):
+        """
+        plots a wafer map of the mean and standard deviation per grid cell of every metric (see wafer_maps)
+        """
+        return positional_analyzer.wafer_maps(self.diam, self.nom_x, self.nom_y, metrics, cell_size)
+
+    @staticmethod
+    def wafer_maps(diameter, x, y, metrics, cell_size):
+        """
+        plots a wafer map of the mean and standard deviation per grid cell of every metric.  Each map is drawn as a
+        single image, so rendering cost depends on the number of cells rather than the number of pads.
+
+        :param diameter: diameter of the wafer
+        :param x: nominal x positions of the pads
+        :param y: nominal y positions of the pads
+        :param metrics: dictionary {title: per-pad values} of the metrics to map
+        :param cell_size: width of a grid cell (microns)
+        :return: figure with one row of maps (mean, std) per metric
+        """
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(len(metrics), 2, figsize=[12.8, 5.6 * len(metrics)], squeeze=False)
+        extent = int(np.ceil(diameter / cell_size)) * cell_size / 2
+        for row, (title, values) in enumerate(metrics.items()):
+            means, stds, counts = positional_analyzer.binned_statistics(diameter, x, y, values, cell_size)
+            for col, (grid, label) in enumerate([(means, "Mean"), (stds, "Std Dev")]):
+                shading = ax[row][col].imshow(grid, origin='lower', cmap='viridis',
+                                              extent=[-extent, extent, -extent, extent])
+                fig.colorbar(shading, ax=ax[row][col], shrink=0.8)
+                ax[row][col].add_patch(plt.Circle((0, 0), diameter / 2, color='b', fill=False))
+                ax[row][col].set_title(label + " " + title + " per " + str(cell_size) + " micron Cell")
+                ax[row][col].set_xlim(-diameter / 1.6, diameter / 1.6)
+                ax[row][col].set_ylim(-diameter / 1.6, diameter / 1.6)
+                ax[row][col].set_aspect('equal', adjustable='box')
+        fig.tight_layout()
+        return fig
+
+    def draw_vectors(self, ax, U, V, bin_size, heatmap):
+        """
+        draws the error vectors on an axis, either one arrow per pad or one mean arrow per grid cell (see
+        vector_field)
+        """
+        return positional_analyzer.vector_field(ax, self.diam, self.nom_x, self.nom_y, U, V, bin_size, heatmap)
+
+    @staticmethod
+    def vector_field(ax, diameter, x, y, U, V, bin_size, heatmap):
+        """
+        draws error vectors on an axis, either one arrow per pad or one mean arrow per grid cell
+        :param ax: axis to draw the vectors on
+        :param diameter: diameter of the wafer
+        :param x: nominal x positions of the pads
+        :param y: nominal y positions of the pads
+        :param U: x components of error vectors
+        :param V: y components of error vectors
+        :param bin_size: width of a grid cell (microns), None to draw one arrow per pad
+        :param heatmap: boolean indicating whether to shade grid cells by their mean error magnitude
+        :return: the quiver drawn on the axis
+        """
+        if bin_size is None:
+            return ax.quiver(x, y, U, V, color='gray')
+        cell_x, cell_y, mean_U, mean_V, counts, occupied, num_cells = positional_analyzer.binned_vectors(
+            diameter, x, y, U, V, bin_size)
+        if heatmap:
+            magnitude = np.full(num_cells ** 2, np.nan)
+            magnitude[occupied] = np.hypot(mean_U, mean_V)
+            extent = num_cells * bin_size / 2
+            shading = ax.imshow(magnitude.reshape(num_cells, num_cells), origin='lower', cmap='viridis',
+                                extent=[-extent, extent, -extent, extent], alpha=0.6)
+            ax.figure.colorbar(shading, ax=ax, shrink=0.5, label="Mean error magnitude per cell")
+        return ax.quiver(cell_x, cell_y, mean_U, mean_V, color='gray')
+
+    def plot_field(self, U, V, U_mean_adj, V_mean_adj, X_fails, Y_fails, X_misread, Y_misread, bin_size=None,
+                   heatmap=False):
         """
         plots a quiver plot with all error vectors and principal components
         includes a slider to magnify vectors for visual aid
+
+        For dense wafers, vectors can be aggregated onto a square grid of width bin_size so that one mean vector is
+        drawn per grid cell.  Rendering cost then depends on the number of cells rather than the number of pads.
+
         :param U: x components of error vectors
         :param V: y components of error vectors
         :param U_mean_adj: list U but with a scalar offset so mean U is 0
@@ -74,24 +284,28 @@ class positional_analyzer(object):
         :param Y_fails: Y location of all FAILED readings (to be plotted as a RED point)
         :param X_misread: X location of all MISREAD readings (to be plotted as an ORANGE point)
         :param Y_misread: Y location of all MISREAD readings (to be plotted as an ORANGE point)
+        :param bin_size: width of a grid cell (microns) to aggregate vectors on, None to draw every vector
+        :param heatmap: boolean indicating whether to shade grid cells by mean error magnitude (binned mode only)
         :return: figure containing both quiver plots
         """
+        import matplotlib.pyplot as plt
         pca_comp, pca_sv = self.find_principal_components(U, V)
         pca_comp_mean_adj, pca_sv_mean_adj = self.find_principal_components(U_mean_adj, V_mean_adj)
 
         fig, ax = plt.subplots(1, 2, figsize=[16, 12])
         wafer1 = plt.Circle((0, 0), self.diam / 2, color='b', fill=False)
         wafer2 = plt.Circle((0, 0), self.diam / 2, color='b', fill=False)
-        p1 = ax[0].quiver(self.nom_x, self.nom_y, U, V, color='gray')
-        p1_mean_adj = ax[1].quiver(self.nom_x, self.nom_y, U_mean_adj, V_mean_adj, color='gray')
+        p1 = self.draw_vectors(ax[0], U, V, bin_size, heatmap)
+        p1_mean_adj = self.draw_vectors(ax[1], U_mean_adj, V_mean_adj, bin_size, heatmap)
         p1.scale_units = "xy"
         p1_mean_adj.scale_units = "xy"
         ax[0].add_patch(wafer1)
-        ax[0].set_title("Raw Error Vector Field\n**Vector Magnitudes Relative**")
+        binned_title = "" if bin_size is None else "\n**Mean Vector per " + str(bin_size) + " micron Cell**"
+        ax[0].set_title("Raw Error Vector Field\n**Vector Magnitudes Relative**" + binned_title)
         ax[0].set_xlim(-self.diam / 1.6, self.diam / 1.6)
         ax[0].set_ylim(-self.diam / 1.6, self.diam / 1.6)
         ax[1].add_patch(wafer2)
-        ax[1].set_title("Mean-Zeroed Error Vector Field\n**Vector Magnitudes Relative**")
+        ax[1].set_title("Mean-Zeroed Error Vector Field\n**Vector Magnitudes Relative**" + binned_title)
         ax[1].set_xlim(-self.diam / 1.6, self.diam / 1.6)
         ax[1].set_ylim(-self.diam / 1.6, self.diam / 1.6)
         p2 = ax[0].quiver(0, 0, pca_comp[0][0] * pca_sv[0], pca_comp[0][1] * pca_sv[0], color='g',
@@ -129,6 +343,7 @@ class positional_analyzer(object):
         :param title: title of the error vs reference plot
         :return: slope of regression line of: x vs x, y vs y, x vs y, y vs x graphs
         """
+        import matplotlib.pyplot as plt
         # initiate subplots
         fig, ax = plt.subplots(2, 2, figsize=[12.8, 9.6])
         x_v_x = ax[0][0]
@@ -3,10 +3,11 @@ Tester class for positional_analyzer
 
 Author: Sean Lin
 Date Created: 6/30/21
-Last Modified: 7/02/21
+Last Modified: 10/19/26
 """
 from positional_analyzer import positional_analyzer
 import numpy as np
+import matplotlib.pyplot as plt
 def test_simple_hypothetical():
     """
     a sanity checker on a simple set of measurements
@@ -94,6 +95,101 @@ def test_divergence_many():
     pa.plot_field(U, V, U_mean_adj, V_mean_adj)
     pa.plot_errors(U_mean_adj, V_mean_adj, "test divergence")
 
+def test_principal_components_closed_form():
+    """
+    closed form principal components match sklearn's PCA fit on the vectors interleaved with zero vectors
+    """
+    from sklearn.decomposition import PCA
+    rng = np.random.default_rng(0)
+    U = rng.normal(30, 20, 500)
+    V = rng.normal(-10, 10, 500) + 0.5 * U
+    data = []
+    for u, v in zip(U, V):
+        data.append([u, v])
+        data.append([0, 0])
+    pca = PCA(n_components=2).fit(data)
+    components, singular_values = positional_analyzer.find_principal_components(U, V)
+    assert np.allclose(components, pca.components_)
+    assert np.allclose(singular_values, pca.singular_values_)
+
+def test_principal_components_streamed():
+    """
+    principal components from sums streamed chunk by chunk match the components of the full set of vectors
+    """
+    rng = np.random.default_rng(1)
+    U = rng.normal(0, 5, 1000)
+    V = rng.normal(0, 1, 1000) - U
+    sums = None
+    for start in np.arange(0, 1000, 128):
+        sums = positional_analyzer.find_moment_sums(U[start:start + 128], V[start:start + 128], sums)
+    streamed = positional_analyzer.principal_components_from_sums(sums)
+    full = positional_analyzer.find_principal_components(U, V)
+    assert np.allclose(streamed[0], full[0])
+    assert np.allclose(streamed[1], full[1])
+
+def test_bin_vectors():
+    """
+    vectors are averaged per grid cell and empty cells are dropped
+    """
+    nom_x = [-150, -140, 150, 160]
+    nom_y = [-150, -150, 150, 150]
+    pa = positional_analyzer(400, nom_x, nom_y, nom_x, nom_y)
+    U = [1, 3, -2, -2]
+    V = [0, 2, 5, 7]
+    cell_x, cell_y, mean_U, mean_V, counts, occupied, num_cells = pa.bin_vectors(U, V, 100)
+    assert num_cells == 4
+    assert cell_x.tolist() == [-150, 150]
+    assert cell_y.tolist() == [-150, 150]
+    assert mean_U.tolist() == [2, -2]
+    assert mean_V.tolist() == [1, 6]
+    assert counts.tolist() == [2, 2]
+
+def test_binned_field():
+    """
+    plots a binned field with magnitude shading on a dense wafer
+    """
+    diameter = 300000
+    rng = np.random.default_rng(4)
+    nom_x = rng.uniform(-100000, 100000, 20000)
+    nom_y = rng.uniform(-100000, 100000, 20000)
+    meas_x = nom_x + nom_x * 1e-5
+    meas_y = nom_y + rng.normal(0, 1, 20000)
+    pa = positional_analyzer(diameter, nom_x, nom_y, meas_x, meas_y)
+    U, V, U_mean_adj, V_mean_adj = pa.find_vectors()
+    fig = pa.plot_field(U, V, U_mean_adj, V_mean_adj, [0], [0], [], [], bin_size=10000, heatmap=True)
+    plt.close(fig)
+
+def test_binned_statistics():
+    """
+    per-cell mean, std and count of a metric match numpy on the pads of each cell, empty cells are np.nan
+    """
+    nom_x = np.array([-150, -140, 150, 160, 170.0])
+    nom_y = np.array([-150, -140, 150, 160, 170.0])
+    pa = positional_analyzer(1000, nom_x, nom_y, nom_x, nom_y)
+    values = np.array([1, 3, 2, 4, np.nan])
+    means, stds, counts = pa.find_binned_statistics(values, 300)
+    assert means.shape == (4, 4)
+    assert means[1, 1] == 2 and stds[1, 1] == np.std([1, 3]) and counts[1, 1] == 2
+    assert means[2, 2] == 3 and counts[2, 2] == 2
+    assert np.isnan(means[0, 0]) and np.isnan(counts[0, 0])
+    # the static helpers work from the positions alone
+    assert np.array_equal(positional_analyzer.binned_statistics(1000, nom_x, nom_y, values, 300)[2], counts,
+                          equal_nan=True)
+    assert positional_analyzer.grid_centers(1000, 300)[1].tolist() == [-450, -150, 150, 450]
+
+def test_wafer_maps():
+    """
+    wafer maps of 100k pads render as images regardless of the number of pads
+    """
+    rng = np.random.default_rng(5)
+    nom_x = rng.uniform(-100000, 100000, 100000)
+    nom_y = rng.uniform(-100000, 100000, 100000)
+    pa = positional_analyzer(300000, nom_x, nom_y, nom_x + rng.normal(0, 1, 100000), nom_y)
+    U, V, U_mean_adj, V_mean_adj = pa.find_vectors()
+    fig = pa.plot_wafer_maps({"Error Magnitude": np.hypot(U, V), "X Error": U}, 10000)
+    assert len(fig.axes[0].images) == 1 and len(fig.axes[0].collections) == 0
+    plt.close(fig)
+
 if __name__ == '__main__':
     # test_simple_hypothetical()
     # test_random_many()
@@ -0,0 +1,96 @@
+"""
+Class profileSmoother smooths and differentiates VEECO scrub mark profiles with Savitzky-Golay filters, so that noise
+spikes on noisy scans are not reported as the steepest slopes.
+
+Every point of a profile is replaced by the value and slope of a polynomial least squares fit through the window of
+points around it.  The fit only depends on the x values, so the filter weights of every point are found once (from
+the actual, possibly non-uniform, x spacing) and then applied to a whole 2D batch of profiles sharing those x values
+with a single batched multiply over strided windows of the batch.  Points within half a window of the ends use the
+fit of the nearest full window, evaluated at the point itself.
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+class profileSmoother(object):
+    # largest number of window values (profiles x points x window) gathered at once
+    CHUNK_VALUES = 1 << 22
+
+    def __init__(self, xVals, window=11, order=2):
+        """
+        constructor for the profileSmoother class.  Finds the filter weights of every point.
+        :param xVals: x values shared by all profiles to be smoothed
+        :param window: number of points in every fit (odd).  Profiles shorter than the window are fit with the longest
+                       odd window that fits in them (see fitting_window).
+        :param order: order of the fitted polynomial
+        """
+        xVals = np.asarray(xVals, dtype=float)
+        num_points = xVals.size
+        assert window % 2 == 1, "the window must contain an odd number of points"
+        fitted = profileSmoother.fitting_window(num_points, window, order)
+        assert fitted is not None, "the profile is too short for a polynomial of order " + str(order)
+        if fitted != window:
+            print("profile of " + str(num_points) + " points is smoothed with a window of " + str(fitted) +
+                  " points instead of " + str(window))
+        window = fitted
+        self.window = window
+        half = window // 2
+        # first point of the window of every point, full windows are kept at the ends
+        self.starts = np.clip(np.arange(num_points) - half, 0, num_points - window)
+        windows = sliding_window_view(xVals, window)[self.starts]
+        # offsets from the point itself, scaled by the mean spacing to keep the fits well conditioned
+        scale = np.mean(np.diff(xVals))
+        offsets = (windows - xVals[:, np.newaxis]) / scale
+        vandermonde = offsets[:, :, np.newaxis] ** np.arange(order + 1)
+        # row 0 of the pseudo-inverse gives the fitted value at the point, row 1 the fitted slope
+        inverse = np.linalg.pinv(vandermonde)
+        self.value_weights = inverse[:, 0, :]
+        self.slope_weights = inverse[:, 1, :] / scale
+
+    @staticmethod
+    def fitting_window(num_points, window, order):
+        """
+        :param num_points: number of points of the profiles
+        :param window: requested number of points in every fit (odd)
+        :param order: order of the fitted polynomial
+        :return: longest odd window, up to the requested one, that fits in the profiles and is longer than the order
+                 (and at least 3 points, so slopes can be fit), None if there is none
+        """
+        window = min(window, num_points - 1 + num_points % 2)
+        if window <= max(order, 1):
+            return None
+        return window
+
+    def apply(self, profiles, weights):
+        """
+        applies per-point filter weights to a batch of profiles
+        :param profiles: 2D array (or 2D list) of patched profiles, one profile per row (or a single profile)
+        :param weights: filter weights of every point (points x window)
+        :return: 2D array of filtered profiles
+        """
+        profiles = np.asarray(profiles, dtype=float)
+        if profiles.ndim == 1:
+            profiles = profiles[np.newaxis, :]
+        filtered = np.empty(profiles.shape)
+        rows = max(1, self.CHUNK_VALUES // (profiles.shape[1] * self.window))
+        for start in np.arange(0, profiles.shape[0], rows):
+            windows = sliding_window_view(profiles[start:start + rows], self.window, axis=1)[:, self.starts, :]
+            filtered[start:start + rows] = np.einsum('rpw,pw->rp', windows, weights)
+        return filtered
+
+    def smooth(self, profiles):
+        """
+        :param profiles: 2D array (or 2D list) of patched profiles, one profile per row (or a single profile)
+        :return: 2D array of smoothed profiles
+        """
+        return self.apply(profiles, self.value_weights)
+
+    def derivative(self, profiles):
+        """
+        :param profiles: 2D array (or 2D list) of patched profiles, one profile per row (or a single profile)
+        :return: 2D array of the slopes (z units per x unit) of the profiles at every point
+        """
+        return self.apply(profiles, self.slope_weights)
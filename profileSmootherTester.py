@@ -0,0 +1,79 @@
+"""
+Testing script for the Savitzky-Golay smoothing of scrub mark profiles and its use by outlierAnalyzer
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import time
+import numpy as np
+from profileSmoother import profileSmoother
+from outlierAnalyzer import outlierAnalyzer
+
+def test_exact_for_polynomials():
+    """
+    polynomials up to the order of the filter are reproduced exactly, with exact slopes, also on non-uniform x
+    values and at the ends of the profile
+    """
+    rng = np.random.default_rng(0)
+    xVals = np.cumsum(rng.uniform(0.05, 0.15, 200))
+    profiles = np.array([1 + 2 * xVals - 0.3 * xVals ** 2, -xVals + 0.1 * xVals ** 2])
+    smoother = profileSmoother(xVals, 11, 2)
+    assert np.allclose(smoother.smooth(profiles), profiles)
+    assert np.allclose(smoother.derivative(profiles), np.array([2 - 0.6 * xVals, -1 + 0.2 * xVals]))
+
+def test_suppresses_noise():
+    """
+    the slopes of a noisy profile are much closer to the true slopes than differences of neighboring points
+    """
+    rng = np.random.default_rng(1)
+    xVals = np.linspace(0, 60, 600)
+    truth = np.cos(xVals / 5) / 5
+    noisy = np.sin(xVals / 5) + rng.normal(0, 0.02, xVals.size)
+    smoothed_error = np.abs(profileSmoother(xVals, 21, 3).derivative(noisy)[0] - truth).max()
+    raw_error = np.abs(np.diff(noisy) / np.mean(np.diff(xVals)) - truth[:-1]).max()
+    assert smoothed_error < raw_error / 5
+
+def test_outlier_analyzer_smoothing():
+    """
+    with smoothing, the steepest slopes of a noisy step are found at the step instead of at noise spikes
+    """
+    rng = np.random.default_rng(2)
+    xVals = np.linspace(0, 60, 600).tolist()
+    vector = (np.tanh((np.array(xVals) - 30) / 2) + rng.normal(0, 0.05, 600)).tolist()
+    oa = outlierAnalyzer(xVals, vector, 31, 3)
+    yderiv, corrXmin, derivmin, weightsmin, corrXmax, derivmax, weightsmax = oa.find_derivative(3)
+    assert len(yderiv) == 600
+    assert all(abs(x - 30) < 2 for x in corrXmax)
+    assert max(weightsmax) > 50
+
+def test_short_profiles():
+    """
+    profiles shorter than the window are smoothed with the longest window that fits, or analyzed unsmoothed when no
+    window fits
+    """
+    xVals = np.linspace(0, 1, 8)
+    smoother = profileSmoother(xVals, 11, 2)
+    assert smoother.window == 7
+    assert np.allclose(smoother.smooth(xVals ** 2), xVals ** 2)
+    assert profileSmoother.fitting_window(3, 11, 3) is None
+    oa = outlierAnalyzer([0.0, 1.0, 2.0], [0.0, 1.0, 0.0], 11, 3)
+    assert oa.smoother is None
+
+def test_many_profiles():
+    """
+    a batch of ten thousand profiles is smoothed quickly
+    """
+    xVals = np.linspace(0, 60, 300)
+    profiles = np.random.default_rng(3).normal(0, 1, (10000, 300))
+    start = time.perf_counter()
+    profileSmoother(xVals, 15, 3).derivative(profiles)
+    assert time.perf_counter() - start < 5
+
+if __name__ == '__main__':
+    test_exact_for_polynomials()
+    test_suppresses_noise()
+    test_outlier_analyzer_smoothing()
+    test_short_profiles()
+    test_many_profiles()
+    print("profileSmoother tests passed")
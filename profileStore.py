@@ -0,0 +1,167 @@
+"""
+Class profileStore keeps a set of VEECO scrub mark profiles on disk so they never have to be held in memory as
+python lists.  A store is a folder containing
+    a. profiles.f32: memory-mapped float32 matrix with one row per scrub mark profile
+    b. xVals.npy: the x values shared by all profiles
+    c. metadata.json: the shape of the matrix, the name of every profile and where the profiles came from (with the
+       size and modification time of the VEECO export, so a store is rebuilt when its export changes)
+
+Missing values in the middle of a profile are patched (linear interpolation) when the store is written, and
+missing values at the ends are kept as np.nan so multiVector can still align the profiles by cutting them off.
+multiVector and outlierAnalyzer then work on the rows of the store as zero-copy views, which allows analyzing
+sets of marks larger than RAM.  VEECO exports are converted a block of rows at a time, so the export itself never
+has to fit in memory either.
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import json
+import os
+import numpy as np
+
+class profileStore(object):
+    PROFILES_FILE = "profiles.f32"
+    XVALS_FILE = "xVals.npy"
+    METADATA_FILE = "metadata.json"
+    # largest number of values (export rows x marks) read from a VEECO export at once
+    CHUNK_VALUES = 1 << 22
+
+    def __init__(self, path):
+        """
+        constructor for the profileStore class.  Opens an existing store read-only.
+        :param path: folder of the store
+        """
+        self.path = path
+        with open(os.path.join(path, self.METADATA_FILE)) as metadata_file:
+            self.metadata = json.load(metadata_file)
+        self.xVals = np.load(os.path.join(path, self.XVALS_FILE), mmap_mode='r')
+        self.names = self.metadata["names"]
+        self.data = np.memmap(os.path.join(path, self.PROFILES_FILE), dtype=np.float32, mode='r',
+                              shape=tuple(self.metadata["shape"]))
+
+    @staticmethod
+    def create(path, xVals, data, names=None, source=None):
+        """
+        writes a new store (replacing any store already in the folder).  Profiles are written one row at a time,
+        so data may be any sequence of profiles, including rows of another memory-mapped array.
+
+        :param path: folder of the store
+        :param xVals: x values shared by all profiles
+        :param data: sequence of profiles (each the same length as xVals, np.nan for missing values)
+        :param names: name of each profile, defaults to "mark i"
+        :param source: description of where the profiles came from (for example the VEECO export file name)
+        :return: the opened profileStore
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        num_marks = len(data)
+        num_points = len(xVals)
+        if names is None:
+            names = ["mark " + str(i) for i in np.arange(num_marks)]
+        assert len(names) == num_marks, "number of names does not match number of profiles"
+        profiles = np.memmap(os.path.join(path, profileStore.PROFILES_FILE), dtype=np.float32, mode='w+',
+                             shape=(num_marks, num_points))
+        for i in np.arange(num_marks):
+            profile = np.asarray(data[i], dtype=float)
+            assert profile.size == num_points, "profile " + str(i) + " does not match the length of the x values"
+            profiles[i] = profileStore.patch_interior(profile)
+        profiles.flush()
+        del profiles
+        profileStore.save_metadata(path, xVals, [num_marks, num_points], names, source)
+        return profileStore(path)
+
+    @staticmethod
+    def save_metadata(path, xVals, shape, names, source):
+        """
+        saves the x values and metadata of a store whose profiles have been written
+        :param path: folder of the store
+        :param xVals: x values shared by all profiles
+        :param shape: [number of profiles, number of points]
+        :param names: name of each profile
+        :param source: description of where the profiles came from, the size and modification time of the file are
+                       recorded if it is the path of a file
+        :return: NA
+        """
+        np.save(os.path.join(path, profileStore.XVALS_FILE), np.asarray(xVals, dtype=float))
+        metadata = {"shape": list(shape), "names": list(names), "source": source}
+        if source is not None and os.path.isfile(source):
+            metadata["source_size"] = os.path.getsize(source)
+            metadata["source_mtime"] = os.path.getmtime(source)
+        temp_filename = os.path.join(path, profileStore.METADATA_FILE + ".tmp")
+        with open(temp_filename, 'w') as metadata_file:
+            json.dump(metadata, metadata_file)
+        os.replace(temp_filename, os.path.join(path, profileStore.METADATA_FILE))
+
+    def is_current(self, filename):
+        """
+        :param filename: path of the file the store was built from
+        :return: T/F whether the file still has the size and modification time it had when the store was built
+        """
+        return self.metadata.get("source_size") == os.path.getsize(filename) and \
+            self.metadata.get("source_mtime") == os.path.getmtime(filename)
+
+    @staticmethod
+    def from_veeco_csv(filename, path):
+        """
+        converts a multi-cursor VEECO export into a store (replacing any store already in the folder).
+        The export contains a column 'x' followed by one column per scrub mark profile; the first 2 rows below the
+        header are not data, and missing values are written as " ---".  The export is read a block of rows (points of
+        every profile) at a time and every block is written straight into the store.
+
+        :param filename: name of the VEECO export csv file
+        :param path: folder of the store
+        :return: the opened profileStore
+        """
+        import pandas as pd
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        columns = [column for column in pd.read_csv(filename, nrows=0).columns if column != 'x']
+        xVals = pd.to_numeric(pd.read_csv(filename, usecols=['x']).x.iloc[2:]).to_numpy(dtype=float)
+        num_marks = len(columns)
+        num_points = xVals.size
+        profiles = np.memmap(os.path.join(path, profileStore.PROFILES_FILE), dtype=np.float32, mode='w+',
+                             shape=(num_marks, num_points))
+        # export row of the first row of the next block, counted from the first data row
+        start = -2
+        chunk_rows = max(1, profileStore.CHUNK_VALUES // max(1, num_marks))
+        for chunk in pd.read_csv(filename, usecols=columns, chunksize=chunk_rows):
+            # " ---" (and anything else that is not a number) becomes np.nan
+            values = chunk[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32)
+            first = max(start, 0)
+            stop = start + len(chunk)
+            if stop > first:
+                profiles[:, first:stop] = values[first - start:].T
+            start = stop
+        # patches the gaps within every profile now that its values are all written
+        for row in np.arange(0, num_marks, chunk_rows):
+            has_nan = np.isnan(profiles[row:row + chunk_rows]).any(axis=1)
+            for i in row + np.flatnonzero(has_nan):
+                profiles[i] = profileStore.patch_interior(profiles[i])
+        profiles.flush()
+        del profiles
+        profileStore.save_metadata(path, xVals, [num_marks, num_points], [str(column) for column in columns],
+                                   filename)
+        return profileStore(path)
+
+    @staticmethod
+    def patch_interior(profile):
+        """
+        linearly interpolates missing values between the first and last valid values of a profile.
+        Missing values at the ends are left as np.nan.
+
+        :param profile: 1D array of a single profile
+        :return: patched copy of the profile
+        """
+        profile = np.array(profile, dtype=float)
+        valid = np.flatnonzero(~np.isnan(profile))
+        if valid.size > 0:
+            interior = np.arange(valid[0], valid[-1] + 1)
+            profile[interior] = np.interp(interior, valid, profile[valid])
+        return profile
+
+    def __len__(self):
+        """
+        :return: number of profiles in the store
+        """
+        return self.data.shape[0]
@@ -0,0 +1,101 @@
+"""
+Testing script for the memory-mapped profile store and its use by multiVector and outlierAnalyzer
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import os
+import tempfile
+import numpy as np
+from profileStore import profileStore
+from mutliVector import multiVector
+from outlierAnalyzer import outlierAnalyzer
+
+def make_profiles():
+    """
+    helper that builds a small set of profiles with missing values at the ends and in the middle
+    """
+    xVals = np.linspace(0, 10, 50)
+    data = np.array([np.sin(xVals + shift) for shift in np.linspace(0, 1, 5)])
+    data[0, :2] = np.nan
+    data[3, -3:] = np.nan
+    data[2, 20] = np.nan
+    return xVals, data
+
+def test_create_and_open():
+    """
+    profiles round trip through the store as float32 with interior gaps patched and end gaps kept
+    """
+    xVals, data = make_profiles()
+    with tempfile.TemporaryDirectory() as path:
+        store = profileStore.create(path, xVals, data)
+        reopened = profileStore(path)
+        assert len(reopened) == 5
+        assert reopened.data.dtype == np.float32
+        assert reopened.names == store.names
+        assert np.isnan(reopened.data[0, :2]).all()
+        assert np.isnan(reopened.data[3, -3:]).all()
+        assert np.isclose(reopened.data[2, 20], (data[2, 19] + data[2, 21]) / 2, atol=1e-6)
+        del store, reopened
+
+def test_multivector_on_store():
+    """
+    multiVector works on the store as a zero-copy view and matches the results of the list based analysis
+    """
+    xVals, data = make_profiles()
+    with tempfile.TemporaryDirectory() as path:
+        store = profileStore.create(path, xVals, data)
+        from_store = multiVector(store.xVals, store.data)
+        from_lists = multiVector(xVals.tolist(), data.tolist())
+        assert np.shares_memory(from_store.data, store.data)
+        assert len(from_store.xVals) == len(from_lists.xVals) == 45
+        assert np.allclose(from_store.dot_products(from_store.data), from_lists.dot_products(from_lists.data))
+        del store, from_store
+
+def test_outlier_analyzer_on_store_row():
+    """
+    outlierAnalyzer accepts a single row of the store
+    """
+    xVals, data = make_profiles()
+    with tempfile.TemporaryDirectory() as path:
+        store = profileStore.create(path, xVals, data)
+        oa = outlierAnalyzer(store.xVals, store.data[0])
+        assert len(oa.vector) == len(oa.xVals) == 48
+        del store, oa
+
+def test_from_veeco_csv():
+    """
+    an export read a few rows at a time matches the export read at once, and the store is no longer current once the
+    export changes
+    """
+    from main_VEECO import read_multi_cursor
+    xVals, data = make_profiles()
+    with tempfile.TemporaryDirectory() as path:
+        filename = os.path.join(path, "marks.csv")
+        with open(filename, 'w') as export:
+            export.write("x," + ",".join("mark" + str(i) for i in np.arange(len(data))) + "\num\n-\n")
+            for j in np.arange(len(xVals)):
+                export.write(",".join(["%.6f" % xVals[j]] + [" ---" if np.isnan(value) else "%.6f" % value
+                                                              for value in data[:, j]]) + "\n")
+        profileStore.CHUNK_VALUES = 7
+        try:
+            store = profileStore.from_veeco_csv(filename, os.path.join(path, "store"))
+        finally:
+            profileStore.CHUNK_VALUES = 1 << 22
+        x, raw_vectors = read_multi_cursor(filename)
+        expected = np.array([profileStore.patch_interior(vector) for vector in raw_vectors])
+        assert store.names == ["mark" + str(i) for i in np.arange(len(data))]
+        assert np.allclose(store.xVals, x) and np.allclose(store.data, expected, atol=1e-6, equal_nan=True)
+        assert store.is_current(filename)
+        with open(filename, 'a') as export:
+            export.write(",".join(["10.5"] + ["0"] * len(data)) + "\n")
+        assert not store.is_current(filename)
+        del store
+
+if __name__ == '__main__':
+    test_create_and_open()
+    test_multivector_on_store()
+    test_outlier_analyzer_on_store_row()
+    test_from_veeco_csv()
+    print("profile store tests passed")
@@ -0,0 +1,146 @@
+"""
+class results_store keeps the results of every processed wafer in a single local SQLite database.
+Scalar results (biases, regression slopes, failure/misread counts) and per-pad arrays are stored so that historical
+queries across wafers, lots and products do not require re-parsing hundreds of PROCESSED.csv files.
+
+Database layout
+    1. wafers: one row per processed wafer (wafer name, lot, product, timestamp)
+    2. scalars: one row per named scalar result of a wafer
+    3. pads: one row per measured pad of a wafer
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import sqlite3
+
+class results_store(object):
+    # per-pad columns stored in the pads table, in the order they are written
+    PAD_COLUMNS = ("nom_x", "nom_y", "meas_x", "meas_y", "x_dim", "y_dim")
+
+    def __init__(self, db_path):
+        """
+        constructor for the results_store class.  Opens (or creates) the database at db_path and makes sure all
+        tables and indexes exist.
+
+        :param db_path: path to the SQLite database file (':memory:' for a throwaway database)
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.create_tables()
+
+    def create_tables(self):
+        """
+        creates the wafers, scalars and pads tables and their indexes if they are not already present
+        :return: NA
+        """
+        pad_columns = ", ".join(column + " REAL" for column in self.PAD_COLUMNS)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS wafers ("
+                              "id INTEGER PRIMARY KEY, wafer TEXT NOT NULL UNIQUE, lot TEXT, product TEXT, "
+                              "timestamp TEXT)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS scalars ("
+                              "wafer_id INTEGER NOT NULL REFERENCES wafers(id) ON DELETE CASCADE, "
+                              "name TEXT NOT NULL, value REAL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS pads ("
+                              "wafer_id INTEGER NOT NULL REFERENCES wafers(id) ON DELETE CASCADE, "
+                              "pad INTEGER NOT NULL, " + pad_columns + ")")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_wafers_lot ON wafers(lot)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_wafers_product ON wafers(product)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_wafers_timestamp ON wafers(timestamp)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_scalars_name ON scalars(name, wafer_id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pads_wafer ON pads(wafer_id, pad)")
+
+    def write_wafer(self, wafer, lot, product, timestamp, scalars, pads):
+        """
+        writes all results of a single wafer in ONE transaction.  If the wafer has been written before, its old
+        results are replaced so that re-processing a wafer never duplicates rows.
+
+        :param wafer: name of the wafer (unique)
+        :param lot: lot the wafer belongs to
+        :param product: product the wafer belongs to
+        :param timestamp: ISO formatted time of the measurement (string)
+        :param scalars: dictionary of {scalar name: value}
+        :param pads: dictionary of {pad column: list of per-pad values}.  Keys must be in PAD_COLUMNS, missing
+                     columns are stored as NULL.  All lists must be of equal length.
+        :return: database id of the wafer
+        """
+        unknown = set(pads) - set(self.PAD_COLUMNS)
+        assert not unknown, "unknown pad columns: " + str(sorted(unknown))
+        lengths = set(len(values) for values in pads.values())
+        assert len(lengths) <= 1, "pad lists provided are not of comparable length"
+        num_pads = lengths.pop() if lengths else 0
+        columns = [pads.get(column, [None] * num_pads) for column in self.PAD_COLUMNS]
+
+        with self.conn:
+            self.conn.execute("DELETE FROM wafers WHERE wafer = ?", (wafer,))
+            cursor = self.conn.execute("INSERT INTO wafers (wafer, lot, product, timestamp) VALUES (?, ?, ?, ?)",
+                                       (wafer, lot, product, timestamp))
+            wafer_id = cursor.lastrowid
+            self.conn.executemany("INSERT INTO scalars (wafer_id, name, value) VALUES (?, ?, ?)",
+                                  [(wafer_id, name, self.to_sql(value)) for name, value in scalars.items()])
+            placeholders = ", ".join("?" * (len(self.PAD_COLUMNS) + 2))
+            self.conn.executemany("INSERT INTO pads (wafer_id, pad, " + ", ".join(self.PAD_COLUMNS) + ") "
+                                  "VALUES (" + placeholders + ")",
+                                  [(wafer_id, i) + tuple(self.to_sql(v) for v in row)
+                                   for i, row in enumerate(zip(*columns))])
+        return wafer_id
+
+    def query_scalar(self, name, product=None, lot=None, start=None, end=None):
+        """
+        finds a single named scalar result for every stored wafer matching the given filters.
+
+        :param name: name of the scalar result (for example "X bias")
+        :param product: only return wafers of this product (None for all products)
+        :param lot: only return wafers of this lot (None for all lots)
+        :param start: only return wafers measured at or after this ISO timestamp (None for no lower bound)
+        :param end: only return wafers measured before this ISO timestamp (None for no upper bound)
+        :return: list of (wafer, lot, product, timestamp, value) tuples ordered by timestamp
+        """
+        query = "SELECT w.wafer, w.lot, w.product, w.timestamp, s.value FROM scalars s " \
+                "JOIN wafers w ON w.id = s.wafer_id WHERE s.name = ?"
+        params = [name]
+        if product is not None:
+            query += " AND w.product = ?"
+            params.append(product)
+        if lot is not None:
+            query += " AND w.lot = ?"
+            params.append(lot)
+        if start is not None:
+            query += " AND w.timestamp >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND w.timestamp < ?"
+            params.append(end)
+        query += " ORDER BY w.timestamp"
+        return self.conn.execute(query, params).fetchall()
+
+    def get_pads(self, wafer):
+        """
+        retrieves the per-pad arrays of a single stored wafer
+        :param wafer: name of the wafer
+        :return: dictionary of {pad column: list of per-pad values}, empty lists if the wafer is not stored
+        """
+        rows = self.conn.execute("SELECT " + ", ".join("p." + column for column in self.PAD_COLUMNS) +
+                                 " FROM pads p JOIN wafers w ON w.id = p.wafer_id WHERE w.wafer = ? "
+                                 "ORDER BY p.pad", (wafer,)).fetchall()
+        return {column: [row[i] for row in rows] for i, column in enumerate(self.PAD_COLUMNS)}
+
+    def close(self):
+        """
+        closes the connection to the database
+        :return: NA
+        """
+        self.conn.close()
+
+    @staticmethod
+    def to_sql(value):
+        """
+        converts numpy scalars into plain python values that sqlite3 knows how to store
+        :param value: value to be converted
+        :return: float of value, or None if value is None
+        """
+        if value is None:
+            return None
+        return float(value)
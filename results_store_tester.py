@@ -0,0 +1,41 @@
+"""
+Tester script for class results_store
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import numpy as np
+from results_store import results_store
+
+def test_write_and_query():
+    """
+    writes two wafers of different products and queries a scalar back by product
+    """
+    store = results_store(":memory:")
+    pads = {"nom_x": [0, 100], "nom_y": [0, 100], "meas_x": [np.float64(0.5), 100.5], "meas_y": [0.2, 99.8]}
+    store.write_wafer("A_w1", "lot1", "A", "2026-01-01T00:00:00", {"X bias": np.float64(0.3)}, pads)
+    store.write_wafer("B_w1", "lot1", "B", "2026-01-02T00:00:00", {"X bias": 0.7}, pads)
+    assert store.query_scalar("X bias", product="A") == [("A_w1", "lot1", "A", "2026-01-01T00:00:00", 0.3)]
+    assert len(store.query_scalar("X bias", lot="lot1")) == 2
+    assert len(store.query_scalar("X bias", start="2026-01-02")) == 1
+    stored_pads = store.get_pads("A_w1")
+    assert stored_pads["meas_x"] == [0.5, 100.5]
+    assert stored_pads["x_dim"] == [None, None]
+    store.close()
+
+def test_rewrite_replaces():
+    """
+    re-processing a wafer replaces its old results instead of duplicating them
+    """
+    store = results_store(":memory:")
+    store.write_wafer("A_w1", "lot1", "A", "2026-01-01", {"X bias": 0.3}, {"nom_x": [1, 2, 3]})
+    store.write_wafer("A_w1", "lot1", "A", "2026-01-01", {"X bias": 0.4}, {"nom_x": [1, 2]})
+    assert [row[4] for row in store.query_scalar("X bias")] == [0.4]
+    assert store.get_pads("A_w1")["nom_x"] == [1, 2]
+    store.close()
+
+if __name__ == '__main__':
+    test_write_and_query()
+    test_rewrite_replaces()
+    print("results store tests passed")
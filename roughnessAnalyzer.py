@@ -0,0 +1,101 @@
+"""
+Class roughnessAnalyzer computes roughness and texture metrics in sliding windows along VEECO scrub mark profiles:
+    a. Ra: mean absolute deviation from the window's mean line
+    b. Rq: root mean square deviation from the window's mean line
+    c. Rz: peak to valley height (highest minus lowest point) of the window
+    d. peak count: number of local maxima above the window's mean line
+    e. slope RMS: root mean square of the slopes between neighboring points of the window
+Every metric of every window is found for a whole 2D batch of profiles at once.  Rq and the slope RMS come from
+cumulative sums (O(n) per profile regardless of the window length), Ra, Rz and the peak count from strided window
+views, so there are no per-window python loops.
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+class roughnessAnalyzer(object):
+    METRICS = ["Ra", "Rq", "Rz", "Peak count", "Slope RMS"]
+    # largest number of window values (profiles x windows x window) gathered at once
+    CHUNK_VALUES = 1 << 22
+
+    def __init__(self, xVals, window):
+        """
+        constructor for the roughnessAnalyzer class
+        :param xVals: x values shared by all profiles
+        :param window: number of points in every window.  Profiles shorter than the window are analyzed in a single
+                       window of the whole profile (see fitting_window).
+        """
+        self.xVals = np.asarray(xVals, dtype=float)
+        assert window > 2, "the window must contain at least 3 points"
+        fitted = roughnessAnalyzer.fitting_window(self.xVals.size, window)
+        assert fitted is not None, "the profile is too short for a roughness window"
+        if fitted != window:
+            print("profile of " + str(self.xVals.size) + " points is analyzed in a roughness window of " + str(fitted) +
+                  " points instead of " + str(window))
+        window = fitted
+        self.window = window
+        # x value at the middle of every window
+        self.centers = (self.xVals[:self.xVals.size - window + 1] + self.xVals[window - 1:]) / 2
+
+    @staticmethod
+    def fitting_window(num_points, window):
+        """
+        :param num_points: number of points of the profiles
+        :param window: requested number of points in every window
+        :return: longest window, up to the requested one, that fits in the profiles (and has at least 3 points),
+                 None if there is none
+        """
+        window = min(window, num_points)
+        if window <= 2:
+            return None
+        return window
+
+    def window_sums(self, values, length):
+        """
+        sums of values over every window of a number of consecutive points, from cumulative sums
+        :param values: 2D array, one profile per row
+        :param length: number of consecutive points summed
+        :return: 2D array of window sums (profiles x windows)
+        """
+        cumulative = np.zeros((values.shape[0], values.shape[1] + 1))
+        np.cumsum(values, axis=1, out=cumulative[:, 1:])
+        return cumulative[:, length:] - cumulative[:, :values.shape[1] - length + 1]
+
+    def analyze(self, profiles):
+        """
+        finds the roughness metrics of every window of every profile
+        :param profiles: 2D array (or 2D list) of patched profiles, one profile per row (or a single profile)
+        :return: dictionary {metric: 2D array of the metric of every window of every profile (profiles x windows)}
+                 with the METRICS as keys
+        """
+        profiles = np.asarray(profiles, dtype=float)
+        if profiles.ndim == 1:
+            profiles = profiles[np.newaxis, :]
+        w = self.window
+        results = {metric: np.empty((profiles.shape[0], self.centers.size)) for metric in self.METRICS}
+        rows = max(1, self.CHUNK_VALUES // (self.centers.size * w))
+        spacing = np.diff(self.xVals)
+        for start in np.arange(0, profiles.shape[0], rows):
+            chunk = profiles[start:start + rows]
+            stop = start + chunk.shape[0]
+            means = self.window_sums(chunk, w) / w
+            variance = np.maximum(self.window_sums(chunk ** 2, w) / w - means ** 2, 0)
+            results["Rq"][start:stop] = np.sqrt(variance)
+
+            windows = sliding_window_view(chunk, w, axis=1)
+            results["Ra"][start:stop] = np.mean(np.abs(windows - means[:, :, np.newaxis]), axis=2)
+            results["Rz"][start:stop] = windows.max(axis=2) - windows.min(axis=2)
+
+            # local maxima (interior points higher than both neighbors) above the mean line of the window
+            peaks = np.zeros(chunk.shape, dtype=bool)
+            peaks[:, 1:-1] = (chunk[:, 1:-1] > chunk[:, :-2]) & (chunk[:, 1:-1] > chunk[:, 2:])
+            # the first and last point of a window cannot be judged as peaks within it
+            results["Peak count"][start:stop] = np.sum(sliding_window_view(peaks, w, axis=1)[:, :, 1:-1] &
+                                                       (windows[:, :, 1:-1] > means[:, :, np.newaxis]), axis=2)
+
+            slopes = np.diff(chunk, axis=1) / spacing
+            results["Slope RMS"][start:stop] = np.sqrt(self.window_sums(slopes ** 2, w - 1) / (w - 1))
+        return results
@@ -0,0 +1,73 @@
+"""
+Testing script for the windowed roughness metrics of scrub mark profiles
+
+Author: Sean Lin
+Date Created: 10/19/2026
+Last Modified: 10/19/2026
+"""
+import time
+import numpy as np
+from roughnessAnalyzer import roughnessAnalyzer
+
+def brute_force(xVals, profile, window):
+    """
+    helper computing the metrics of every window one window at a time
+    """
+    metrics = []
+    for start in np.arange(xVals.size - window + 1):
+        z = profile[start:start + window]
+        mean = z.mean()
+        peaks = sum(1 for i in np.arange(1, window - 1) if z[i] > z[i - 1] and z[i] > z[i + 1] and z[i] > mean)
+        slopes = np.diff(z) / np.diff(xVals[start:start + window])
+        metrics.append([np.mean(np.abs(z - mean)), np.std(z), z.max() - z.min(), peaks,
+                        np.sqrt(np.mean(slopes ** 2))])
+    return np.array(metrics)
+
+def test_matches_brute_force():
+    """
+    every metric of every window of a batch matches a window by window computation, also on non-uniform x values
+    """
+    rng = np.random.default_rng(0)
+    xVals = np.cumsum(rng.uniform(0.05, 0.15, 120))
+    profiles = rng.normal(0, 1, (3, 120)) + np.sin(xVals)
+    analyzer = roughnessAnalyzer(xVals, 15)
+    results = analyzer.analyze(profiles)
+    assert analyzer.centers.size == 106
+    for i in np.arange(3):
+        expected = brute_force(xVals, profiles[i], 15)
+        for j, metric in enumerate(roughnessAnalyzer.METRICS):
+            assert np.allclose(results[metric][i], expected[:, j])
+
+def test_flat_profile():
+    """
+    a flat profile is perfectly smooth
+    """
+    results = roughnessAnalyzer(np.arange(50.0), 10).analyze(np.full(50, 3.0))
+    for metric in roughnessAnalyzer.METRICS:
+        assert np.allclose(results[metric], 0, atol=1e-6)
+
+def test_short_profile():
+    """
+    a profile shorter than the window is analyzed in a single window of the whole profile
+    """
+    analyzer = roughnessAnalyzer(np.arange(10.0), 21)
+    assert analyzer.window == 10 and analyzer.centers.size == 1
+    assert np.isfinite(analyzer.analyze(np.arange(10.0) % 3)["Rq"]).all()
+    assert roughnessAnalyzer.fitting_window(2, 21) is None
+
+def test_many_profiles():
+    """
+    a large batch of long profiles with wide windows is analyzed quickly
+    """
+    xVals = np.linspace(0, 60, 1000)
+    profiles = np.random.default_rng(1).normal(0, 1, (1000, 1000))
+    start = time.perf_counter()
+    roughnessAnalyzer(xVals, 51).analyze(profiles)
+    assert time.perf_counter() - start < 10
+
+if __name__ == '__main__':
+    test_matches_brute_force()
+    test_flat_profile()
+    test_short_profile()
+    test_many_profiles()
+    print("roughnessAnalyzer tests passed")
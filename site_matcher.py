@@ -0,0 +1,81 @@
+"""
+Class site matcher pairs measured pad positions with the nominal (CAD) sites of a wafer layout.
+Rather than trusting the row order of the Nikon output, a KD-tree is built over the nominal layout and every
+measured pad is assigned to its nearest site within a tolerance.  Building the tree and querying all pads
+takes O(n log n), so full 100k site wafers are matched in well under a second.
+
+Matching reports
+    a. measured pads with no site within the tolerance (unmatched)
+    b. measured pads that claim a site already claimed by a closer pad (duplicates)
+    c. sites of the layout that no pad was matched to (unmeasured)
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import csv
+import numpy as np
+
+class site_matcher(object):
+    def __init__(self, site_x, site_y):
+        """
+        constructor for the site matcher class.  Builds the KD-tree over the nominal layout.
+        :param site_x: nominal x positions of all sites of the layout
+        :param site_y: nominal y positions of all sites of the layout
+        """
+        from sklearn.neighbors import KDTree
+        self.site_x = np.asarray(site_x, dtype=float)
+        self.site_y = np.asarray(site_y, dtype=float)
+        assert self.site_x.shape == self.site_y.shape, "lists provided are not of comparable length"
+        self.tree = KDTree(np.column_stack([self.site_x, self.site_y]))
+
+    def match(self, meas_x, meas_y, tolerance):
+        """
+        assigns each measured pad to its nearest site of the layout.
+        When several pads claim the same site only the closest one keeps it, the others are reported as duplicates.
+
+        :param meas_x: measured x positions
+        :param meas_y: measured y positions
+        :param tolerance: largest distance between a pad and its site for the two to be matched (microns)
+        :return: [site index of every measured pad (-1 if unmatched or duplicate), indices of unmatched pads,
+                  indices of duplicate pads, indices of unmeasured sites]
+        """
+        meas_x = np.asarray(meas_x, dtype=float)
+        meas_y = np.asarray(meas_y, dtype=float)
+        assert meas_x.shape == meas_y.shape, "lists provided are not of comparable length"
+        if meas_x.size == 0:
+            empty = np.array([], dtype=int)
+            return empty, empty, empty, np.arange(self.site_x.size)
+        distances, sites = self.tree.query(np.column_stack([meas_x, meas_y]), k=1)
+        distances = distances[:, 0]
+        sites = sites[:, 0]
+        unmatched = np.flatnonzero(distances > tolerance)
+        sites[unmatched] = -1
+
+        # sort pads by site and then by distance, the first pad of each site keeps it
+        order = np.lexsort((distances, sites))
+        sorted_sites = sites[order]
+        repeated = np.zeros(order.size, dtype=bool)
+        repeated[1:] = sorted_sites[1:] == sorted_sites[:-1]
+        duplicates = np.sort(order[repeated & (sorted_sites >= 0)])
+        sites[duplicates] = -1
+
+        measured = np.zeros(self.site_x.size, dtype=bool)
+        measured[sites[sites >= 0]] = True
+        return sites, unmatched, duplicates, np.flatnonzero(~measured)
+
+    @staticmethod
+    def read_layout(filename):
+        """
+        reads a nominal layout from an XYin csv file generated by main_XYin (coordinates in millimeters)
+        :param filename: name of the XYin csv file
+        :return: [x positions of all sites, y positions of all sites] in microns
+        """
+        site_x = []
+        site_y = []
+        with open(filename) as csv_file:
+            for row in csv.reader(csv_file):
+                if len(row) >= 2:
+                    site_x.append(float(row[0]) * 1000)
+                    site_y.append(float(row[1]) * 1000)
+        return site_x, site_y
@@ -0,0 +1,57 @@
+"""
+Tester script for class site_matcher
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import numpy as np
+from site_matcher import site_matcher
+
+def test_skipped_site():
+    """
+    a skipped site does not shift the pairing of the pads after it
+    """
+    site_x = [0, 1000, 2000, 3000]
+    site_y = [0, 0, 0, 0]
+    meas_x = [1.5, 2001, 3000.5]
+    meas_y = [-0.5, 0.2, 1]
+    sites, unmatched, duplicates, unmeasured = site_matcher(site_x, site_y).match(meas_x, meas_y, 50)
+    assert sites.tolist() == [0, 2, 3]
+    assert unmatched.tolist() == []
+    assert duplicates.tolist() == []
+    assert unmeasured.tolist() == [1]
+
+def test_unmatched_and_duplicates():
+    """
+    pads too far from any site are unmatched and the further of two pads claiming one site is a duplicate
+    """
+    site_x = [0, 1000]
+    site_y = [0, 0]
+    meas_x = [5, 1, 500, 1000]
+    meas_y = [0, 0, 0, 0]
+    sites, unmatched, duplicates, unmeasured = site_matcher(site_x, site_y).match(meas_x, meas_y, 50)
+    assert sites.tolist() == [-1, 0, -1, 1]
+    assert unmatched.tolist() == [2]
+    assert duplicates.tolist() == [0]
+    assert unmeasured.tolist() == []
+
+def test_large_shuffled_layout():
+    """
+    a shuffled 100k site layout is matched back to the right sites
+    """
+    grid = np.arange(-158, 158) * 1000.0
+    site_x, site_y = [a.ravel() for a in np.meshgrid(grid, grid)]
+    rng = np.random.default_rng(0)
+    order = rng.permutation(site_x.size)
+    meas_x = site_x[order] + rng.normal(0, 5, site_x.size)
+    meas_y = site_y[order] + rng.normal(0, 5, site_x.size)
+    sites, unmatched, duplicates, unmeasured = site_matcher(site_x, site_y).match(meas_x, meas_y, 100)
+    assert np.array_equal(sites, order)
+    assert unmatched.size == duplicates.size == unmeasured.size == 0
+
+if __name__ == '__main__':
+    test_skipped_site()
+    test_unmatched_and_duplicates()
+    test_large_shuffled_layout()
+    print("site matcher tests passed")
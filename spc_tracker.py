@@ -0,0 +1,122 @@
+"""
+class spc tracker keeps statistical process control charts of per-wafer results (pad dimension bias, positional error
+slopes, ...) for every product, so that wafers drifting out of control are flagged as soon as they are processed.
+
+For every product and metric a small state of a fixed size is kept in a json file:
+    1. baseline: the mean and standard deviation of the first wafers of the product, accumulated with Welford's
+       algorithm until the baseline number of wafers has been seen
+    2. monitoring: once the baseline is frozen, an EWMA chart (with its exact, time-varying control limits) and a
+       two-sided tabular CUSUM of the standardized results
+Every new wafer updates the state in O(1), without ever rescanning earlier wafers.  Every product also keeps its last
+wafer and the charts of the metrics as they were before it, so reprocessing the last wafer (the usual case of a rerun)
+replaces its results instead of charting it twice (older wafers are not remembered, so reprocessing one charts its
+results as a new wafer).  The state file is replaced atomically, so an interrupted run never leaves a half written
+state behind.
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import json
+import os
+import numpy as np
+
+class spc_tracker(object):
+    def __init__(self, filename, baseline_wafers=20, weight=0.2, ewma_width=3, cusum_slack=0.5, cusum_limit=5):
+        """
+        constructor for the spc tracker class.  Loads the state file if it already exists.
+        :param filename: path of the state (json) file
+        :param baseline_wafers: number of wafers of a product the baseline mean and std are estimated from
+        :param weight: weight of the newest wafer in the EWMA (lambda)
+        :param ewma_width: width of the EWMA control limits in standard deviations of the EWMA (L)
+        :param cusum_slack: allowed slack of the CUSUM in baseline standard deviations (k)
+        :param cusum_limit: decision interval of the CUSUM in baseline standard deviations (h)
+        """
+        self.filename = filename
+        self.baseline_wafers = baseline_wafers
+        self.weight = weight
+        self.ewma_width = ewma_width
+        self.cusum_slack = cusum_slack
+        self.cusum_limit = cusum_limit
+        self.state = {}
+        if os.path.isfile(filename):
+            with open(filename) as state_file:
+                self.state = json.load(state_file)
+
+    def update(self, product, wafer, results):
+        """
+        adds the results of a wafer to the charts of its product and saves the state
+        :param product: name of the product the wafer belongs to
+        :param wafer: name of the wafer
+        :param results: dictionary {metric: result of the wafer} of the metrics to chart
+        :return: list of one dictionary per metric, containing the metric, value, chart phase ("baseline" or
+                 "monitoring"), EWMA, EWMA control limits, upper and lower CUSUM and whether the wafer is out of
+                 control
+        """
+        product_state = self.state.setdefault(product, {"last_wafer": None, "charts": {}})
+        charts = product_state["charts"]
+        if wafer == product_state["last_wafer"]:
+            # the last wafer is reprocessed, its results are taken back out of the charts first
+            for metric, previous in product_state.get("undo", {}).items():
+                if previous is None:
+                    charts.pop(metric, None)
+                else:
+                    charts[metric] = previous
+        # the charts of the metrics as they are before this wafer, so it can be taken back out if reprocessed
+        product_state["undo"] = {metric: dict(charts[metric]) if metric in charts else None for metric in results}
+        report = []
+        for metric, value in results.items():
+            value = float(value)
+            chart = charts.setdefault(metric, {"count": 0, "mean": 0.0, "m2": 0.0, "monitored": 0})
+            entry = {"metric": metric, "value": value, "phase": "baseline", "ewma": np.nan,
+                     "lower_limit": np.nan, "upper_limit": np.nan, "cusum_upper": np.nan, "cusum_lower": np.nan,
+                     "out_of_control": False}
+            if not np.isfinite(value):
+                report.append(entry)
+                continue
+            if chart["count"] < self.baseline_wafers:
+                # Welford's update of the baseline mean and sum of squared deviations
+                chart["count"] += 1
+                delta = value - chart["mean"]
+                chart["mean"] += delta / chart["count"]
+                chart["m2"] += delta * (value - chart["mean"])
+                if chart["count"] == self.baseline_wafers:
+                    chart["std"] = np.sqrt(chart["m2"] / (chart["count"] - 1)) if chart["count"] > 1 else 0.0
+                    chart["ewma"] = chart["mean"]
+                    chart["cusum_upper"] = 0.0
+                    chart["cusum_lower"] = 0.0
+                report.append(entry)
+                continue
+
+            # monitoring phase, the baseline is frozen
+            chart["monitored"] += 1
+            std = chart["std"] if chart["std"] > 0 else np.finfo(float).eps
+            chart["ewma"] = self.weight * value + (1 - self.weight) * chart["ewma"]
+            half_width = self.ewma_width * std * np.sqrt(
+                self.weight / (2 - self.weight) * (1 - (1 - self.weight) ** (2 * chart["monitored"])))
+            standardized = (value - chart["mean"]) / std
+            chart["cusum_upper"] = max(0.0, chart["cusum_upper"] + standardized - self.cusum_slack)
+            chart["cusum_lower"] = max(0.0, chart["cusum_lower"] - standardized - self.cusum_slack)
+            ewma_alarm = abs(chart["ewma"] - chart["mean"]) > half_width
+            cusum_alarm = max(chart["cusum_upper"], chart["cusum_lower"]) > self.cusum_limit
+            entry.update({"phase": "monitoring", "ewma": chart["ewma"], "lower_limit": chart["mean"] - half_width,
+                          "upper_limit": chart["mean"] + half_width, "cusum_upper": chart["cusum_upper"],
+                          "cusum_lower": chart["cusum_lower"], "out_of_control": bool(ewma_alarm or cusum_alarm)})
+            if cusum_alarm:
+                # restarts the CUSUM once it has signaled so the next shift is detected afresh
+                chart["cusum_upper"] = 0.0
+                chart["cusum_lower"] = 0.0
+            report.append(entry)
+        product_state["last_wafer"] = wafer
+        self.save()
+        return report
+
+    def save(self):
+        """
+        writes the state to a temporary file and moves it over the state file in one step
+        :return: NA
+        """
+        temp_filename = self.filename + ".tmp"
+        with open(temp_filename, 'w') as state_file:
+            json.dump(self.state, state_file)
+        os.replace(temp_filename, self.filename)
@@ -0,0 +1,75 @@
+"""
+Testing script for the statistical process control tracking of per-wafer results
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import os
+import tempfile
+import numpy as np
+from spc_tracker import spc_tracker
+
+def test_baseline_and_shift():
+    """
+    the baseline matches the mean and std of the first wafers, in control wafers are not flagged and a shift of two
+    standard deviations is flagged within a few wafers
+    """
+    rng = np.random.default_rng(0)
+    baseline = rng.normal(0.5, 0.1, 20)
+    with tempfile.TemporaryDirectory() as path:
+        tracker = spc_tracker(os.path.join(path, "SPC.json"))
+        for i, value in enumerate(baseline):
+            report = tracker.update("9574A1", "w" + str(i), {"X bias": value})
+            assert report[0]["phase"] == "baseline" and not report[0]["out_of_control"]
+        chart = tracker.state["9574A1"]["charts"]["X bias"]
+        assert np.isclose(chart["mean"], np.mean(baseline)) and np.isclose(chart["std"], np.std(baseline, ddof=1))
+
+        flags = [tracker.update("9574A1", "m" + str(i), {"X bias": chart["mean"]})[0]["out_of_control"]
+                 for i in np.arange(10)]
+        assert not any(flags)
+        # the state is reloaded from disk between wafers without losing anything
+        flags = [spc_tracker(os.path.join(path, "SPC.json")).update(
+            "9574A1", "s" + str(i), {"X bias": chart["mean"] + 2 * chart["std"]})[0]["out_of_control"]
+                 for i in np.arange(5)]
+        assert any(flags[:4])
+
+def test_products_separate():
+    """
+    every product has its own charts, and missing results are skipped
+    """
+    with tempfile.TemporaryDirectory() as path:
+        tracker = spc_tracker(os.path.join(path, "SPC.json"), baseline_wafers=2)
+        tracker.update("A", "a0", {"X bias": 1.0})
+        tracker.update("A", "a1", {"X bias": 3.0})
+        tracker.update("B", "b0", {"X bias": 100.0})
+        report = tracker.update("A", "a2", {"X bias": np.nan})
+        assert report[0]["phase"] == "baseline"
+        assert tracker.state["A"]["charts"]["X bias"]["mean"] == 2 and tracker.state["A"]["last_wafer"] == "a2"
+        assert tracker.state["B"]["charts"]["X bias"]["count"] == 1
+
+def test_reprocessed_wafers():
+    """
+    reprocessing the last wafer replaces its results, and the state does not grow with the number of wafers
+    """
+    with tempfile.TemporaryDirectory() as path:
+        tracker = spc_tracker(os.path.join(path, "SPC.json"), baseline_wafers=3)
+        tracker.update("A", "a0", {"X bias": 1.0})
+        tracker.update("A", "a1", {"X bias": 2.0, "Y bias": 5.0})
+        tracker = spc_tracker(os.path.join(path, "SPC.json"), baseline_wafers=3)
+        tracker.update("A", "a1", {"X bias": 3.0, "Y bias": 7.0})
+        assert tracker.state["A"]["charts"]["X bias"]["count"] == 2
+        assert tracker.state["A"]["charts"]["X bias"]["mean"] == 2
+        assert tracker.state["A"]["charts"]["Y bias"]["count"] == 1
+        assert tracker.state["A"]["charts"]["Y bias"]["mean"] == 7
+        sizes = []
+        for i in np.arange(100):
+            tracker.update("A", "b" + str(i), {"X bias": 2.0, "Y bias": 7.0})
+            sizes.append(os.path.getsize(os.path.join(path, "SPC.json")))
+        assert sizes[-1] <= sizes[10] + 10
+
+if __name__ == '__main__':
+    test_baseline_and_shift()
+    test_products_separate()
+    test_reprocessed_wafers()
+    print("spc tracker tests passed")
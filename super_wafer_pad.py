@@ -5,11 +5,10 @@ Plots a super bond-pad style overlay plot with all the measured pad geometries.
 
 Author: Sean Lin
 Date Created: 7/2/21
-Last Modified: 7/30/21
+Last Modified: 10/19/26
 """
-import matplotlib.pyplot as plt
 import numpy as np
-import matplotlib.patches as mpatches
+from dimension_stats import dimension_stats
 
 class super_wafer_pad(object):
 
@@ -27,24 +26,37 @@ class super_wafer_pad(object):
         self.meas_y = meas_y
         assert len(self.meas_x) == len(self.meas_y), \
             "lists provided are not of comparable length"
+        self.stats_x = None
+        self.stats_y = None
+
+    def find_statistics(self):
+        """
+        accumulates the statistics of all x and y dimensions in a single pass (computed once and reused)
+        :return: [dimension_stats of x dimensions, dimension_stats of y dimensions]
+        """
+        if self.stats_x is None:
+            self.stats_x = dimension_stats()
+            self.stats_x.update(self.meas_x)
+            self.stats_y = dimension_stats()
+            self.stats_y.update(self.meas_y)
+        return self.stats_x, self.stats_y
 
     def find_average_dimensions(self):
         """
         finds averages of all x and y dimensions
         :return: [average x dimensions, average y dimension]
         """
-        average_x = np.mean(self.meas_x)
-        average_y = np.mean(self.meas_y)
-        return average_x, average_y
+        stats_x, stats_y = self.find_statistics()
+        return stats_x.mean, stats_y.mean
 
     def find_std_and_quartile(self):
         """
-        finds std and other relevant statistics of all x and y dimensions
-        :return: [std x dimensions, std y dimensions]
+        finds std and quartiles of all x and y dimensions
+        :return: [std x dimensions, std y dimensions, (Q1, median, Q3) of x dimensions,
+                  (Q1, median, Q3) of y dimensions]
         """
-        std_x = np.std(self.meas_x)
-        std_y = np.std(self.meas_y)
-        return std_x, std_y
+        stats_x, stats_y = self.find_statistics()
+        return stats_x.std(), stats_y.std(), stats_x.quartiles(), stats_y.quartiles()
 
     def plot_nom_averages_stds(self, avg_x, avg_y, std_x, std_y, axis_x, axis_y):
         """
@@ -93,6 +105,7 @@ class super_wafer_pad(object):
         initiate plots creates and labels the subplot layout desired to represent the data
         :return: [figure, ax for histogram of x widths, ax for histogram of y widths, ax for super overlay]
         """
+        import matplotlib.pyplot as plt
         fig = plt.figure(figsize=[12.8, 9.6])
         ax1 = fig.add_subplot(221)
         ax1.set_xlabel("X-Widths in microns")
@@ -137,8 +150,7 @@ class super_wafer_pad(object):
         :param ax: matplotlib axis to plot the rectangle on
         :return: NA
         """
-        average_x = np.mean(self.meas_x)
-        average_y = np.mean(self.meas_y)
+        average_x, average_y = self.find_average_dimensions()
         self.plot_rectangle(average_x, average_y, ax, 'limegreen', 3, "Average Measured Pad", 1)
         ax.annotate(str(round(average_x, 2)), xy=(0, ax.get_ylim()[0] * 0.9), color='limegreen', fontsize='large',
                     fontweight='bold')
@@ -158,6 +170,7 @@ class super_wafer_pad(object):
         :param transparency: the transparency of the rectangle
         :return: NA
         """
+        import matplotlib.patches as mpatches
         rect = mpatches.Rectangle((- x/2, - y/2), x, y, color=col, fill=False, linewidth=linw, label=label,
                                   alpha=transparency)
         ax.add_patch(rect)
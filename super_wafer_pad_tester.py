@@ -3,7 +3,7 @@ super_wafer_pad tester is a tester script for class super_wafer_pad
 
 Author: Sean Lin
 Date Created: 7/2/21
-Last modified: 7/6/21
+Last modified: 10/19/26
 """
 from super_wafer_pad import super_wafer_pad
 import matplotlib.pyplot as plt
@@ -52,7 +52,7 @@ def test_random():
     ax1.hist(meas_x)
     ax2.hist(meas_y)
     avg_x, avg_y = swp.find_average_dimensions()
-    std_x, std_y = swp.find_std_and_quartile()
+    std_x, std_y, quartiles_x, quartiles_y = swp.find_std_and_quartile()
     swp.plot_nom_averages_stds(avg_x, avg_y, std_x, std_y, ax1, ax2)
     swp.plot_measured_rects(ax3)
     swp.plot_nominal_rect(ax3)
@@ -7,21 +7,23 @@ Preprocessing entails
 
 Author: Sean Lin
 Date Created: 6/22/2021
-Last modified: 7/30/2021
+Last modified: 10/19/2026
 """
 import math
 import numpy as np
-import pandas as pd
 
 class vectorProcessor(object):
 
     def type_checker_raw(self, vector):
         """
         type_checker checks whether the input list contains only float values or np.NAN
+        1D float arrays (such as a row of a profileStore) also pass.
 
         :param vector: the list to be checked
         :return: T/F to indicate whether type checker was passed
         """
+        if isinstance(vector, np.ndarray):
+            return vector.ndim == 1 and np.issubdtype(vector.dtype, np.floating)
         good = True
         if isinstance(vector, list):
             for x in vector:
@@ -68,16 +70,20 @@ class vectorProcessor(object):
         :param vector: vector represented by a list that needs to be patched
         :return: the patched vector/list
         """
+        import pandas as pd
         pandas_series = pd.Series(vector).interpolate().tolist()
         return pandas_series
 
     def type_checker_post(self, vector):
         """
             type_checker checks whether the input list contains only float values and does not contain np.NAN
+            1D float arrays without np.NAN also pass.
 
             :param vector: the list to be checked
             :return: T/F to indicate whether type checker was passed
         """
+        if isinstance(vector, np.ndarray):
+            return vector.ndim == 1 and np.issubdtype(vector.dtype, np.floating) and not np.isnan(vector).any()
         good = True
         if isinstance(vector, list):
             for x in vector:
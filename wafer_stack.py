@@ -0,0 +1,215 @@
+"""
+Class wafer stack aggregates the cleaned per-pad results of all wafers of a lot, so sites that are consistently bad
+across the lot can be found without merging csv files by hand.
+
+A stack is a folder containing
+    a. stack.f32: memory-mapped float32 array of shape (wafer x site x metric), np.nan where a site was not measured
+    b. sites.npy: the nominal x and y positions of the sites of the layout
+    c. sums.npy / failures.npy: running per-site count, sum and sum of squares of every metric and per-site failure
+       counts, so per-site statistics are updated in O(sites) as every wafer is added
+    d. meta.json: the metrics, the wafers in the stack (in row order) and the allocated number of wafer rows
+Wafers are aligned to the sites of the layout by nominal position (see site_matcher).  Rows are allocated in blocks
+and the file grows as wafers are added, so a lot of hundreds of wafers is never loaded into memory at once.
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import json
+import os
+import numpy as np
+from site_matcher import site_matcher
+
+class wafer_stack(object):
+    STACK_FILE = "stack.f32"
+    SITES_FILE = "sites.npy"
+    SUMS_FILE = "sums.npy"
+    FAILURES_FILE = "failures.npy"
+    META_FILE = "meta.json"
+    METRICS = ["U", "V", "U_mean_adj", "V_mean_adj", "x_dim", "y_dim"]
+    # number of wafer rows allocated at a time
+    GROWTH = 25
+    # wafers reduced at a time when statistics are recomputed from the stack
+    BLOCK_WAFERS = 16
+
+    def __init__(self, path):
+        """
+        constructor for the wafer stack class.  Opens an existing stack.
+        :param path: folder of the stack
+        """
+        self.path = path
+        with open(os.path.join(path, self.META_FILE)) as meta_file:
+            self.meta = json.load(meta_file)
+        self.site_x, self.site_y = np.load(os.path.join(path, self.SITES_FILE))
+        self.sums = np.load(os.path.join(path, self.SUMS_FILE))
+        self.failures = np.load(os.path.join(path, self.FAILURES_FILE))
+        self.matcher = None
+        self.open_stack()
+
+    @staticmethod
+    def create(path, site_x, site_y, metrics=None):
+        """
+        creates an empty stack for a layout (replacing any stack already in the folder)
+        :param path: folder of the stack
+        :param site_x: nominal x positions of the sites of the layout
+        :param site_y: nominal y positions of the sites of the layout
+        :param metrics: names of the per-pad metrics stacked, defaults to METRICS
+        :return: the opened wafer_stack
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        metrics = list(wafer_stack.METRICS if metrics is None else metrics)
+        sites = np.array([site_x, site_y], dtype=float)
+        np.save(os.path.join(path, wafer_stack.SITES_FILE), sites)
+        # count, sum and sum of squares of every metric at every site
+        np.save(os.path.join(path, wafer_stack.SUMS_FILE), np.zeros((3, sites.shape[1], len(metrics))))
+        np.save(os.path.join(path, wafer_stack.FAILURES_FILE), np.zeros(sites.shape[1]))
+        with open(os.path.join(path, wafer_stack.STACK_FILE), 'wb'):
+            pass
+        with open(os.path.join(path, wafer_stack.META_FILE), 'w') as meta_file:
+            json.dump({"metrics": metrics, "wafers": [], "capacity": 0}, meta_file)
+        return wafer_stack(path)
+
+    def open_stack(self):
+        """
+        maps the stack file into memory with its current capacity
+        :return: NA
+        """
+        self.data = None
+        if self.meta["capacity"] > 0:
+            self.data = np.memmap(os.path.join(self.path, self.STACK_FILE), dtype=np.float32, mode='r+',
+                                  shape=(self.meta["capacity"], self.site_x.size, len(self.meta["metrics"])))
+
+    def grow(self):
+        """
+        allocates GROWTH more wafer rows (filled with np.nan) at the end of the stack file
+        :return: NA
+        """
+        row_size = self.site_x.size * len(self.meta["metrics"])
+        if self.data is not None:
+            self.data.flush()
+            self.data = None
+        with open(os.path.join(self.path, self.STACK_FILE), 'ab') as stack_file:
+            stack_file.write(np.full(self.GROWTH * row_size, np.nan, dtype=np.float32).tobytes())
+        self.meta["capacity"] += self.GROWTH
+        self.open_stack()
+
+    def add_wafer(self, name, nom_x, nom_y, metrics, fail_x=(), fail_y=(), tolerance=1.0):
+        """
+        adds (or replaces) the per-pad results of a wafer and updates the running per-site statistics
+        :param name: name of the wafer
+        :param nom_x: nominal x positions of the measured pads
+        :param nom_y: nominal y positions of the measured pads
+        :param metrics: dictionary {metric: list of per-pad values} for the metrics of the stack
+        :param fail_x: nominal x positions of the failed sites of the wafer
+        :param fail_y: nominal y positions of the failed sites of the wafer
+        :param tolerance: largest distance (microns) between a nominal position and a site of the layout
+        :return: number of pads that did not align with any site of the layout
+        """
+        if self.matcher is None:
+            self.matcher = site_matcher(self.site_x, self.site_y)
+        row = np.full((self.site_x.size, len(self.meta["metrics"])), np.nan)
+        sites, unmatched, duplicates, unmeasured = self.matcher.match(nom_x, nom_y, tolerance)
+        aligned = sites >= 0
+        for j, metric in enumerate(self.meta["metrics"]):
+            row[sites[aligned], j] = np.asarray(metrics[metric], dtype=float)[aligned]
+        failed = np.zeros(self.site_x.size)
+        fail_sites = self.matcher.match(fail_x, fail_y, tolerance)[0]
+        failed[fail_sites[fail_sites >= 0]] = 1
+
+        if name in self.meta["wafers"]:
+            # replaces the wafer: its old results are taken back out of the running statistics
+            index = self.meta["wafers"].index(name)
+            self.update_sums(np.asarray(self.data[index], dtype=float), -1)
+            self.failures -= self.wafer_failures(index)
+        else:
+            index = len(self.meta["wafers"])
+            if index >= self.meta["capacity"]:
+                self.grow()
+            self.meta["wafers"].append(name)
+        self.data[index] = row
+        self.update_sums(row, 1)
+        self.failures += failed
+        self.meta.setdefault("failed_sites", {})[name] = np.flatnonzero(failed).tolist()
+        self.save()
+        return int(np.sum(~aligned))
+
+    def wafer_failures(self, index):
+        """
+        :param index: row of the wafer in the stack
+        :return: 1 for every site that failed on the wafer, 0 otherwise
+        """
+        failed = np.zeros(self.site_x.size)
+        failed[self.meta.get("failed_sites", {}).get(self.meta["wafers"][index], [])] = 1
+        return failed
+
+    def update_sums(self, row, sign):
+        """
+        adds (sign = 1) or removes (sign = -1) a wafer row from the running per-site sums
+        :param row: per-site metrics of the wafer (site x metric, np.nan where not measured)
+        :param sign: 1 to add, -1 to remove
+        :return: NA
+        """
+        measured = ~np.isnan(row)
+        values = np.where(measured, row, 0)
+        self.sums[0] += sign * measured
+        self.sums[1] += sign * values
+        self.sums[2] += sign * values ** 2
+
+    def save(self):
+        """
+        flushes the stack and saves the running statistics and the metadata
+        :return: NA
+        """
+        if self.data is not None:
+            self.data.flush()
+        np.save(os.path.join(self.path, self.SUMS_FILE), self.sums)
+        np.save(os.path.join(self.path, self.FAILURES_FILE), self.failures)
+        temp_filename = os.path.join(self.path, self.META_FILE + ".tmp")
+        with open(temp_filename, 'w') as meta_file:
+            json.dump(self.meta, meta_file)
+        os.replace(temp_filename, os.path.join(self.path, self.META_FILE))
+
+    def find_site_statistics(self):
+        """
+        finds per-site statistics of every metric from the running sums
+        :return: [number of wafers each site was measured on (site x metric), mean (site x metric),
+                  population std (site x metric), failure frequency per site]
+        """
+        counts, sums, squares = self.sums
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+            stds = np.sqrt(np.maximum(squares / counts - means ** 2, 0))
+        num_wafers = len(self.meta["wafers"])
+        frequency = self.failures / num_wafers if num_wafers > 0 else np.full(self.site_x.size, np.nan)
+        return counts, means, stds, frequency
+
+    def recompute_site_statistics(self):
+        """
+        recomputes the per-site mean and std directly from the stack, reducing BLOCK_WAFERS wafers at a time so
+        memory stays bounded.  Uses a two-pass algorithm, so it is also a precision check on the running sums.
+        :return: [number of wafers each site was measured on, mean, population std] (each site x metric)
+        """
+        num_wafers = len(self.meta["wafers"])
+        shape = (self.site_x.size, len(self.meta["metrics"]))
+        counts = np.zeros(shape)
+        sums = np.zeros(shape)
+        for start in np.arange(0, num_wafers, self.BLOCK_WAFERS):
+            block = np.asarray(self.data[start:min(start + self.BLOCK_WAFERS, num_wafers)], dtype=float)
+            counts += np.sum(~np.isnan(block), axis=0)
+            sums += np.nansum(block, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+        squares = np.zeros(shape)
+        for start in np.arange(0, num_wafers, self.BLOCK_WAFERS):
+            block = np.asarray(self.data[start:min(start + self.BLOCK_WAFERS, num_wafers)], dtype=float)
+            squares += np.nansum((block - means) ** 2, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stds = np.sqrt(squares / counts)
+        return counts, means, stds
+
+    def __len__(self):
+        """
+        :return: number of wafers in the stack
+        """
+        return len(self.meta["wafers"])
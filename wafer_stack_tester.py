@@ -0,0 +1,70 @@
+"""
+Testing script for the wafer stack of per-site results across a lot
+
+Author: Sean Lin
+Date Created: 10/19/26
+Last Modified: 10/19/26
+"""
+import os
+import tempfile
+import numpy as np
+from wafer_stack import wafer_stack
+
+def make_layout():
+    """
+    helper building a 20 x 20 grid of sites
+    """
+    return np.meshgrid(np.arange(20) * 5000.0, np.arange(20) * 5000.0)
+
+def test_site_statistics():
+    """
+    wafers measured in different orders with missing pads align to the same sites, the running statistics match a
+    recompute from the stack, and the stack grows past its first block of rows
+    """
+    site_x, site_y = [grid.ravel() for grid in make_layout()]
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as path:
+        stack = wafer_stack.create(os.path.join(path, "lotA"), site_x, site_y, ["U", "x_dim"])
+        values = []
+        for i in np.arange(wafer_stack.GROWTH + 5):
+            order = rng.permutation(site_x.size)[:380]
+            u = rng.normal(i * 0.01, 0.1, site_x.size)
+            dims = rng.normal(100, 1, site_x.size)
+            row = np.full((site_x.size, 2), np.nan)
+            row[order] = np.column_stack([u, dims])[order]
+            values.append(row)
+            unaligned = stack.add_wafer("w" + str(i), site_x[order], site_y[order] + 0.2,
+                                        {"U": u[order], "x_dim": dims[order]}, site_x[:2], site_y[:2])
+            assert unaligned == 0
+        assert len(stack) == wafer_stack.GROWTH + 5 and stack.meta["capacity"] == 2 * wafer_stack.GROWTH
+
+        stack = wafer_stack(os.path.join(path, "lotA"))
+        counts, means, stds, frequency = stack.find_site_statistics()
+        values = np.array(values)
+        assert np.array_equal(counts, np.sum(~np.isnan(values), axis=0))
+        assert np.allclose(means, np.nanmean(values, axis=0))
+        assert np.allclose(stds, np.nanstd(values, axis=0))
+        assert np.allclose(frequency[:2], 1) and np.allclose(frequency[2:], 0)
+        recounts, remeans, restds = stack.recompute_site_statistics()
+        assert np.array_equal(counts, recounts)
+        assert np.allclose(means, remeans, atol=1e-5) and np.allclose(stds, restds, atol=1e-5)
+
+def test_replace_wafer():
+    """
+    adding a wafer again replaces its results instead of counting it twice
+    """
+    site_x, site_y = [grid.ravel() for grid in make_layout()]
+    with tempfile.TemporaryDirectory() as path:
+        stack = wafer_stack.create(path, site_x, site_y, ["U"])
+        stack.add_wafer("w0", site_x, site_y, {"U": np.ones(site_x.size)}, site_x[:1], site_y[:1])
+        stack.add_wafer("w1", site_x, site_y, {"U": np.full(site_x.size, 3.0)})
+        stack.add_wafer("w0", site_x, site_y, {"U": np.full(site_x.size, 5.0)})
+        counts, means, stds, frequency = stack.find_site_statistics()
+        assert len(stack) == 2
+        assert np.all(counts == 2) and np.allclose(means, 4) and np.allclose(stds, 1)
+        assert np.allclose(frequency, 0)
+
+if __name__ == '__main__':
+    test_site_statistics()
+    test_replace_wafer()
+    print("wafer stack tests passed")